@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:38
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_submission_counters(apps, schema_editor):
+    Assignment = apps.get_model('assignments', 'Assignment')
+    Submission = apps.get_model('assignments', 'Submission')
+    rows = (
+        Submission.objects.values('assignment_id')
+        .annotate(total=Count('id'), graded=Count('id', filter=Q(status='graded')), pending=Count('id', filter=Q(status='submitted')))
+        .order_by()
+    )
+    for row in rows:
+        Assignment.objects.filter(pk=row['assignment_id']).update(
+            total_submissions=row['total'], graded_submissions=row['graded'], pending_manual=row['pending'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0004_alter_question_question_type'),
+        ('courses', '0013_coursestorageusage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='graded_submissions',
+            field=models.PositiveIntegerField(default=0, verbose_name='已批改数'),
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='pending_manual',
+            field=models.PositiveIntegerField(default=0, verbose_name='待手动批改数'),
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='total_submissions',
+            field=models.PositiveIntegerField(default=0, verbose_name='提交记录数'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['course', 'total_submissions', 'graded_submissions'], name='assignment_submission_counts'),
+        ),
+        migrations.RunPython(populate_submission_counters, migrations.RunPython.noop),
+    ]
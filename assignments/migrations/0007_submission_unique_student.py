@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:06
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, F
+
+
+def remove_duplicate_submissions(apps, schema_editor):
+    """
+    加唯一约束前每个学生每份作业只保留一条提交记录：优先保留学生自己的提交，其次保留最新的一条，
+    并扣除被删除记录在作业计数器上的贡献
+    """
+    Assignment = apps.get_model('assignments', 'Assignment')
+    Submission = apps.get_model('assignments', 'Submission')
+    duplicated = (
+        Submission.objects.values('assignment_id', 'student_id').annotate(count=Count('id')).filter(count__gt=1).order_by()
+    )
+    for pair in duplicated:
+        submissions = list(
+            Submission.objects.filter(assignment_id=pair['assignment_id'], student_id=pair['student_id'])
+            .order_by('is_missing', '-submitted_at', '-id')
+        )
+        for submission in submissions[1:]:
+            submission.delete()
+            Assignment.objects.filter(pk=submission.assignment_id).update(
+                total_submissions=F('total_submissions') - 1,
+                graded_submissions=F('graded_submissions') - int(submission.status == 'graded'),
+                pending_manual=F('pending_manual') - int(submission.status == 'submitted'),
+                missing_submissions=F('missing_submissions') - int(submission.is_missing),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0006_deadline_scheduler'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_submissions, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='submission',
+            unique_together={('assignment', 'student')},
+        ),
+    ]
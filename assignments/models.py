@@ -1,8 +1,8 @@
 from django.db import models
 from users.models import User
-from courses.models import Course
+from courses.models import Course, SubmissionCounters
 
-class Assignment(models.Model):
+class Assignment(SubmissionCounters):
     """
     作业/考试模型
     """
@@ -10,6 +10,12 @@ class Assignment(models.Model):
     title = models.CharField(max_length=100, verbose_name='标题')
     description = models.TextField(blank=True, null=True, verbose_name='描述')
     due_date = models.DateTimeField(verbose_name='截止日期')
+    deadline_processed_at = models.DateTimeField(null=True, blank=True, verbose_name='截止处理时间')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['course', 'total_submissions', 'graded_submissions'], name='assignment_submission_counts'),
+        ]
 
     def __str__(self):
         return self.title
@@ -59,10 +65,14 @@ class Submission(models.Model):
     grade = models.FloatField(blank=True, null=True, verbose_name='分数')
     feedback = models.TextField(blank=True, null=True, verbose_name='教师评语')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='submitted', verbose_name='状态')
+    is_missing = models.BooleanField(default=False, verbose_name='逾期未提交')
 
     def __str__(self):
         return f'{self.student.username} - {self.assignment.title}'
 
+    class Meta:
+        unique_together = ('assignment', 'student')
+
 class Answer(models.Model):
     """
     学生答案模型
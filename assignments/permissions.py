@@ -1,4 +1,5 @@
 from rest_framework import permissions
+from courses.membership import is_course_member, is_course_teacher, is_course_student
 
 class IsTeacherOfCourse(permissions.BasePermission):
     """
@@ -15,12 +16,10 @@ class IsTeacherOfCourse(permissions.BasePermission):
         # 对安全方法（GET, HEAD, OPTIONS），允许所有相关人员访问
         if request.method in permissions.SAFE_METHODS:
             # 检查用户是否是教师或注册学生
-            is_teacher = obj.course.teacher == request.user
-            is_enrolled = request.user in obj.course.students.all()
-            return is_teacher or is_enrolled
+            return is_course_member(request.user, obj.course_id)
         
         # 对写操作，只允许课程的教师
-        return obj.course.teacher == request.user
+        return is_course_teacher(request.user, obj.course_id)
 
 class IsSubmissionOwnerOrTeacher(permissions.BasePermission):
     """
@@ -35,7 +34,7 @@ class IsSubmissionOwnerOrTeacher(permissions.BasePermission):
             return True
         
         # 作业所属课程的教师可以访问
-        if obj.assignment.course.teacher == request.user:
+        if is_course_teacher(request.user, obj.assignment.course_id):
             return True
             
         return False
@@ -50,8 +49,10 @@ class IsEnrolledStudent(permissions.BasePermission):
         
         from .models import Assignment
         try:
-            assignment = Assignment.objects.get(pk=request.data['assignment'])
-            # 检查用户是否是该课程的注册学生
-            return request.user in assignment.course.students.all()
-        except Assignment.DoesNotExist:
+            course_id = Assignment.objects.filter(pk=request.data['assignment']).values_list('course_id', flat=True).first()
+        except (TypeError, ValueError):
             return False
+        if course_id is None:
+            return False
+        # 检查用户是否是该课程的注册学生
+        return is_course_student(request.user, course_id)
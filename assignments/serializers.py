@@ -1,5 +1,8 @@
 from rest_framework import serializers
+from django.db import IntegrityError
 from django.utils import timezone
+from iclass_server.serializers import DynamicFieldsMixin
+from courses.grading import get_answer_key, grade_submission
 from .models import Assignment, Question, Choice, Submission, Answer
 
 class StudentSubmissionStatusSerializer(serializers.ModelSerializer):
@@ -38,7 +41,7 @@ class QuestionSerializer(serializers.ModelSerializer):
             ret.pop('correct_answer', None)
         return ret
 
-class AssignmentSerializer(serializers.ModelSerializer):
+class AssignmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     questions = QuestionSerializer(many=True)
     submission_stats = serializers.SerializerMethodField()
     student_submissions = serializers.SerializerMethodField()
@@ -56,26 +59,19 @@ class AssignmentSerializer(serializers.ModelSerializer):
         if not self.get_is_teacher(obj):
             return None
         
-        submissions = Submission.objects.filter(assignment=obj)
         total_students = obj.course.students.count()
         
-        # Count manually graded submissions
-        manually_graded_count = submissions.filter(status='graded').count()
-        
-        # Count auto-graded (not submitted and past due date)
-        auto_graded_count = 0
+        # Counters are kept on the assignment by courses.signals; students who missed the deadline
+        # get a zero-grade submission from the deadline scheduler (courses.deadlines)
+        graded_submissions = obj.graded_submissions
         if obj.due_date and timezone.now() > obj.due_date:
-            submitted_student_ids = submissions.values_list('student_id', flat=True)
-            not_submitted_count = obj.course.students.exclude(id__in=submitted_student_ids).count()
-            auto_graded_count = not_submitted_count
-
-        total_graded = manually_graded_count + auto_graded_count
-        total_submissions = submissions.count() # This remains the count of actual submissions
+            # Until the scheduler has run, count students without a record as graded with 0
+            graded_submissions += max(total_students - obj.total_submissions, 0)
 
         return {
             'total_students': total_students,
-            'total_submissions': total_submissions,
-            'graded_submissions': total_graded
+            'total_submissions': obj.total_submissions - obj.missing_submissions,
+            'graded_submissions': graded_submissions
         }
 
     def get_student_submissions(self, obj):
@@ -96,24 +92,19 @@ class AssignmentSerializer(serializers.ModelSerializer):
                     'student_id': student.id,
                     'student_name': student.username,
                     'status': submission.status,
-                    'submission_id': submission.id,
+                    'submission_id': None if submission.is_missing else submission.id,
                     'grade': submission.grade
                 })
             else:
-                # Student has not submitted
-                grade = None
-                status = 'not_submitted'
-                # If the due date has passed, mark as graded with 0 score
-                if obj.due_date and timezone.now() > obj.due_date:
-                    grade = 0
-                    status = 'graded'
-                
+                # Student has not submitted; past the deadline this matches the zero-grade
+                # record the deadline scheduler will create
+                past_due = bool(obj.due_date and timezone.now() > obj.due_date)
                 student_submission_statuses.append({
                     'student_id': student.id,
                     'student_name': student.username,
-                    'status': status,
+                    'status': 'graded' if past_due else 'not_submitted',
                     'submission_id': None,
-                    'grade': grade
+                    'grade': 0 if past_due else None
                 })
         return student_submission_statuses
 
@@ -185,6 +176,9 @@ class AssignmentSerializer(serializers.ModelSerializer):
         return instance
 
 class AnswerSerializer(serializers.ModelSerializer):
+    # 不逐条查询题目是否存在，由 SubmissionSerializer.validate 按标准答案统一校验
+    question = serializers.IntegerField(source='question_id')
+
     class Meta:
         model = Answer
         fields = ['id', 'question', 'text', 'score']
@@ -197,8 +191,8 @@ class SubmissionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Submission
-        fields = ['id', 'assignment', 'student', 'student_id', 'submitted_at', 'grade', 'feedback', 'status', 'answers']
-        read_only_fields = ['grade', 'feedback', 'status']
+        fields = ['id', 'assignment', 'student', 'student_id', 'submitted_at', 'grade', 'feedback', 'status', 'is_missing', 'answers']
+        read_only_fields = ['grade', 'feedback', 'status', 'is_missing']
 
     def validate(self, data):
         assignment = data.get('assignment')
@@ -209,12 +203,23 @@ class SubmissionSerializer(serializers.ModelSerializer):
             # self.instance is None for a 'create' operation.
             if self.instance is None and assignment.due_date and timezone.now() > assignment.due_date:
                 raise serializers.ValidationError("作业已过截止日期，无法提交。")
-        
+            if self.instance is None and Submission.objects.filter(assignment=assignment, student=request.user).exists():
+                raise serializers.ValidationError("你已提交过该作业。")
+
+        if assignment and 'answers' in data:
+            answer_key = get_answer_key('assignment', assignment.id)
+            if any(answer['question_id'] not in answer_key for answer in data['answers']):
+                raise serializers.ValidationError("答案中包含不属于该作业的题目。")
+
         return data
 
     def create(self, validated_data):
         answers_data = validated_data.pop('answers')
-        submission = Submission.objects.create(**validated_data)
-        for answer_data in answers_data:
-            Answer.objects.create(submission=submission, **answer_data)
-        return submission
+        submission = Submission(**validated_data)
+        # 在内存中批改后与提交记录一起写入
+        answers = [Answer(**answer_data) for answer_data in answers_data]
+        try:
+            return grade_submission('assignment', submission, answers)
+        except IntegrityError:
+            # The unique_together constraint on ('assignment', 'student') rejects concurrent duplicate submissions.
+            raise serializers.ValidationError("你已提交过该作业。")
@@ -1,12 +1,14 @@
-import json
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db.models import Q
+from courses.membership import get_member_course_ids, is_course_teacher, TEACHER
+from courses.grading import regrade_submissions, list_question_answers, parse_answer_scores, grade_question_answers
+from iclass_server.pagination import GradingPagination
 
-from .models import Assignment, Submission, Answer
+from .models import Assignment, Question, Submission, Answer
 from .serializers import AssignmentSerializer, SubmissionSerializer
 from .permissions import IsTeacherOfCourse, IsSubmissionOwnerOrTeacher, IsEnrolledStudent
 
@@ -31,11 +33,7 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         
         # Further restrict to user's courses if not staff/superuser
         if not (user.is_staff or user.is_superuser):
-            teacher_courses = user.teaching_courses.all()
-            student_courses = user.enrolled_courses.all()
-            queryset = queryset.filter(
-                Q(course__in=teacher_courses) | Q(course__in=student_courses)
-            ).distinct()
+            queryset = queryset.filter(course_id__in=get_member_course_ids(user))
             
         return queryset
 
@@ -48,7 +46,7 @@ class AssignmentViewSet(viewsets.ModelViewSet):
             show_answers = True
         elif user.role == 'student':
             # Show answers if the student has a graded submission or if the due date has passed
-            has_graded_submission = Submission.objects.filter(assignment=instance, student=user, status='graded').exists()
+            has_graded_submission = Submission.objects.filter(assignment=instance, student=user, status='graded', is_missing=False).exists()
             is_past_due = instance.due_date and timezone.now() > instance.due_date
             if has_graded_submission or is_past_due:
                 show_answers = True
@@ -59,6 +57,51 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(instance, context=context)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'])
+    def regrade(self, request, pk=None):
+        """
+        Re-score objective answers of all submissions against the current answer key.
+        Manually graded short-answer scores are kept.
+        """
+        assignment = self.get_object()
+        result = regrade_submissions('assignment', assignment.id)
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get', 'post'], url_path=r'questions/(?P<question_id>\d+)/answers')
+    def question_answers(self, request, pk=None, question_id=None):
+        """
+        Grade one question across all submissions.
+        GET lists the answers to the question, paginated (?ungraded=true for unscored answers only);
+        POST {"scores": [{"id": <answer id>, "score": <score>}, ...]} scores many answers at once.
+        """
+        assignment = self.get_object()
+        # Students may read assignments, only the teacher grades them
+        if not is_course_teacher(request.user, assignment.course_id):
+            return Response({'detail': 'You do not have permission to grade this assignment.'}, status=status.HTTP_403_FORBIDDEN)
+        question = get_object_or_404(Question, pk=question_id, assignment=assignment)
+
+        if request.method == 'GET':
+            answers = list_question_answers('assignment', question.id)
+            if request.query_params.get('ungraded') in ('1', 'true'):
+                answers = answers.filter(score__isnull=True)
+            paginator = GradingPagination()
+            page = paginator.paginate_queryset(answers, request, view=self)
+            response = paginator.get_paginated_response(page)
+            response.data['question'] = {
+                'id': question.id,
+                'text': question.text,
+                'question_type': question.question_type,
+                'points': question.points,
+            }
+            return response
+
+        try:
+            scores = parse_answer_scores(request.data.get('scores', []))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        result = grade_question_answers('assignment', question, scores)
+        return Response(result, status=status.HTTP_200_OK)
+
 class SubmissionViewSet(viewsets.ModelViewSet):
     """
     API endpoint for handling assignment submissions.
@@ -90,8 +133,7 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         elif user.role == 'student':
             queryset = Submission.objects.filter(student=user)
         elif user.role == 'teacher':
-            teacher_courses = user.teaching_courses.all()
-            queryset = Submission.objects.filter(assignment__course__in=teacher_courses)
+            queryset = Submission.objects.filter(assignment__course_id__in=get_member_course_ids(user, TEACHER))
         else:
             queryset = Submission.objects.none()
 
@@ -106,57 +148,10 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # This will call the serializer's create method and save the submission and answers
+        # The serializer grades the answers in memory against the cached answer key
+        # and saves the submission and all answers in one transaction
         submission = serializer.save(student=self.request.user)
 
-        total_score = 0
-        has_manual_grading = False
-
-        for answer in submission.answers.all():
-            question = answer.question
-            is_correct = False
-
-            if question.question_type == 'single_choice':
-                correct_choice = question.choices.filter(is_correct=True).first()
-                if correct_choice and answer.text == str(correct_choice.id):
-                    is_correct = True
-            
-            elif question.question_type == 'multiple_choice':
-                try:
-                    # Frontend sends a sorted JSON array of strings
-                    student_answer_ids = json.loads(answer.text) 
-                    correct_choice_ids = sorted([str(pk) for pk in question.choices.filter(is_correct=True).values_list('id', flat=True)])
-                    
-                    if isinstance(student_answer_ids, list) and student_answer_ids == correct_choice_ids:
-                        is_correct = True
-                except (json.JSONDecodeError, TypeError):
-                    is_correct = False
-
-            elif question.question_type == 'true_false' or question.question_type == 'fill_in_the_blank':
-                if answer.text == question.correct_answer:
-                    is_correct = True
-
-            elif question.question_type == 'short_answer':
-                has_manual_grading = True
-                continue
-
-            if is_correct:
-                answer.score = question.points
-            else:
-                answer.score = 0
-            
-            answer.save()
-            if answer.score:
-                total_score += answer.score
-
-        submission.grade = total_score
-        if has_manual_grading:
-            submission.status = 'submitted'
-        else:
-            submission.status = 'graded'
-        
-        submission.save()
-
         # Re-serialize to return the updated data
         response_serializer = self.get_serializer(submission)
         headers = self.get_success_headers(response_serializer.data)
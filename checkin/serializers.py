@@ -1,15 +1,16 @@
 from rest_framework import serializers
 from .models import Checkin, CheckinRecord
 from users.serializers import UserSerializer
+from iclass_server.serializers import DynamicFieldsMixin
 
-class CheckinRecordSerializer(serializers.ModelSerializer):
+class CheckinRecordSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     student = UserSerializer(read_only=True)
 
     class Meta:
         model = CheckinRecord
         fields = ('id', 'student', 'checkin_time', 'status', 'is_manual')
 
-class CheckinSerializer(serializers.ModelSerializer):
+class CheckinSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     records = CheckinRecordSerializer(many=True, read_only=True)
     is_checked_in = serializers.SerializerMethodField()
     task_type = serializers.SerializerMethodField()
@@ -18,6 +19,7 @@ class CheckinSerializer(serializers.ModelSerializer):
         model = Checkin
         fields = ('id', 'title', 'start_time', 'end_time', 'is_active', 'records', 'is_checked_in', 'course', 'task_type')
         read_only_fields = ('start_time', 'is_active', 'records', 'course')
+        expandable_fields = ('records',)
 
     def get_task_type(self, obj):
         return 'checkin'
@@ -0,0 +1,89 @@
+from django.db import models, transaction
+from assignments.models import Assignment, Question, Choice
+from exams.models import Exam, ExamQuestion, ExamChoice
+from feedback.models import Questionnaire, FeedbackQuestion
+from .models import Course, CourseMaterial, Chapter, SubmissionCounters
+from .search import index_documents
+from .storage import acquire_blobs
+from .storage_usage import MEDIA_FILE_FIELDS, rebuild_course_storage
+
+BATCH_SIZE = 500
+
+
+def _bulk_clone(queryset, **remap):
+    """
+    用 bulk_create 复制查询集中的记录，返回 (新记录列表, {旧 ID: 新 ID})。
+
+    remap 指定要替换的外键：{字段 attname: {旧 ID: 新 ID}} 或直接给出新值。
+    """
+    model = queryset.model
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    originals = list(queryset.order_by('pk'))
+    copies = []
+    for obj in originals:
+        values = {}
+        for field in fields:
+            value = getattr(obj, field.attname)
+            # 文件字段只复制存储路径，新旧记录引用同一个内容寻址文件
+            values[field.attname] = value.name if isinstance(field, models.FileField) else value
+        for attname, mapping in remap.items():
+            if isinstance(mapping, dict):
+                values[attname] = mapping.get(values[attname])
+            else:
+                values[attname] = mapping
+        copies.append(model(**values))
+    model.objects.bulk_create(copies, batch_size=BATCH_SIZE)
+    return copies, {obj.pk: copy.pk for obj, copy in zip(originals, copies)}
+
+
+def _clone_chapters(source, target):
+    """
+    按层级复制章节树：每层一次查询和一次批量插入，父章节 ID 映射到上一层的新记录
+    """
+    chapters = []
+    chapter_map = {}
+    level = Chapter.objects.filter(course=source, parent__isnull=True)
+    while True:
+        copies, mapping = _bulk_clone(level, course_id=target.id, parent_id=chapter_map)
+        if not mapping:
+            break
+        chapters += copies
+        chapter_map.update(mapping)
+        level = Chapter.objects.filter(parent_id__in=list(mapping))
+    return chapters
+
+
+def clone_course(source, teacher, name=None):
+    """
+    把课程内容（章节、资料、作业、考试、问卷）复制到新课程，不复制学生、提交记录和讨论。
+
+    每个模型按层级各一次查询和一次 bulk_create，查询次数与内容多少无关。
+    bulk_create 不发送 post_save，文件引用计数、存储用量和全文索引在这里批量维护。
+    """
+    with transaction.atomic():
+        course = Course.objects.create(name=name or source.name, teacher=teacher, cover=source.cover)
+
+        chapters = _clone_chapters(source, course)
+        materials, _ = _bulk_clone(CourseMaterial.objects.filter(course=source), course_id=course.id)
+
+        # 新课程没有提交记录，计数器归零；截止时间尚未处理，由调度器为新课程的学生生成 0 分记录
+        counters = {**dict.fromkeys(SubmissionCounters.COUNTER_FIELDS, 0), 'deadline_processed_at': None}
+        _, assignment_map = _bulk_clone(Assignment.objects.filter(course=source), course_id=course.id, **counters)
+        _, question_map = _bulk_clone(Question.objects.filter(assignment_id__in=list(assignment_map)), assignment_id=assignment_map)
+        _bulk_clone(Choice.objects.filter(question_id__in=list(question_map)), question_id=question_map)
+
+        _, exam_map = _bulk_clone(Exam.objects.filter(course=source), course_id=course.id, **counters)
+        _, exam_question_map = _bulk_clone(ExamQuestion.objects.filter(exam_id__in=list(exam_map)), exam_id=exam_map)
+        _bulk_clone(ExamChoice.objects.filter(question_id__in=list(exam_question_map)), question_id=exam_question_map)
+
+        _, questionnaire_map = _bulk_clone(Questionnaire.objects.filter(course=source), course_id=course.id)
+        _bulk_clone(FeedbackQuestion.objects.filter(questionnaire_id__in=list(questionnaire_map)), questionnaire_id=questionnaire_map)
+
+        acquire_blobs(
+            getattr(obj, field).name
+            for obj in materials + chapters
+            for field in MEDIA_FILE_FIELDS[type(obj)]
+        )
+        rebuild_course_storage([course.id])
+        index_documents(materials + chapters)
+    return course
@@ -0,0 +1,204 @@
+import datetime
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from assignments.models import Assignment, Submission
+from exams.models import Exam, ExamSubmission
+from exams.drafts import submit_drafts, flush_pending_drafts
+from .models import Course
+from .submission_counters import COUNTER_SOURCES, adjust_submission_counters
+
+# 作业或考试模型 -> 截止时间字段；过了截止时间仍未提交的学生记 0 分
+DEADLINE_FIELDS = {
+    Assignment: 'due_date',
+    Exam: 'end_time',
+}
+
+# 作业或考试模型 -> (提交记录模型, 指向它的外键)
+SUBMISSION_SOURCES = {paper_model: (submission_model, paper_field) for submission_model, (paper_model, paper_field) in COUNTER_SOURCES.items()}
+
+
+def _answer_deadline(start_time, time_limit):
+    return start_time + datetime.timedelta(minutes=time_limit)
+
+
+def _answer_deadlines():
+    """
+    正在作答的考试提交 {ID: 作答截止时间}
+    """
+    rows = ExamSubmission.objects.filter(status='taking').values_list('id', 'start_time', 'exam__time_limit')
+    return {submission_id: _answer_deadline(start_time, time_limit) for submission_id, start_time, time_limit in rows}
+
+
+def auto_submit_expired_exams(now=None):
+    """
+    替超过考试时长仍未交卷的学生交卷：合并暂存答案后评分，提交时间记为作答截止时间。
+
+    与 ExamSubmissionViewSet.check_can_answer 一致，作答截止时间为开始时间加考试时长。
+    返回交卷份数。
+    """
+    now = now or timezone.now()
+    expired = {submission_id: deadline for submission_id, deadline in _answer_deadlines().items() if deadline <= now}
+    submitted = 0
+    for submission_id, deadline in expired.items():
+        with transaction.atomic():
+            # 锁定后重新检查状态，学生可能刚好自己交了卷
+            submission = ExamSubmission.objects.select_for_update().filter(pk=submission_id, status='taking').first()
+            if submission is None:
+                continue
+            submit_drafts(submission, submitted_at=deadline)
+            submitted += 1
+    return submitted
+
+
+def _due_papers(paper_model, now):
+    """
+    已截止、且截止后尚未处理过的作业或考试 [(ID, 课程 ID)]；截止时间延后的会在新的截止时间后重新处理
+    """
+    deadline_field = DEADLINE_FIELDS[paper_model]
+    return list(
+        paper_model.objects.filter(**{f'{deadline_field}__lte': now})
+        .filter(Q(deadline_processed_at__isnull=True) | Q(deadline_processed_at__lt=F(deadline_field)))
+        .values_list('id', 'course_id')
+    )
+
+
+def _missing_counts(submission_model, paper_field, paper_ids):
+    """
+    {作业或考试 ID: 0 分记录数}
+    """
+    rows = (
+        submission_model.objects.filter(**{f'{paper_field}__in': paper_ids}, is_missing=True)
+        .values(paper_field).annotate(count=Count('id')).values_list(paper_field, 'count')
+    )
+    return dict(rows)
+
+
+def _create_missing_submissions(submission_model, papers, rosters, batch_size=500):
+    """
+    为 papers（[(作业或考试 ID, 课程 ID)]）中 rosters（{课程 ID: [学生 ID]}）里没有提交记录的学生
+    批量写入 0 分的已批改记录（is_missing=True），返回写入的记录数。
+
+    先锁定作业或考试，调度器与学生加入课程时的补写互斥；学生可能在读取已有记录后刚好提交，
+    由 (作业或考试, 学生) 的唯一约束和 ignore_conflicts 跳过这些记录。
+    bulk_create 不发送信号且不返回跳过了哪些记录，因此按写入前后的 0 分记录数在同一事务中更新计数器。
+    """
+    paper_model, paper_field = COUNTER_SOURCES[submission_model]
+    paper_ids = [paper_id for paper_id, _ in papers]
+
+    with transaction.atomic():
+        list(paper_model.objects.select_for_update().filter(id__in=paper_ids).order_by('id').values_list('id', flat=True))
+        existing = set(
+            submission_model.objects.filter(**{f'{paper_field}__in': paper_ids}).values_list(paper_field, 'student_id')
+        )
+        records = [
+            submission_model(**{paper_field: paper_id}, student_id=student_id, status='graded', grade=0, is_missing=True)
+            for paper_id, course_id in papers
+            for student_id in rosters.get(course_id, [])
+            if (paper_id, student_id) not in existing
+        ]
+        if not records:
+            return 0
+
+        before = _missing_counts(submission_model, paper_field, paper_ids)
+        submission_model.objects.bulk_create(records, batch_size=batch_size, ignore_conflicts=True)
+        after = _missing_counts(submission_model, paper_field, paper_ids)
+        created = 0
+        for paper_id, count in after.items():
+            delta = count - before.get(paper_id, 0)
+            if delta:
+                adjust_submission_counters(submission_model, paper_id, None, 'graded', count=delta, is_missing=True)
+                created += delta
+    return created
+
+
+def materialize_missing_submissions(now=None, batch_size=500):
+    """
+    为已截止的作业和考试中没有提交记录的学生写入 0 分记录，之后读取成绩时不必再用课程名单和提交记录求差集。
+
+    待处理的作业或考试、课程名单、已有提交记录各查询一次后批量写入。
+    返回 {作业或考试模型名: 写入的记录数}。
+    """
+    now = now or timezone.now()
+    created = {}
+    for submission_model, (paper_model, _) in COUNTER_SOURCES.items():
+        papers = _due_papers(paper_model, now)
+        created[paper_model._meta.model_name] = 0
+        if not papers:
+            continue
+
+        rosters = defaultdict(list)
+        enrollments = Course.objects.filter(id__in={course_id for _, course_id in papers}, students__isnull=False)
+        for course_id, student_id in enrollments.values_list('id', 'students'):
+            rosters[course_id].append(student_id)
+
+        with transaction.atomic():
+            created[paper_model._meta.model_name] = _create_missing_submissions(submission_model, papers, rosters, batch_size)
+            paper_model.objects.filter(
+                id__in=[paper_id for paper_id, _ in papers], **{f'{DEADLINE_FIELDS[paper_model]}__lte': now}
+            ).update(deadline_processed_at=now)
+    return created
+
+
+def materialize_enrolled_students(course_id, student_ids, now=None):
+    """
+    学生加入课程时，为课程中已经处理过截止时间的作业和考试补写 0 分记录；
+    尚未处理的作业和考试由调度器下次运行时统一处理
+    """
+    now = now or timezone.now()
+    for submission_model, (paper_model, _) in COUNTER_SOURCES.items():
+        deadline_field = DEADLINE_FIELDS[paper_model]
+        papers = list(
+            paper_model.objects.filter(
+                course_id=course_id, **{f'{deadline_field}__lte': now}, deadline_processed_at__gte=F(deadline_field)
+            ).values_list('id', 'course_id')
+        )
+        if papers:
+            _create_missing_submissions(submission_model, papers, {course_id: list(student_ids)})
+
+
+def discard_missing_submissions(paper):
+    """
+    作业或考试的截止时间延后（或考试取消结束时间）后删除已生成的 0 分记录，学生可以重新提交，
+    并清除处理时间，新的截止时间到期后重新处理
+    """
+    deadline = getattr(paper, DEADLINE_FIELDS[type(paper)])
+    if deadline is not None and deadline <= timezone.now():
+        return
+    submission_model, paper_field = SUBMISSION_SOURCES[type(paper)]
+    # 逐条删除以发送 post_delete，由 courses.signals 更新计数器和学习记录
+    submission_model.objects.filter(**{paper_field: paper.pk}, is_missing=True).delete()
+    if paper.deadline_processed_at is not None:
+        type(paper).objects.filter(pk=paper.pk).update(deadline_processed_at=None)
+        paper.deadline_processed_at = None
+
+
+def run_due_deadlines(now=None):
+    """
+    处理所有已到期的截止时间：先替超时的考试交卷，再为未提交的学生生成 0 分记录，
+    最后把正在进行的考试中尚未写库的暂存答案写库
+    """
+    now = now or timezone.now()
+    return {
+        'auto_submitted': auto_submit_expired_exams(now),
+        'materialized': materialize_missing_submissions(now),
+        'drafts_flushed': flush_pending_drafts(),
+    }
+
+
+def next_deadline(now=None):
+    """
+    now 之后最近的截止时间：作业截止、考试结束或正在进行的考试作答截止，没有时返回 None。
+    有正在进行的考试时，最迟在一个暂存答案写库间隔后再次运行
+    """
+    now = now or timezone.now()
+    answer_deadlines = _answer_deadlines()
+    candidates = [
+        Assignment.objects.filter(due_date__gt=now).aggregate(deadline=Min('due_date'))['deadline'],
+        Exam.objects.filter(end_time__gt=now).aggregate(deadline=Min('end_time'))['deadline'],
+        min((deadline for deadline in answer_deadlines.values() if deadline > now), default=None),
+        now + datetime.timedelta(seconds=settings.EXAM_DRAFT_FLUSH_INTERVAL) if answer_deadlines else None,
+    ]
+    return min((deadline for deadline in candidates if deadline is not None), default=None)
@@ -0,0 +1,143 @@
+import warnings
+import numpy as np
+from django.db.models import Sum
+from django.utils import timezone
+from assignments.models import Assignment, Submission
+from exams.models import Exam, ExamSubmission
+
+PERCENTILES = [25, 50, 75, 90]
+HISTOGRAM_BINS = 10
+
+
+def _load_items(course):
+    """
+    返回课程的作业和考试 [(类型, ID, 标题, 截止时间, 满分)]，作业在前，各自按 ID 排序
+    """
+    items = []
+    assignments = Assignment.objects.filter(course=course).annotate(total_points=Sum('questions__points')).order_by('id')
+    for assignment in assignments.values_list('id', 'title', 'due_date', 'total_points'):
+        items.append(('assignment', *assignment))
+    exams = Exam.objects.filter(course=course).annotate(total_points=Sum('questions__points')).order_by('id')
+    for exam in exams.values_list('id', 'title', 'end_time', 'total_points'):
+        items.append(('exam', *exam))
+    return items
+
+
+def build_grade_matrix(course, students, items):
+    """
+    用两次查询（作业提交、考试提交）载入成绩，返回 学生 × (作业 + 考试) 的 float 矩阵。
+
+    未提交且已过截止时间的记为 0，与截止时间调度器（courses.deadlines）写入的 0 分记录和作业、考试序列化器一致；
+    未提交且未截止、已提交但未评分的为 NaN。
+    """
+    student_index = {student_id: row for row, (student_id, _) in enumerate(students)}
+    item_index = {(kind, item_id): column for column, (kind, item_id, *_) in enumerate(items)}
+    matrix = np.full((len(students), len(items)), np.nan)
+    submitted = np.zeros(matrix.shape, dtype=bool)
+
+    sources = [
+        ('assignment', Submission.objects.filter(assignment__course=course).values_list('assignment_id', 'student_id', 'grade')),
+        ('exam', ExamSubmission.objects.filter(exam__course=course).values_list('exam_id', 'student_id', 'grade')),
+    ]
+    for kind, rows in sources:
+        for item_id, student_id, grade in rows:
+            row = student_index.get(student_id)
+            if row is None:
+                # 已退课学生的提交不计入
+                continue
+            column = item_index[(kind, item_id)]
+            submitted[row, column] = True
+            if grade is not None:
+                matrix[row, column] = grade
+
+    now = timezone.now()
+    past_due = np.array([deadline is not None and now > deadline for _, _, _, deadline, _ in items], dtype=bool)
+    matrix[~submitted & past_due] = 0
+    return matrix
+
+
+def _to_list(values):
+    return [None if np.isnan(value) else round(value, 2) for value in values.tolist()]
+
+
+def compute_item_stats(matrix, points):
+    """
+    按列（作业或考试）计算统计量，忽略 NaN；直方图按满分的 10% 分段
+    """
+    with warnings.catch_warnings():
+        # 没有任何成绩的列会产生 All-NaN 警告，结果为 NaN，输出为 None
+        warnings.simplefilter('ignore', RuntimeWarning)
+        counts = np.count_nonzero(~np.isnan(matrix), axis=0)
+        means = np.nanmean(matrix, axis=0)
+        medians = np.nanmedian(matrix, axis=0)
+        stds = np.nanstd(matrix, axis=0)
+        mins = np.nanmin(matrix, axis=0) if matrix.size else np.full(matrix.shape[1], np.nan)
+        maxs = np.nanmax(matrix, axis=0) if matrix.size else np.full(matrix.shape[1], np.nan)
+        percentiles = np.nanpercentile(matrix, PERCENTILES, axis=0) if matrix.size else np.full((len(PERCENTILES), matrix.shape[1]), np.nan)
+
+    # 满分为 0 的项目（题目都未设分值）按该列最高分分段
+    scale = np.where(points > 0, points, np.nan_to_num(maxs, nan=0))
+    scale = np.where(scale > 0, scale, 1)
+    rows, columns = np.nonzero(~np.isnan(matrix))
+    bins = np.clip((matrix[rows, columns] / scale[columns] * HISTOGRAM_BINS).astype(int), 0, HISTOGRAM_BINS - 1)
+    histograms = np.bincount(columns * HISTOGRAM_BINS + bins, minlength=matrix.shape[1] * HISTOGRAM_BINS)
+    histograms = histograms.reshape(matrix.shape[1], HISTOGRAM_BINS)
+
+    columns = zip(
+        counts.tolist(), _to_list(means), _to_list(medians), _to_list(stds), _to_list(mins), _to_list(maxs),
+        zip(*(_to_list(values) for values in percentiles)), scale.tolist(), histograms.tolist(),
+    )
+    return [
+        {
+            'count': count,
+            'mean': mean,
+            'median': median,
+            'stddev': stddev,
+            'min': minimum,
+            'max': maximum,
+            'percentiles': dict(zip((f'p{p}' for p in PERCENTILES), item_percentiles)),
+            'histogram': {
+                'bin_edges': _to_list(np.linspace(0, item_scale, HISTOGRAM_BINS + 1)),
+                'counts': item_histogram,
+            },
+        }
+        for count, mean, median, stddev, minimum, maximum, item_percentiles, item_scale, item_histogram in columns
+    ]
+
+
+def build_gradebook(course):
+    """
+    课程成绩册：学生 × (作业 + 考试) 成绩矩阵、每项统计和每名学生的总分
+    """
+    students = list(course.students.order_by('id').values_list('id', 'username'))
+    items = _load_items(course)
+    matrix = build_grade_matrix(course, students, items)
+    points = np.array([total_points or 0 for *_, total_points in items], dtype=float)
+
+    # 每名学生只统计已有成绩的项目：总分、对应满分和得分率
+    graded = ~np.isnan(matrix)
+    totals = np.nansum(matrix, axis=1)
+    possible = graded.astype(float) @ points
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = np.where(possible > 0, totals / possible * 100, np.nan)
+
+    item_stats = compute_item_stats(matrix, points)
+    totals, possible, percentages = _to_list(totals), _to_list(possible), _to_list(percentages)
+    return {
+        'items': [
+            {'type': kind, 'id': item_id, 'title': title, 'deadline': deadline, 'total_points': int(points[column]), 'stats': item_stats[column]}
+            for column, (kind, item_id, title, deadline, _) in enumerate(items)
+        ],
+        'students': [
+            {
+                'id': student_id,
+                'username': username,
+                'total': totals[row],
+                'possible': possible[row],
+                'percentage': percentages[row],
+                'graded_count': int(graded[row].sum()),
+            }
+            for row, (student_id, username) in enumerate(students)
+        ],
+        'grades': [_to_list(row) for row in matrix],
+    }
@@ -0,0 +1,312 @@
+import json
+import math
+import numpy as np
+from collections import defaultdict
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from assignments.models import Question, Choice, Answer
+from exams.models import ExamQuestion, ExamChoice, ExamAnswer
+from .submission_counters import adjust_submission_counters
+
+CACHE_ALIAS = 'grading'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# 需要教师手动批改的题型
+MANUAL_QUESTION_TYPES = ('short_answer',)
+
+# 试卷类型 -> (题目模型, 选项模型, 答案模型, 题目和提交记录指向试卷的外键)
+ANSWER_KEY_SOURCES = {
+    'assignment': (Question, Choice, Answer, 'assignment_id'),
+    'exam': (ExamQuestion, ExamChoice, ExamAnswer, 'exam_id'),
+}
+
+
+def _cache_key(kind, paper_id):
+    return f'grading:answer_key:{kind}:{paper_id}'
+
+
+def item_analysis_cache_key(kind, paper_id):
+    return f'grading:item_analysis:{kind}:{paper_id}'
+
+
+def _sort_choice_ids(choice_ids):
+    return tuple(sorted((str(choice_id) for choice_id in choice_ids), key=lambda value: (len(value), value)))
+
+
+def compile_answer_key(kind, paper_id):
+    """
+    用两次查询把作业或考试的标准答案编译为 {question_id: (题型, 分值, 标准答案)}。
+
+    标准答案：单选题为正确选项 ID 字符串，多选题为排序后的正确选项 ID 元组，
+    判断题和填空题为 correct_answer，简答题为 None。
+    """
+    question_model, choice_model, _, paper_field = ANSWER_KEY_SOURCES[kind]
+    correct_choices = defaultdict(list)
+    rows = choice_model.objects.filter(**{f'question__{paper_field}': paper_id}, is_correct=True).values_list('question_id', 'id')
+    for question_id, choice_id in rows:
+        correct_choices[question_id].append(choice_id)
+
+    answer_key = {}
+    rows = question_model.objects.filter(**{paper_field: paper_id}).values_list('id', 'question_type', 'points', 'correct_answer')
+    for question_id, question_type, points, correct_answer in rows:
+        choice_ids = _sort_choice_ids(correct_choices.get(question_id, ()))
+        if question_type == 'single_choice':
+            expected = choice_ids[0] if choice_ids else None
+        elif question_type == 'multiple_choice':
+            expected = choice_ids
+        elif question_type in MANUAL_QUESTION_TYPES:
+            expected = None
+        else:
+            expected = correct_answer
+        answer_key[question_id] = (question_type, points, expected)
+    return answer_key
+
+
+def get_answer_key(kind, paper_id):
+    """
+    返回缓存的标准答案；题目或选项变化时由 courses.signals 清除
+    """
+    cache = caches[CACHE_ALIAS]
+    answer_key = cache.get(_cache_key(kind, paper_id))
+    if answer_key is None:
+        answer_key = compile_answer_key(kind, paper_id)
+        cache.set(_cache_key(kind, paper_id), answer_key, CACHE_TIMEOUT)
+    return answer_key
+
+
+def invalidate_answer_key(kind, paper_id):
+    # 事务提交后再清除，避免其他进程在提交前把旧答案重新写入缓存；
+    # 依赖标准答案和得分的题目分析一并清除（重新评分结束时也会调用）
+    keys = [_cache_key(kind, paper_id), item_analysis_cache_key(kind, paper_id)]
+    transaction.on_commit(lambda: caches[CACHE_ALIAS].delete_many(keys))
+
+
+def invalidate_item_analysis(kind, paper_id):
+    # 有新提交或成绩变化时清除题目分析
+    transaction.on_commit(lambda: caches[CACHE_ALIAS].delete(item_analysis_cache_key(kind, paper_id)))
+
+
+def score_answer(entry, text):
+    """
+    按编译好的标准答案给单个答案评分，需要手动批改的题目返回 None
+    """
+    question_type, points, expected = entry
+    if question_type in MANUAL_QUESTION_TYPES:
+        return None
+    if question_type == 'single_choice':
+        correct = expected is not None and text == expected
+    elif question_type == 'multiple_choice':
+        try:
+            # 前端提交 JSON 数组，如 ["3", "5"]
+            selected = json.loads(text)
+            correct = isinstance(selected, list) and _sort_choice_ids(selected) == expected
+        except (TypeError, ValueError):
+            correct = False
+    else:
+        correct = text == expected
+    return points if correct else 0
+
+
+def grade_answers(answer_key, answers):
+    """
+    在内存中批改一组答案（设置 answer.score），返回 (客观题总分, 是否包含需手动批改的题目)
+    """
+    total = 0
+    needs_manual_grading = False
+    for answer in answers:
+        entry = answer_key.get(answer.question_id)
+        if entry is None:
+            answer.score = 0
+            continue
+        score = score_answer(entry, answer.text)
+        if score is None:
+            needs_manual_grading = True
+            continue
+        answer.score = score
+        total += score
+    return total, needs_manual_grading
+
+
+def grade_submission(kind, submission, answers):
+    """
+    批改整份提交并在一个事务中写入：保存提交记录，再用 bulk_create 写入全部答案。
+
+    answers 为尚未保存的答案实例；含简答题时提交状态为 submitted，等待教师批改。
+    """
+    _, _, answer_model, paper_field = ANSWER_KEY_SOURCES[kind]
+    answer_key = get_answer_key(kind, getattr(submission, paper_field))
+    total, needs_manual_grading = grade_answers(answer_key, answers)
+    submission.grade = total
+    submission.status = 'submitted' if needs_manual_grading else 'graded'
+
+    with transaction.atomic():
+        submission.save()
+        for answer in answers:
+            answer.submission = submission
+        answer_model.objects.bulk_create(answers)
+    return submission
+
+
+def _canonical_answer(question_type, text):
+    """
+    把学生答案统一为可直接与标准答案比较的字符串：多选题解析 JSON 后按选项 ID 排序拼接
+    """
+    if question_type != 'multiple_choice':
+        return text
+    try:
+        selected = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    return ','.join(_sort_choice_ids(selected)) if isinstance(selected, list) else None
+
+
+def _canonical_expected(entry):
+    question_type, _, expected = entry
+    return ','.join(expected) if question_type == 'multiple_choice' else expected
+
+
+def regrade_submissions(kind, paper_id, batch_size=500):
+    """
+    标准答案修改后重新计算所有已提交答卷的客观题得分和总分。
+
+    客观题答案一次性载入，把学生答案和标准答案映射为同一套整数编码后用 NumPy 数组比较；
+    简答题保留教师手动给出的分数。只分批写回发生变化的得分和总分，返回变化数量。
+    """
+    _, _, answer_model, paper_field = ANSWER_KEY_SOURCES[kind]
+    submission_model = answer_model.submission.field.related_model
+    # 不使用缓存，按数据库中的最新题目和选项编译
+    answer_key = compile_answer_key(kind, paper_id)
+    objective_ids = [question_id for question_id, entry in answer_key.items() if entry[0] not in MANUAL_QUESTION_TYPES]
+
+    submissions = submission_model.objects.filter(**{paper_field: paper_id}, status__in=['submitted', 'graded'])
+    submission_rows = list(submissions.values_list('id', 'grade'))
+    if not submission_rows:
+        return {'answers_changed': 0, 'submissions_changed': 0}
+    submission_ids = np.array([submission_id for submission_id, _ in submission_rows], dtype=np.int64)
+    old_grades = np.array([np.nan if grade is None else grade for _, grade in submission_rows], dtype=float)
+    submission_index = {submission_id: index for index, (submission_id, _) in enumerate(submission_rows)}
+
+    answers = answer_model.objects.filter(submission__in=submissions)
+    objective_rows = list(answers.filter(question_id__in=objective_ids).values_list('id', 'submission_id', 'question_id', 'text', 'score'))
+    manual_rows = [
+        (submission_index[submission_id], score)
+        for submission_id, score in answers.exclude(question_id__in=objective_ids).values_list('submission_id', 'score')
+        if score is not None
+    ]
+
+    # 空答案和无标准答案分别编码为 -1 和 -2，二者永不相等
+    codes = {}
+    expected_codes = np.array(
+        [codes.setdefault(value, len(codes)) if value is not None else -2
+         for value in (_canonical_expected(answer_key[question_id]) for question_id in objective_ids)],
+        dtype=np.int64,
+    )
+    given_codes = np.array(
+        [codes.setdefault(value, len(codes)) if value is not None else -1
+         for value in (_canonical_answer(answer_key[row[2]][0], row[3]) for row in objective_rows)],
+        dtype=np.int64,
+    )
+    points = np.array([answer_key[question_id][1] for question_id in objective_ids], dtype=float)
+    question_index = {question_id: index for index, question_id in enumerate(objective_ids)}
+    positions = np.array([question_index[row[2]] for row in objective_rows], dtype=np.int64)
+    answer_submissions = np.array([submission_index[row[1]] for row in objective_rows], dtype=np.int64)
+    answer_ids = np.array([row[0] for row in objective_rows], dtype=np.int64)
+    old_scores = np.array([np.nan if row[4] is None else row[4] for row in objective_rows], dtype=float)
+
+    new_scores = np.where(given_codes == expected_codes[positions], points[positions], 0.0)
+    score_changed = np.isnan(old_scores) | ~np.isclose(old_scores, new_scores)
+
+    # 按提交记录汇总客观题新得分和简答题原有得分
+    new_grades = np.bincount(answer_submissions, weights=new_scores, minlength=len(submission_rows))
+    if manual_rows:
+        new_grades += np.bincount(
+            np.array([index for index, _ in manual_rows], dtype=np.int64),
+            weights=np.array([score for _, score in manual_rows], dtype=float),
+            minlength=len(submission_rows),
+        )
+    grade_changed = np.isnan(old_grades) | ~np.isclose(old_grades, new_grades)
+
+    with transaction.atomic():
+        answer_model.objects.bulk_update(
+            [answer_model(id=answer_id, score=score)
+             for answer_id, score in zip(answer_ids[score_changed].tolist(), new_scores[score_changed].tolist())],
+            ['score'], batch_size=batch_size,
+        )
+        submission_model.objects.bulk_update(
+            [submission_model(id=submission_id, grade=grade)
+             for submission_id, grade in zip(submission_ids[grade_changed].tolist(), new_grades[grade_changed].tolist())],
+            ['grade'], batch_size=batch_size,
+        )
+    invalidate_answer_key(kind, paper_id)
+    return {'answers_changed': int(score_changed.sum()), 'submissions_changed': int(grade_changed.sum())}
+
+
+def list_question_answers(kind, question_id):
+    """
+    按题批改时列出一道题在所有已提交答卷中的答案，附带学生信息，按提交记录排序
+    """
+    _, _, answer_model, _ = ANSWER_KEY_SOURCES[kind]
+    return (
+        answer_model.objects.filter(question_id=question_id, submission__status__in=['submitted', 'graded'])
+        .annotate(student_id=F('submission__student_id'), student_name=F('submission__student__username'))
+        .order_by('submission_id', 'id')
+        .values('id', 'submission_id', 'student_id', 'student_name', 'text', 'score')
+    )
+
+
+def parse_answer_scores(scores_data):
+    """
+    把 [{id, score}] 解析为 {answer_id: 分数}，数据格式错误时抛出 ValueError
+    """
+    scores = {}
+    for item in scores_data:
+        try:
+            answer_id, score = int(item['id']), float(item['score'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Invalid score data.')
+        if not math.isfinite(score):
+            raise ValueError('Invalid score data.')
+        scores[answer_id] = score
+    return scores
+
+
+def grade_question_answers(kind, question, scores, batch_size=500):
+    """
+    按题批改：scores 为 {answer_id: 分数}，分数截断到 [0, 题目分值]。
+
+    用 bulk_update 写入答案得分，再用一次聚合查询重新计算受影响答卷的总分；
+    所有答案都已有得分的答卷标记为已批改。不属于该题或尚未交卷的答案 ID 在 skipped 中返回。
+    """
+    _, _, answer_model, paper_field = ANSWER_KEY_SOURCES[kind]
+    submission_model = answer_model.submission.field.related_model
+    answers = list(
+        answer_model.objects.filter(question=question, id__in=list(scores), submission__status__in=['submitted', 'graded'])
+        .only('id', 'submission_id')
+    )
+    for answer in answers:
+        answer.score = min(max(scores[answer.id], 0), question.points)
+    skipped = sorted(set(scores) - {answer.id for answer in answers})
+    submission_ids = {answer.submission_id for answer in answers}
+
+    with transaction.atomic():
+        answer_model.objects.bulk_update(answers, ['score'], batch_size=batch_size)
+        totals = list(
+            answer_model.objects.filter(submission_id__in=submission_ids)
+            .values('submission_id')
+            .annotate(total=Sum('score'), pending=Count('id', filter=Q(score__isnull=True)))
+            .order_by()
+        )
+        submission_model.objects.bulk_update(
+            [submission_model(id=row['submission_id'], grade=row['total'] or 0) for row in totals],
+            ['grade'], batch_size=batch_size,
+        )
+        # 只把已全部给分的答卷标记为已批改，不回退教师单独批改过的答卷状态；
+        # update 不发送信号，按实际变化的条数更新计数器
+        graded = submission_model.objects.filter(
+            id__in=[row['submission_id'] for row in totals if not row['pending']], status='submitted',
+        ).update(status='graded')
+        adjust_submission_counters(submission_model, getattr(question, paper_field), 'submitted', 'graded', count=graded)
+    # bulk_update 不发送 post_save，需要手动清除题目分析缓存
+    invalidate_item_analysis(kind, getattr(question, paper_field))
+    return {'answers_updated': len(answers), 'submissions_updated': len(totals), 'skipped': skipped}
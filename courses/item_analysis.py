@@ -0,0 +1,205 @@
+import json
+import warnings
+import numpy as np
+from django.core.cache import caches
+from django.utils import timezone
+from exams.models import ExamQuestion, ExamChoice, ExamSubmission, ExamAnswer
+from .grading import CACHE_ALIAS, CACHE_TIMEOUT, MANUAL_QUESTION_TYPES, item_analysis_cache_key
+
+CHOICE_QUESTION_TYPES = ('single_choice', 'multiple_choice')
+
+# 高分组、低分组各取总分排名前、后 27% 的学生
+GROUP_FRACTION = 0.27
+
+# 题目质量提示的阈值
+TOO_HARD = 0.2
+TOO_EASY = 0.95
+LOW_DISCRIMINATION = 0.2
+
+
+def _round(value):
+    value = float(value)
+    return None if np.isnan(value) else round(value, 3)
+
+
+def _selected_choice_ids(question_type, text):
+    """
+    单选题答案为选项 ID，多选题为 JSON 数组
+    """
+    if question_type == 'single_choice':
+        return [text]
+    try:
+        selected = json.loads(text)
+    except (TypeError, ValueError):
+        return []
+    return [str(choice_id) for choice_id in selected] if isinstance(selected, list) else []
+
+
+def _item_total_correlation(scores, totals):
+    """
+    每题得分与“总分减去本题得分”的相关系数（校正后的点二列相关），只统计该题已评分的答卷
+    """
+    valid = ~np.isnan(scores)
+    x = np.where(valid, scores, 0.0)
+    y = np.where(valid, totals[:, None] - x, 0.0)
+    n = valid.sum(axis=0)
+    sum_x, sum_y = x.sum(axis=0), y.sum(axis=0)
+    covariance = n * (x * y).sum(axis=0) - sum_x * sum_y
+    variance = (n * (x * x).sum(axis=0) - sum_x ** 2) * (n * (y * y).sum(axis=0) - sum_y ** 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(variance > 0, covariance / np.sqrt(variance), np.nan)
+
+
+def _kr20(scores, points, objective):
+    """
+    KR-20 信度：只统计客观题，得满分记为答对
+    """
+    correct = (scores[:, objective] == points[objective]).astype(float)
+    items = correct.shape[1]
+    if items < 2 or correct.shape[0] < 2:
+        return np.nan
+    variance = correct.sum(axis=1).var()
+    if variance == 0:
+        return np.nan
+    p = correct.mean(axis=0)
+    return items / (items - 1) * (1 - (p * (1 - p)).sum() / variance)
+
+
+def compute_item_analysis(exam_id):
+    """
+    对考试所有已提交答卷做题目分析：难度（得分率）、区分度（校正点二列相关和高低分组得分率差）、
+    选择题各选项的选择人数以及 KR-20 信度。
+
+    全部答案一次载入为 答卷 × 题目 的得分矩阵后用 NumPy 计算；未作答记 0 分，
+    尚未批改的简答题不参与该题的统计。
+    """
+    questions = list(ExamQuestion.objects.filter(exam_id=exam_id).order_by('id').values_list('id', 'text', 'question_type', 'points'))
+    choices = list(ExamChoice.objects.filter(question__exam_id=exam_id).order_by('question_id', 'id').values_list('id', 'question_id', 'text', 'is_correct'))
+    # 逾期未提交的 0 分记录没有作答，不参与题目分析
+    submissions = ExamSubmission.objects.filter(exam_id=exam_id, status__in=['submitted', 'graded'], is_missing=False)
+    submission_ids = list(submissions.order_by('id').values_list('id', flat=True))
+    answers = list(
+        ExamAnswer.objects.filter(submission__in=submissions, question__isnull=False)
+        .values_list('submission_id', 'question_id', 'text', 'score')
+    )
+
+    question_index = {question_id: column for column, (question_id, *_) in enumerate(questions)}
+    submission_index = {submission_id: row for row, submission_id in enumerate(submission_ids)}
+    question_types = {question_id: question_type for question_id, _, question_type, _ in questions}
+    points = np.array([question_points for *_, question_points in questions], dtype=float)
+
+    scores = np.zeros((len(submission_ids), len(questions)))
+    rows = np.array([submission_index[answer[0]] for answer in answers], dtype=np.int64)
+    columns = np.array([question_index[answer[1]] for answer in answers], dtype=np.int64)
+    scores[rows, columns] = [np.nan if answer[3] is None else answer[3] for answer in answers]
+    totals = np.nansum(scores, axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        # 没有有效答卷的题目结果为 NaN，输出为 None
+        warnings.simplefilter('ignore', RuntimeWarning)
+        fractions = np.where(points > 0, scores / points, np.nan)
+        difficulty = np.nanmean(fractions, axis=0)
+        correlation = _item_total_correlation(scores, totals)
+
+        # 至少 2 份答卷时才分组，每组至少 1 人
+        is_upper = np.zeros(len(submission_ids))
+        is_lower = np.zeros(len(submission_ids))
+        discrimination = np.full(len(questions), np.nan)
+        if len(submission_ids) >= 2:
+            group_size = max(int(round(len(submission_ids) * GROUP_FRACTION)), 1)
+            order = np.argsort(totals, kind='stable')
+            lower, upper = order[:group_size], order[-group_size:]
+            is_upper[upper] = 1
+            is_lower[lower] = 1
+            discrimination = np.nanmean(fractions[upper], axis=0) - np.nanmean(fractions[lower], axis=0)
+
+    objective = np.array([question_type not in MANUAL_QUESTION_TYPES for _, _, question_type, _ in questions], dtype=bool)
+    kr20 = _kr20(scores, points, objective & (points > 0))
+
+    # 选项选择统计：把每个被选中的选项映射到全局选项下标后用 bincount 计数
+    choice_index = {(question_id, str(choice_id)): index for index, (choice_id, question_id, _, _) in enumerate(choices)}
+    selected_rows, selected_choices = [], []
+    for submission_id, question_id, text, _ in answers:
+        if question_types[question_id] not in CHOICE_QUESTION_TYPES:
+            continue
+        for choice_id in _selected_choice_ids(question_types[question_id], text):
+            index = choice_index.get((question_id, choice_id))
+            if index is not None:
+                selected_rows.append(submission_index[submission_id])
+                selected_choices.append(index)
+    selected_rows = np.array(selected_rows, dtype=np.int64)
+    selected_choices = np.array(selected_choices, dtype=np.int64)
+    choice_counts = np.bincount(selected_choices, minlength=len(choices))
+    upper_counts = np.bincount(selected_choices, weights=is_upper[selected_rows], minlength=len(choices))
+    lower_counts = np.bincount(selected_choices, weights=is_lower[selected_rows], minlength=len(choices))
+
+    question_choices = {question_id: [] for question_id, *_ in questions}
+    for index, (choice_id, question_id, text, is_correct) in enumerate(choices):
+        question_choices[question_id].append({
+            'id': choice_id,
+            'text': text,
+            'is_correct': is_correct,
+            'count': int(choice_counts[index]),
+            'rate': _round(choice_counts[index] / len(submission_ids)) if submission_ids else None,
+            'upper_count': int(upper_counts[index]),
+            'lower_count': int(lower_counts[index]),
+        })
+
+    results = []
+    for column, (question_id, text, question_type, question_points) in enumerate(questions):
+        item = {
+            'id': question_id,
+            'text': text,
+            'question_type': question_type,
+            'points': question_points,
+            'response_count': int(np.count_nonzero(~np.isnan(scores[:, column]))),
+            'difficulty': _round(difficulty[column]),
+            'point_biserial': _round(correlation[column]),
+            'discrimination': _round(discrimination[column]),
+        }
+        if question_type in CHOICE_QUESTION_TYPES:
+            item['choices'] = question_choices[question_id]
+        item['flags'] = _flags(item)
+        results.append(item)
+
+    return {
+        'submission_count': len(submission_ids),
+        'kr20': _round(kr20),
+        'questions': results,
+        'generated_at': timezone.now(),
+    }
+
+
+def _flags(item):
+    """
+    根据统计结果提示可能有问题的题目
+    """
+    flags = []
+    difficulty, correlation = item['difficulty'], item['point_biserial']
+    if difficulty is not None and difficulty < TOO_HARD:
+        flags.append('too_hard')
+    if difficulty is not None and difficulty > TOO_EASY:
+        flags.append('too_easy')
+    if correlation is not None and correlation < 0:
+        flags.append('negative_discrimination')
+    elif correlation is not None and correlation < LOW_DISCRIMINATION:
+        flags.append('low_discrimination')
+    choices = item.get('choices', [])
+    key_upper = max((choice['upper_count'] for choice in choices if choice['is_correct']), default=0)
+    if any(not choice['is_correct'] and choice['upper_count'] > key_upper for choice in choices):
+        # 高分组更多地选择了某个干扰项，标准答案可能设置错误
+        flags.append('possible_miskey')
+    return flags
+
+
+def get_item_analysis(exam_id):
+    """
+    返回缓存的题目分析；有新提交、成绩或标准答案变化时由 courses.signals 和重新评分清除
+    """
+    cache = caches[CACHE_ALIAS]
+    key = item_analysis_cache_key('exam', exam_id)
+    analysis = cache.get(key)
+    if analysis is None:
+        analysis = compute_item_analysis(exam_id)
+        cache.set(key, analysis, CACHE_TIMEOUT)
+    return analysis
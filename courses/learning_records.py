@@ -0,0 +1,292 @@
+from django.db.models import Count, Q
+from django.utils import timezone
+from checkin.models import Checkin, CheckinRecord
+from assignments.models import Assignment, Submission
+from exams.models import Exam, ExamSubmission
+from interaction.models import DiscussionTopic, DiscussionReply
+from .models import Chapter, ChapterReadStatus, LearningRecord
+
+
+def _rate(completed, total):
+    return (completed / total * 100) if total > 0 else 0
+
+
+def _count_by(queryset, key, **annotations):
+    """
+    按 key 分组聚合，返回 {key: {...}}
+    """
+    rows = queryset.values(key).annotate(**annotations).order_by()
+    return {row.pop(key): row for row in rows}
+
+
+def _checkin_counters(course_id, student_ids):
+    return _count_by(
+        CheckinRecord.objects.filter(checkin__course_id=course_id, student_id__in=student_ids),
+        'student_id',
+        checkin_present=Count('id', filter=Q(status='present')),
+        checkin_late=Count('id', filter=Q(status='late')),
+        checkin_sick_leave=Count('id', filter=Q(status='sick_leave')),
+        checkin_personal_leave=Count('id', filter=Q(status='personal_leave')),
+    )
+
+
+def _assignment_counters(course_id, student_ids):
+    return _count_by(
+        # 截止时间调度器生成的 0 分记录不算完成
+        Submission.objects.filter(assignment__course_id=course_id, student_id__in=student_ids, is_missing=False),
+        'student_id',
+        assignments_completed=Count('id'),
+    )
+
+
+def _exam_counters(course_id, student_ids):
+    return _count_by(
+        ExamSubmission.objects.filter(
+            exam__course_id=course_id, student_id__in=student_ids, status__in=['submitted', 'graded'], is_missing=False
+        ),
+        'student_id',
+        exams_completed=Count('id'),
+    )
+
+
+def _topic_counters(course_id, student_ids):
+    return _count_by(
+        DiscussionTopic.objects.filter(course_id=course_id, author_id__in=student_ids),
+        'author_id',
+        topic_count=Count('id'),
+    )
+
+
+def _reply_counters(course_id, student_ids):
+    return _count_by(
+        DiscussionReply.objects.filter(topic__course_id=course_id, author_id__in=student_ids),
+        'author_id',
+        reply_count=Count('id'),
+    )
+
+
+def _chapter_counters(course_id, student_ids):
+    # 任务点被定义为有父级的章节（即“节”）
+    return _count_by(
+        ChapterReadStatus.objects.filter(chapter__course_id=course_id, chapter__parent__isnull=False, user_id__in=student_ids),
+        'user_id',
+        chapters_completed=Count('id'),
+    )
+
+
+# 每个统计维度对应一次按学生分组的聚合查询
+COUNTER_DIMENSIONS = {
+    'checkin': _checkin_counters,
+    'assignment': _assignment_counters,
+    'exam': _exam_counters,
+    'topic': _topic_counters,
+    'reply': _reply_counters,
+    'chapter': _chapter_counters,
+}
+
+
+def collect_student_counters(course_id, student_ids, dimensions=None):
+    """
+    从原始数据计算学生的学习记录计数器，返回 {student_id: {字段: 值}}
+    """
+    dimensions = dimensions or COUNTER_DIMENSIONS.keys()
+    counters = {student_id: {} for student_id in student_ids}
+    for dimension in dimensions:
+        rows = COUNTER_DIMENSIONS[dimension](course_id, student_ids)
+        for student_id, values in counters.items():
+            values.update(rows.get(student_id, {}))
+    # 没有任何记录的维度计为 0
+    for values in counters.values():
+        for field in LearningRecord.COUNTER_FIELDS:
+            values.setdefault(field, 0)
+    return counters
+
+
+def refresh_learning_record(course_id, student_id, dimension):
+    """
+    重新计算单个学生某一维度的计数器并写入汇总表。
+
+    只更新已存在的汇总行；新行由选课信号或 rebuild_learning_records 命令创建。
+    """
+    record = LearningRecord.objects.filter(course_id=course_id, student_id=student_id)
+    if not record.exists():
+        return
+    counters = collect_student_counters(course_id, [student_id], [dimension])[student_id]
+    values = {field: counters[field] for field in LearningRecord.DIMENSION_FIELDS[dimension]}
+    record.update(updated_at=timezone.now(), **values)
+
+
+def create_learning_records(course_id, student_ids):
+    """
+    为学生创建完整计算的汇总行，已存在的行保持不变
+    """
+    counters = collect_student_counters(course_id, student_ids)
+    LearningRecord.objects.bulk_create(
+        [LearningRecord(course_id=course_id, student_id=student_id, **values) for student_id, values in counters.items()],
+        ignore_conflicts=True,
+    )
+
+
+def build_learning_records(course, students):
+    """
+    批量计算学生的学习记录。
+
+    优先读取增量维护的 LearningRecord 汇总行，缺失汇总行的学生按维度分组聚合实时计算，
+    查询次数与学生人数无关。
+    """
+    students = list(students)
+    student_ids = [student.id for student in students]
+
+    total_checkins = Checkin.objects.filter(course=course).count()
+    total_assignments = Assignment.objects.filter(course=course).count()
+    total_exams = Exam.objects.filter(course=course).count()
+    # 任务点被定义为有父级的章节（即“节”）
+    total_chapters = Chapter.objects.filter(course=course, parent__isnull=False).count()
+
+    counters = {
+        row['student_id']: row
+        for row in LearningRecord.objects.filter(course=course, student_id__in=student_ids)
+        .values('student_id', *LearningRecord.COUNTER_FIELDS)
+    }
+    missing_ids = [student_id for student_id in student_ids if student_id not in counters]
+    if missing_ids:
+        counters.update(collect_student_counters(course.id, missing_ids))
+
+    learning_records = []
+    for student in students:
+        values = counters[student.id]
+
+        # 1. 签到统计
+        checkin_summary = {
+            'total': total_checkins,
+            'present': values['checkin_present'],
+            'late': values['checkin_late'],
+            'absent': total_checkins - (
+                values['checkin_present'] + values['checkin_late']
+                + values['checkin_sick_leave'] + values['checkin_personal_leave']
+            ),
+            'sick_leave': values['checkin_sick_leave'],
+            'personal_leave': values['checkin_personal_leave'],
+        }
+        attendance_count = checkin_summary['present'] + checkin_summary['late']
+        checkin_summary['attendance_rate'] = _rate(attendance_count, total_checkins)
+
+        # 2. 作业统计
+        assignment_summary = {
+            'total': total_assignments,
+            'completed': values['assignments_completed'],
+            'completion_rate': _rate(values['assignments_completed'], total_assignments),
+        }
+
+        # 3. 考试统计
+        exam_summary = {
+            'total': total_exams,
+            'completed': values['exams_completed'],
+            'completion_rate': _rate(values['exams_completed'], total_exams),
+        }
+
+        # 4. 讨论统计
+        discussion_summary = {
+            'topic_count': values['topic_count'],
+            'reply_count': values['reply_count'],
+        }
+
+        # 5. 章节任务点统计
+        if total_chapters == 0:
+            chapter_summary = {'completed': 0, 'total': 0, 'completion_rate': 0}
+        else:
+            chapter_summary = {
+                'completed': values['chapters_completed'],
+                'total': total_chapters,
+                'completion_rate': _rate(values['chapters_completed'], total_chapters),
+            }
+
+        learning_records.append({
+            'student_id': student.id,
+            'student_name': student.get_full_name() or student.username,
+            'checkin_summary': checkin_summary,
+            'assignment_summary': assignment_summary,
+            'exam_summary': exam_summary,
+            'discussion_summary': discussion_summary,
+            'chapter_summary': chapter_summary,
+        })
+    return learning_records
+
+
+EXPORT_HEADERS = [
+    '学生ID', '用户名', '学号', '姓名',
+    '签到总数', '出勤', '迟到', '缺勤', '病假', '事假', '出勤率(%)',
+    '作业总数', '已交作业', '作业完成率(%)',
+    '考试总数', '已完成考试', '考试完成率(%)',
+    '发布话题', '回复数',
+    '任务点总数', '已完成任务点', '任务点完成率(%)',
+]
+
+
+def iter_learning_record_rows(course, batch_size=500):
+    """
+    逐批生成课程学习记录和作业/考试成绩的导出行（第一行为表头）。
+
+    学生按 ID 分批处理，每批的查询次数固定，内存占用与课程人数无关。
+    未提交且已过截止时间的作业/考试按 0 分计，与截止时间调度器（courses.deadlines）写入的 0 分记录一致。
+    """
+    now = timezone.now()
+    assignments = list(Assignment.objects.filter(course=course).order_by('id').values('id', 'title', 'due_date'))
+    exams = list(Exam.objects.filter(course=course).order_by('id').values('id', 'title', 'end_time'))
+    yield (
+        EXPORT_HEADERS
+        + [f"作业: {assignment['title']}" for assignment in assignments]
+        + [f"考试: {exam['title']}" for exam in exams]
+    )
+
+    students = course.students.order_by('id')
+    last_id = 0
+    while True:
+        batch = list(students.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        batch_ids = [student.id for student in batch]
+
+        assignment_grades = {
+            (student_id, assignment_id): grade
+            for student_id, assignment_id, grade in Submission.objects.filter(
+                assignment__course=course, student_id__in=batch_ids
+            ).values_list('student_id', 'assignment_id', 'grade')
+        }
+        exam_grades = {
+            (student_id, exam_id): grade
+            for student_id, exam_id, grade in ExamSubmission.objects.filter(
+                exam__course=course, student_id__in=batch_ids
+            ).values_list('student_id', 'exam_id', 'grade')
+        }
+
+        records = build_learning_records(course, batch)
+        for student, record in zip(batch, records):
+            checkin = record['checkin_summary']
+            assignment = record['assignment_summary']
+            exam = record['exam_summary']
+            discussion = record['discussion_summary']
+            chapter = record['chapter_summary']
+            row = [
+                student.id, student.username, student.student_id or '', record['student_name'],
+                checkin['total'], checkin['present'], checkin['late'], checkin['absent'],
+                checkin['sick_leave'], checkin['personal_leave'], round(checkin['attendance_rate'], 2),
+                assignment['total'], assignment['completed'], round(assignment['completion_rate'], 2),
+                exam['total'], exam['completed'], round(exam['completion_rate'], 2),
+                discussion['topic_count'], discussion['reply_count'],
+                chapter['total'], chapter['completed'], round(chapter['completion_rate'], 2),
+            ]
+            for item in assignments:
+                key = (student.id, item['id'])
+                if key in assignment_grades:
+                    row.append(assignment_grades[key])
+                else:
+                    row.append(0 if item['due_date'] and now > item['due_date'] else None)
+            for item in exams:
+                key = (student.id, item['id'])
+                if key in exam_grades:
+                    row.append(exam_grades[key])
+                else:
+                    row.append(0 if item['end_time'] and now > item['end_time'] else None)
+            yield row
@@ -0,0 +1,152 @@
+import os
+import time
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+from courses.models import Course, MediaBlob
+from courses.storage import content_addressed_storage, delete_blob_if_unreferenced
+from courses.storage_usage import reconcile_blob_references, rebuild_course_storage
+
+
+class RateLimiter:
+    """
+    限制每秒删除的文件数，避免大量删除时占满磁盘 IO
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + self.interval
+
+
+def iter_media_files(root, modified_before):
+    """
+    用 os.scandir 遍历 MEDIA_ROOT，逐个返回早于 modified_before 的文件相对路径
+    """
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            entries = os.scandir(path)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < modified_before:
+                    yield os.path.relpath(entry.path, root).replace(os.sep, '/')
+
+
+def iter_batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def get_file_fields():
+    """
+    所有模型中的 FileField（含 ImageField），返回 [(模型, 字段名)]
+    """
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+    ]
+
+
+def find_referenced_names(names, file_fields):
+    """
+    返回 names 中仍被文件字段或 MediaBlob 记录引用的文件。
+
+    MediaBlob 中引用计数为 0 的文件由宽限期逻辑单独回收，这里一并视为已引用。
+    """
+    referenced = set(MediaBlob.objects.filter(name__in=names).values_list('name', flat=True))
+    for model, field in file_fields:
+        remaining = [name for name in names if name not in referenced]
+        if not remaining:
+            break
+        referenced.update(model._default_manager.filter(**{f'{field}__in': remaining}).values_list(field, flat=True))
+    return referenced
+
+
+class Command(BaseCommand):
+    help = '回收 MEDIA_ROOT 中不再被任何记录引用的文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='只列出将被删除的文件，不实际删除')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批与数据库比对的文件数')
+        parser.add_argument('--rate', type=float, default=50, help='每秒最多删除的文件数，0 表示不限制')
+        parser.add_argument('--min-age', type=int, default=settings.MEDIA_BLOB_GRACE_PERIOD,
+                            help='只处理修改时间早于该秒数的文件，避免误删正在写入的文件')
+        parser.add_argument('--reconcile', action='store_true', help='先按实际引用校正引用计数并重新统计课程存储用量')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        limiter = RateLimiter(options['rate'])
+        cutoff = timezone.now() - timedelta(seconds=options['min_age'])
+
+        if options['reconcile']:
+            mismatched = reconcile_blob_references(dry_run=dry_run)
+            for name, ref_count, actual in mismatched:
+                self.stdout.write(f'引用计数 {name}: {ref_count} -> {actual}')
+            if not dry_run:
+                rebuild_course_storage(Course.objects.values_list('id', flat=True))
+            self.stdout.write(f'校正 {len(mismatched)} 个文件的引用计数')
+
+        # 1. 引用计数为 0 且已过宽限期的内容寻址文件
+        blob_count = 0
+        blob_names = MediaBlob.objects.filter(ref_count=0, updated_at__lt=cutoff).values_list('name', flat=True)
+        for name in list(blob_names):
+            if dry_run:
+                self.stdout.write(f'[dry-run] {name}')
+                blob_count += 1
+                continue
+            limiter.wait()
+            if delete_blob_if_unreferenced(name):
+                self.stdout.write(f'已删除 {name}')
+                blob_count += 1
+
+        # 2. 磁盘上存在但没有任何记录引用的文件（记录被级联删除或启用内容寻址前遗留的文件）
+        orphan_count = 0
+        orphan_bytes = 0
+        file_fields = get_file_fields()
+        files = iter_media_files(str(settings.MEDIA_ROOT), cutoff.timestamp())
+        for batch in iter_batches(files, options['batch_size']):
+            referenced = find_referenced_names(batch, file_fields)
+            for name in batch:
+                if name in referenced:
+                    continue
+                try:
+                    size = content_addressed_storage.size(name)
+                except OSError:
+                    continue
+                if dry_run:
+                    self.stdout.write(f'[dry-run] {name} ({size} bytes)')
+                else:
+                    limiter.wait()
+                    content_addressed_storage.delete(name)
+                    self.stdout.write(f'已删除 {name} ({size} bytes)')
+                orphan_count += 1
+                orphan_bytes += size
+
+        action = '可回收' if dry_run else '已回收'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {blob_count} 个无引用的内容寻址文件，{orphan_count} 个孤立文件（{orphan_bytes} bytes）'
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from courses.models import Course, LearningRecord
+from courses.learning_records import collect_student_counters
+
+
+class Command(BaseCommand):
+    help = '从签到、作业、考试、讨论和章节阅读记录重建学习记录汇总表'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='course_ids', help='只重建指定课程（可重复）')
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all().order_by('id')
+        if options['course_ids']:
+            courses = courses.filter(id__in=options['course_ids'])
+
+        for course in courses:
+            student_ids = list(course.students.values_list('id', flat=True))
+            counters = collect_student_counters(course.id, student_ids)
+            with transaction.atomic():
+                # 先清理已退课学生的汇总行，再整体写入
+                LearningRecord.objects.filter(course=course).delete()
+                LearningRecord.objects.bulk_create(
+                    [LearningRecord(course=course, student_id=student_id, **values) for student_id, values in counters.items()],
+                    batch_size=500,
+                )
+            self.stdout.write(f'课程 {course.id} ({course.name}): {len(student_ids)} 条学习记录')
+
+        self.stdout.write(self.style.SUCCESS('学习记录汇总表重建完成'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from courses.search import get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = '重建课程资料、公告、章节和讨论的全文索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='course_ids', help='只重建指定课程（可重复）')
+
+    def handle(self, *args, **options):
+        if get_backend() is None:
+            raise CommandError('当前数据库不支持全文索引')
+
+        count = rebuild_index(options['course_ids'])
+        self.stdout.write(self.style.SUCCESS(f'全文索引重建完成，共 {count} 条文档'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from courses.submission_counters import reconcile_submission_counters
+
+
+class Command(BaseCommand):
+    help = '按提交记录重新统计作业和考试上的提交计数器，校正不一致的值'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='只列出不一致的计数器，不写入')
+
+    def handle(self, *args, **options):
+        mismatched = reconcile_submission_counters(dry_run=options['dry_run'])
+        for model_name, paper_id, stored, actual in mismatched:
+            self.stdout.write(f'{model_name} {paper_id}: {stored} -> {actual}')
+        action = '发现' if options['dry_run'] else '已校正'
+        self.stdout.write(self.style.SUCCESS(f'{action} {len(mismatched)} 条不一致的计数器'))
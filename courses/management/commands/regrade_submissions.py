@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from courses.grading import regrade_submissions
+
+
+class Command(BaseCommand):
+    help = '按当前标准答案重新计算作业或考试的客观题得分，简答题得分保持不变'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--assignment', type=int, action='append', dest='assignment_ids', default=[], help='作业 ID（可重复）')
+        parser.add_argument('--exam', type=int, action='append', dest='exam_ids', default=[], help='考试 ID（可重复）')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批写回的记录数')
+
+    def handle(self, *args, **options):
+        papers = [('assignment', paper_id) for paper_id in options['assignment_ids']]
+        papers += [('exam', paper_id) for paper_id in options['exam_ids']]
+        if not papers:
+            raise CommandError('请通过 --assignment 或 --exam 指定要重新评分的作业或考试')
+
+        for kind, paper_id in papers:
+            result = regrade_submissions(kind, paper_id, batch_size=options['batch_size'])
+            self.stdout.write(
+                f"{kind} {paper_id}: {result['answers_changed']} 个答案、{result['submissions_changed']} 份提交的得分发生变化"
+            )
+        self.stdout.write(self.style.SUCCESS('重新评分完成'))
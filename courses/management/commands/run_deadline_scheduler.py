@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from courses.deadlines import run_due_deadlines, next_deadline
+
+
+class Command(BaseCommand):
+    help = '处理到期的截止时间：替超时的考试交卷，为逾期未提交的学生生成 0 分记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='只处理一次后退出（适合由 cron 定时调用）')
+        parser.add_argument('--interval', type=float, default=60, help='两次处理之间最长等待的秒数，默认 60')
+
+    def handle(self, *args, **options):
+        while True:
+            # 长时间运行的进程需要自行关闭失效的数据库连接
+            close_old_connections()
+            result = run_due_deadlines()
+            materialized = sum(result['materialized'].values())
+            if result['auto_submitted'] or materialized or options['once']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{timezone.now():%Y-%m-%d %H:%M:%S} 自动交卷 {result['auto_submitted']} 份，"
+                    f"生成 0 分记录 {materialized} 条"
+                ))
+            if options['once']:
+                break
+
+            # 睡到下一个截止时间；新开始的考试会带来更早的截止时间，因此最多等待 interval 秒
+            now = timezone.now()
+            deadline = next_deadline(now)
+            timeout = options['interval']
+            if deadline is not None:
+                timeout = min(timeout, (deadline - now).total_seconds())
+            time.sleep(max(timeout, 0))
@@ -0,0 +1,217 @@
+import os
+import re
+import mimetypes
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.signing import BadSignature, TimestampSigner
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from users.models import User
+from .models import CourseMaterial, Chapter
+from .membership import is_course_member
+
+RANGE_RE = re.compile(r'^bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$', re.I)
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_file_range(full_path, start, length, chunk_size=CHUNK_SIZE):
+    """
+    从 start 开始按固定大小分块读取 length 个字节，避免整段读入内存
+    """
+    with open(full_path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def parse_range_header(range_header, file_size):
+    """
+    解析单段 Range 请求头，返回 (first_byte, last_byte)。
+
+    - 无法解析或包含多段时返回 None，按完整文件响应
+    - 范围不可满足时返回 False，应响应 416
+    """
+    range_match = RANGE_RE.match(range_header)
+    if not range_match:
+        return None
+
+    first_byte, last_byte = range_match.groups()
+    if not first_byte and not last_byte:
+        return None
+
+    if not first_byte:
+        # 后缀范围，例如 bytes=-500 表示最后 500 个字节
+        suffix_length = int(last_byte)
+        if suffix_length == 0 or file_size == 0:
+            return False
+        return max(file_size - suffix_length, 0), file_size - 1
+
+    first_byte = int(first_byte)
+    last_byte = int(last_byte) if last_byte else file_size - 1
+    if first_byte >= file_size or last_byte < first_byte:
+        return False
+    return first_byte, min(last_byte, file_size - 1)
+
+
+def _if_range_matches(if_range, etag, last_modified):
+    """
+    If-Range 可以是 ETag 或 HTTP 日期，只有与当前文件一致时才按范围响应
+    """
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        # If-Range 要求强比较，弱 ETag 永不匹配
+        return if_range == etag
+    if_range_date = parse_http_date_safe(if_range)
+    return if_range_date is not None and if_range_date >= last_modified
+
+
+def ranged_file_response(request, full_path):
+    """
+    返回支持 HTTP Range、条件请求 (ETag / Last-Modified) 的文件响应。
+
+    完整文件交给 FileResponse（可由服务器使用 sendfile）；部分内容按块流式返回，
+    不会把请求的范围一次性读入内存。
+    """
+    stat = os.stat(full_path)
+    file_size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = f'"{last_modified:x}-{file_size:x}"'
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    # If-None-Match / If-Modified-Since 命中时返回 304，If-Match 等失败时返回 412
+    conditional_response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional_response is not None:
+        conditional_response['Accept-Ranges'] = 'bytes'
+        return conditional_response
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE', '').strip()
+    if range_header and request.method in ('GET', 'HEAD'):
+        if_range = request.META.get('HTTP_IF_RANGE', '').strip()
+        if not if_range or _if_range_matches(if_range, etag, last_modified):
+            byte_range = parse_range_header(range_header, file_size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{file_size}'
+    elif byte_range:
+        first_byte, last_byte = byte_range
+        length = last_byte - first_byte + 1
+        response = StreamingHttpResponse(
+            iter_file_range(full_path, first_byte, length),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {first_byte}-{last_byte}/{file_size}'
+    else:
+        # Serve the whole file if no (usable) Range header
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Content-Length'] = str(file_size)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def _media_signer(name):
+    # 签名与文件路径绑定，一个文件的令牌不能用于访问其他文件
+    return TimestampSigner(salt=f'courses.media:{name}')
+
+
+def signed_media_url(file_field, user):
+    """
+    为 <video>/<embed> 等无法携带 Authorization 头的场景生成带签名令牌的媒体 URL
+    """
+    url = file_field.url
+    if user.is_authenticated:
+        url = f'{url}?token={quote(_media_signer(file_field.name).sign(str(user.id)))}'
+    return url
+
+
+def get_media_user(request, name):
+    """
+    识别媒体请求的用户：JWT 请求头、会话登录或 URL 中的签名令牌
+    """
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        result = None
+    if result:
+        return result[0]
+
+    if request.user.is_authenticated:
+        return request.user
+
+    token = request.GET.get('token')
+    if token:
+        try:
+            user_id = _media_signer(name).unsign(token, max_age=settings.MEDIA_URL_TOKEN_MAX_AGE)
+        except BadSignature:
+            return None
+        return User.objects.filter(pk=user_id, is_active=True).first()
+    return None
+
+
+def get_media_course_ids(name):
+    """
+    查找引用该媒体文件的课程。
+
+    相同内容的文件在存储中只保存一份，可能同时被多个课程引用；未被引用的文件返回空集合。
+    """
+    course_ids = set(CourseMaterial.objects.filter(file=name).values_list('course_id', flat=True))
+    course_ids.update(Chapter.objects.filter(Q(video=name) | Q(pdf=name)).values_list('course_id', flat=True))
+    return course_ids
+
+
+def can_access_course_media(user, course_ids):
+    if user is None:
+        return False
+    if user.is_staff:
+        return True
+    return any(is_course_member(user, course_id) for course_id in course_ids)
+
+
+def media_file_response(request, name):
+    """
+    返回 MEDIA_ROOT 下文件的响应。
+
+    MEDIA_SENDFILE_BACKEND 为 'x-accel-redirect' 或 'x-sendfile' 时只返回内部重定向头，
+    由 Nginx/Apache 直接发送文件（零拷贝 sendfile、Range 和缓存校验均由其处理）；
+    为 None 时在进程内流式返回，适用于开发环境。
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
+
+    if not os.path.isfile(full_path):
+        raise Http404("File not found")
+
+    backend = getattr(settings, 'MEDIA_SENDFILE_BACKEND', None)
+    if backend is None:
+        return ranged_file_response(request, full_path)
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    response = HttpResponse(content_type=content_type or 'application/octet-stream')
+    if backend == 'x-accel-redirect':
+        location = settings.MEDIA_ACCEL_REDIRECT_LOCATION.rstrip('/')
+        response['X-Accel-Redirect'] = f"{location}/{quote(name.replace(os.sep, '/'))}"
+    elif backend == 'x-sendfile':
+        response['X-Sendfile'] = full_path
+    else:
+        raise ValueError(f'Unknown MEDIA_SENDFILE_BACKEND: {backend}')
+    return response
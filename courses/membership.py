@@ -0,0 +1,76 @@
+from django.core.cache import caches
+from .models import Course
+
+CACHE_ALIAS = 'membership'
+CACHE_TIMEOUT = 60 * 60
+
+TEACHER = 'teacher'
+STUDENT = 'student'
+
+
+def _cache_key(user_id):
+    return f'courses:membership:{user_id}'
+
+
+def _load_course_roles(user_id):
+    roles = {
+        course_id: STUDENT
+        for course_id in Course.students.through.objects.filter(user_id=user_id).values_list('course_id', flat=True)
+    }
+    # 同时是教师和学生时以教师身份为准
+    roles.update({
+        course_id: TEACHER
+        for course_id in Course.objects.filter(teacher_id=user_id).values_list('id', flat=True)
+    })
+    return roles
+
+
+def get_course_roles(user):
+    """
+    返回用户参与的课程及身份 {course_id: 'teacher' | 'student'}。
+
+    结果缓存在 user 对象上（一次请求内只查一次），并写入跨进程共享的缓存；
+    选课变动、更换教师或删除课程时由 courses.signals 清除。
+    """
+    if not user or not user.is_authenticated:
+        return {}
+    roles = getattr(user, '_course_roles', None)
+    if roles is None:
+        cache = caches[CACHE_ALIAS]
+        roles = cache.get(_cache_key(user.id))
+        if roles is None:
+            roles = _load_course_roles(user.id)
+            cache.set(_cache_key(user.id), roles, CACHE_TIMEOUT)
+        user._course_roles = roles
+    return roles
+
+
+def get_course_role(user, course_id):
+    try:
+        course_id = int(course_id)
+    except (TypeError, ValueError):
+        return None
+    return get_course_roles(user).get(course_id)
+
+
+def is_course_member(user, course_id):
+    return get_course_role(user, course_id) is not None
+
+
+def is_course_teacher(user, course_id):
+    return get_course_role(user, course_id) == TEACHER
+
+
+def is_course_student(user, course_id):
+    return get_course_role(user, course_id) == STUDENT
+
+
+def get_member_course_ids(user, role=None):
+    """
+    用户参与的课程 ID 列表，可按身份筛选，用于 get_queryset 的 course_id__in 过滤
+    """
+    return [course_id for course_id, course_role in get_course_roles(user).items() if role is None or course_role == role]
+
+
+def invalidate_course_roles(user_ids):
+    caches[CACHE_ALIAS].delete_many([_cache_key(user_id) for user_id in user_ids])
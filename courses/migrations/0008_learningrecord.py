@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_chapterreadstatus'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearningRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checkin_present', models.PositiveIntegerField(default=0, verbose_name='出勤次数')),
+                ('checkin_late', models.PositiveIntegerField(default=0, verbose_name='迟到次数')),
+                ('checkin_sick_leave', models.PositiveIntegerField(default=0, verbose_name='病假次数')),
+                ('checkin_personal_leave', models.PositiveIntegerField(default=0, verbose_name='事假次数')),
+                ('assignments_completed', models.PositiveIntegerField(default=0, verbose_name='已提交作业数')),
+                ('exams_completed', models.PositiveIntegerField(default=0, verbose_name='已完成考试数')),
+                ('topic_count', models.PositiveIntegerField(default=0, verbose_name='发布话题数')),
+                ('reply_count', models.PositiveIntegerField(default=0, verbose_name='回复数')),
+                ('chapters_completed', models.PositiveIntegerField(default=0, verbose_name='已读任务点数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='learning_records', to='courses.course', verbose_name='所属课程')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='learning_records', to=settings.AUTH_USER_MODEL, verbose_name='学生')),
+            ],
+            options={
+                'verbose_name': '学习记录汇总',
+                'verbose_name_plural': '学习记录汇总',
+                'unique_together': {('course', 'student')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_learningrecord'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chapter',
+            name='pdf',
+            field=models.FileField(blank=True, db_index=True, null=True, upload_to='chapter_pdfs/', verbose_name='章节PDF'),
+        ),
+        migrations.AlterField(
+            model_name='chapter',
+            name='video',
+            field=models.FileField(blank=True, db_index=True, null=True, upload_to='chapter_videos/', verbose_name='章节视频'),
+        ),
+        migrations.AlterField(
+            model_name='coursematerial',
+            name='file',
+            field=models.FileField(db_index=True, upload_to='course_materials/', verbose_name='文件'),
+        ),
+    ]
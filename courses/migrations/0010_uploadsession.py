@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:09
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_media_file_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target', models.CharField(choices=[('material', '课程资料'), ('chapter_video', '章节视频'), ('chapter_pdf', '章节PDF')], max_length=20, verbose_name='上传目标')),
+                ('filename', models.CharField(max_length=255, verbose_name='文件名')),
+                ('size', models.BigIntegerField(verbose_name='文件大小')),
+                ('checksum', models.CharField(max_length=64, verbose_name='SHA-256 校验值')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='已接收字节数')),
+                ('status', models.CharField(choices=[('uploading', '上传中'), ('completed', '已完成')], default='uploading', max_length=10, verbose_name='状态')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('chapter', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='courses.chapter', verbose_name='目标章节')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='courses.course', verbose_name='所属课程')),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='上传者')),
+            ],
+            options={
+                'verbose_name': '上传会话',
+                'verbose_name_plural': '上传会话',
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:12
+
+import courses.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='存储路径')),
+                ('sha256', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256')),
+                ('size', models.BigIntegerField(verbose_name='文件大小')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='引用次数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='最近写入时间')),
+            ],
+            options={
+                'verbose_name': '媒体文件',
+                'verbose_name_plural': '媒体文件',
+            },
+        ),
+        migrations.AlterField(
+            model_name='chapter',
+            name='pdf',
+            field=models.FileField(blank=True, db_index=True, null=True, storage=courses.storage.ContentAddressedStorage(), upload_to='chapter_pdfs/', verbose_name='章节PDF'),
+        ),
+        migrations.AlterField(
+            model_name='chapter',
+            name='video',
+            field=models.FileField(blank=True, db_index=True, null=True, storage=courses.storage.ContentAddressedStorage(), upload_to='chapter_videos/', verbose_name='章节视频'),
+        ),
+        migrations.AlterField(
+            model_name='coursematerial',
+            name='file',
+            field=models.FileField(db_index=True, storage=courses.storage.ContentAddressedStorage(), upload_to='course_materials/', verbose_name='文件'),
+        ),
+    ]
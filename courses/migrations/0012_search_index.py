@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from courses.search import get_backend, rebuild_index
+    backend = get_backend(schema_editor.connection)
+    if backend is None:
+        return
+    for sql in backend.create_sql:
+        schema_editor.execute(sql)
+    rebuild_index(get_model=apps.get_model, conn=schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from courses.search import get_backend
+    backend = get_backend(schema_editor.connection)
+    if backend is None:
+        return
+    for sql in backend.drop_sql:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_content_addressed_media'),
+        ('interaction', '0006_randomquestion_status_alter_randomquestion_student'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
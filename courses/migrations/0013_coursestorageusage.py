@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStorageUsage',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='storage_usage', serialize=False, to='courses.course', verbose_name='所属课程')),
+                ('total_bytes', models.BigIntegerField(default=0, verbose_name='占用字节数')),
+                ('file_count', models.PositiveIntegerField(default=0, verbose_name='文件数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '课程存储用量',
+                'verbose_name_plural': '课程存储用量',
+            },
+        ),
+    ]
@@ -1,5 +1,7 @@
+import uuid
 from django.db import models
 from users.models import User
+from .storage import content_addressed_storage
 
 class Course(models.Model):
     """
@@ -20,7 +22,7 @@ class CourseMaterial(models.Model):
     """
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='materials', verbose_name='所属课程')
     name = models.CharField(max_length=255, verbose_name='资料名称', default='')
-    file = models.FileField(upload_to='course_materials/', verbose_name='文件')
+    file = models.FileField(upload_to='course_materials/', storage=content_addressed_storage, db_index=True, verbose_name='文件')
     size = models.BigIntegerField(verbose_name='文件大小', default=0)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploaded_materials', verbose_name='上传者', null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name='上传时间')
@@ -48,8 +50,8 @@ class Chapter(models.Model):
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children', verbose_name='父章节')
     title = models.CharField(max_length=100, verbose_name='章节标题')
     content = models.TextField(verbose_name='章节内容', blank=True, null=True)
-    video = models.FileField(upload_to='chapter_videos/', blank=True, null=True, verbose_name='章节视频')
-    pdf = models.FileField(upload_to='chapter_pdfs/', blank=True, null=True, verbose_name='章节PDF')
+    video = models.FileField(upload_to='chapter_videos/', storage=content_addressed_storage, blank=True, null=True, db_index=True, verbose_name='章节视频')
+    pdf = models.FileField(upload_to='chapter_pdfs/', storage=content_addressed_storage, blank=True, null=True, db_index=True, verbose_name='章节PDF')
     order = models.PositiveIntegerField(default=0, verbose_name='章节顺序')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
 
@@ -76,3 +78,133 @@ class ChapterReadStatus(models.Model):
 
     def __str__(self):
         return f"{self.user.username} read {self.chapter.title}"
+
+class LearningRecord(models.Model):
+    """
+    学习记录汇总模型（按课程和学生增量维护的计数器）
+    """
+    # 各统计维度对应的计数器字段
+    DIMENSION_FIELDS = {
+        'checkin': ('checkin_present', 'checkin_late', 'checkin_sick_leave', 'checkin_personal_leave'),
+        'assignment': ('assignments_completed',),
+        'exam': ('exams_completed',),
+        'topic': ('topic_count',),
+        'reply': ('reply_count',),
+        'chapter': ('chapters_completed',),
+    }
+    COUNTER_FIELDS = tuple(field for fields in DIMENSION_FIELDS.values() for field in fields)
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='learning_records', verbose_name='所属课程')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='learning_records', verbose_name='学生')
+    checkin_present = models.PositiveIntegerField(default=0, verbose_name='出勤次数')
+    checkin_late = models.PositiveIntegerField(default=0, verbose_name='迟到次数')
+    checkin_sick_leave = models.PositiveIntegerField(default=0, verbose_name='病假次数')
+    checkin_personal_leave = models.PositiveIntegerField(default=0, verbose_name='事假次数')
+    assignments_completed = models.PositiveIntegerField(default=0, verbose_name='已提交作业数')
+    exams_completed = models.PositiveIntegerField(default=0, verbose_name='已完成考试数')
+    topic_count = models.PositiveIntegerField(default=0, verbose_name='发布话题数')
+    reply_count = models.PositiveIntegerField(default=0, verbose_name='回复数')
+    chapters_completed = models.PositiveIntegerField(default=0, verbose_name='已读任务点数')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        unique_together = ('course', 'student')
+        verbose_name = '学习记录汇总'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return f"{self.student.username} - {self.course.name}"
+
+class UploadSession(models.Model):
+    """
+    断点续传上传会话模型
+    """
+    TARGET_CHOICES = (
+        ('material', '课程资料'),
+        ('chapter_video', '章节视频'),
+        ('chapter_pdf', '章节PDF'),
+    )
+    STATUS_CHOICES = (
+        ('uploading', '上传中'),
+        ('completed', '已完成'),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='upload_sessions', verbose_name='所属课程')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions', verbose_name='上传者')
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES, verbose_name='上传目标')
+    chapter = models.ForeignKey(Chapter, on_delete=models.CASCADE, null=True, blank=True, related_name='upload_sessions', verbose_name='目标章节')
+    filename = models.CharField(max_length=255, verbose_name='文件名')
+    size = models.BigIntegerField(verbose_name='文件大小')
+    checksum = models.CharField(max_length=64, verbose_name='SHA-256 校验值')
+    offset = models.BigIntegerField(default=0, verbose_name='已接收字节数')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading', verbose_name='状态')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '上传会话'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
+class CourseStorageUsage(models.Model):
+    """
+    课程文件占用空间汇总（随资料和章节文件的增删增量维护）
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='storage_usage', verbose_name='所属课程')
+    total_bytes = models.BigIntegerField(default=0, verbose_name='占用字节数')
+    file_count = models.PositiveIntegerField(default=0, verbose_name='文件数')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '课程存储用量'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return f"{self.course.name} ({self.total_bytes} bytes)"
+
+class MediaBlob(models.Model):
+    """
+    内容寻址存储中的文件及其引用计数
+    """
+    name = models.CharField(max_length=255, unique=True, verbose_name='存储路径')
+    sha256 = models.CharField(max_length=64, db_index=True, verbose_name='SHA-256')
+    size = models.BigIntegerField(verbose_name='文件大小')
+    ref_count = models.PositiveIntegerField(default=0, verbose_name='引用次数')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='最近写入时间')
+
+    class Meta:
+        verbose_name = '媒体文件'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+class SubmissionCounters(models.Model):
+    """
+    作业和考试上反规范化的提交计数器。
+
+    提交记录创建、删除或状态变化时由 courses.signals 用 F() 原子增减，
+    可用 reconcile_submission_counters 命令按提交记录重新校正。
+    """
+    COUNTER_FIELDS = ('total_submissions', 'graded_submissions', 'pending_manual', 'missing_submissions')
+
+    total_submissions = models.PositiveIntegerField(default=0, verbose_name='提交记录数')
+    graded_submissions = models.PositiveIntegerField(default=0, verbose_name='已批改数')
+    pending_manual = models.PositiveIntegerField(default=0, verbose_name='待手动批改数')
+    missing_submissions = models.PositiveIntegerField(default=0, verbose_name='逾期未提交数')
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # 编辑作业或考试时不写入计数器，避免用内存中的旧值覆盖并发提交产生的增量
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
@@ -1,5 +1,5 @@
 from rest_framework import permissions
-from .models import Course
+from .membership import is_course_member, is_course_teacher, is_course_student
 
 class IsCourseMember(permissions.BasePermission):
     """
@@ -9,13 +9,8 @@ class IsCourseMember(permissions.BasePermission):
         course_id = view.kwargs.get('course_pk') or view.kwargs.get('course_id') or view.kwargs.get('pk')
         if not course_id:
             return False
-        
-        try:
-            course = Course.objects.get(pk=course_id)
-        except Course.DoesNotExist:
-            return False
-            
-        return request.user in course.students.all() or request.user == course.teacher
+
+        return is_course_member(request.user, course_id)
 
 class IsTeacherOrReadOnly(permissions.BasePermission):
     """
@@ -40,8 +35,8 @@ class IsTeacherOrReadOnly(permissions.BasePermission):
 
         # Write permissions are only allowed to the teacher who owns the course.
         if hasattr(obj, 'course'):
-            return obj.course.teacher == request.user
-        return obj.teacher == request.user
+            return is_course_teacher(request.user, obj.course_id)
+        return is_course_teacher(request.user, obj.pk)
 
 class IsAuthorOrTeacherOrReadOnly(permissions.BasePermission):
     """
@@ -54,7 +49,9 @@ class IsAuthorOrTeacherOrReadOnly(permissions.BasePermission):
             return True
 
         # Write permissions are only allowed to the author of the object or the course teacher.
-        return obj.author == request.user or obj.course.teacher == request.user
+        # 回复没有直接关联课程，通过所属话题获取
+        course_id = obj.course_id if hasattr(obj, 'course_id') else obj.topic.course_id
+        return obj.author == request.user or is_course_teacher(request.user, course_id)
 
 class IsCourseTeacher(permissions.BasePermission):
     """
@@ -64,11 +61,7 @@ class IsCourseTeacher(permissions.BasePermission):
         course_id = view.kwargs.get('course_pk') or view.kwargs.get('course_id')
         if not course_id:
             return False
-        try:
-            course = Course.objects.get(pk=course_id)
-        except Course.DoesNotExist:
-            return False
-        return course.teacher == request.user
+        return is_course_teacher(request.user, course_id)
 
 class IsCourseStudent(permissions.BasePermission):
     """
@@ -78,8 +71,4 @@ class IsCourseStudent(permissions.BasePermission):
         course_id = view.kwargs.get('course_pk') or view.kwargs.get('course_id')
         if not course_id:
             return False
-        try:
-            course = Course.objects.get(pk=course_id)
-        except Course.DoesNotExist:
-            return False
-        return request.user in course.students.all()
+        return is_course_student(request.user, course_id)
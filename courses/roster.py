@@ -0,0 +1,126 @@
+import csv
+import io
+from django.db import router, transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed
+from users.models import User
+from .models import Course
+
+# CSV 名单中可用于识别学生的列：学号或用户名
+ROSTER_COLUMNS = ('student_id', 'username')
+
+
+def parse_roster_csv(uploaded_file):
+    """
+    解析名单 CSV，返回 [(行号, 列名, 值)]。
+
+    表头需包含 student_id（学号）或 username 列，两列都有时优先使用学号。
+    """
+    content = uploaded_file.read()
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        # Excel 在中文系统上默认以 GBK 编码导出 CSV
+        text = content.decode('gbk')
+    try:
+        return _read_roster_entries(csv.DictReader(io.StringIO(text, newline='')))
+    except csv.Error as e:
+        # 格式错误的 CSV（如引号不匹配、含空字符）按无效文件处理
+        raise ValueError(f'CSV 文件格式错误：{e}') from e
+
+
+def _read_roster_entries(reader):
+    fieldnames = [name.strip() for name in reader.fieldnames or []]
+    if not any(column in fieldnames for column in ROSTER_COLUMNS):
+        raise ValueError('CSV 文件需包含 student_id 或 username 列。')
+    reader.fieldnames = fieldnames
+
+    entries = []
+    for row in reader:
+        for column in ROSTER_COLUMNS:
+            value = (row.get(column) or '').strip()
+            if value:
+                entries.append((reader.line_num, column, value))
+                break
+    return entries
+
+
+def resolve_students(entries):
+    """
+    一次查询解析名单中的学生，返回 {(列名, 值): User}。
+
+    entries 中的列名为 'id'（用户 ID）、'student_id'（学号）或 'username'。
+    """
+    values = {'id': set(), 'student_id': set(), 'username': set()}
+    for _, column, value in entries:
+        values[column].add(value)
+
+    ids = {int(value) for value in values['id'] if str(value).isdigit()}
+    lookup = Q(pk__in=ids) | Q(student_id__in=values['student_id']) | Q(username__in=values['username'])
+    students = {}
+    for user in User.objects.filter(lookup, role='student'):
+        students[('id', str(user.id))] = user
+        if user.student_id:
+            students[('student_id', user.student_id)] = user
+        students[('username', user.username)] = user
+    return students
+
+
+def _send_m2m_changed(course, action, pk_set):
+    m2m_changed.send(
+        sender=Course.students.through, action=action, instance=course, reverse=False,
+        model=User, pk_set=pk_set, using=router.db_for_write(Course.students.through, instance=course),
+    )
+
+
+def enroll_students(course, user_ids):
+    """
+    批量将学生加入课程，返回本次新加入的学生 ID 集合。
+
+    选课关系用 bulk_create(ignore_conflicts=True) 一次写入，并与 students.add() 一样
+    发送一次 m2m_changed，学习记录、成员缓存和选课通知随之批量处理。
+    """
+    user_ids = set(user_ids)
+    through = Course.students.through
+    with transaction.atomic():
+        existing = set(through.objects.filter(course=course, user_id__in=user_ids).values_list('user_id', flat=True))
+        added = user_ids - existing
+        if added:
+            _send_m2m_changed(course, 'pre_add', added)
+            through.objects.bulk_create(
+                [through(course_id=course.id, user_id=user_id) for user_id in added],
+                ignore_conflicts=True,
+            )
+            _send_m2m_changed(course, 'post_add', added)
+    return added
+
+
+def unenroll_students(course, user_ids):
+    """
+    批量将学生移出课程，返回实际被移出的学生 ID 集合
+    """
+    user_ids = set(user_ids)
+    with transaction.atomic():
+        enrolled = set(Course.students.through.objects.filter(course=course, user_id__in=user_ids).values_list('user_id', flat=True))
+        if enrolled:
+            # remove() 用一条 DELETE 删除选课关系，并只发送一次 m2m_changed
+            course.students.remove(*enrolled)
+    return enrolled
+
+
+def build_roster_report(entries, students, changed_ids, changed_status, unchanged_status):
+    """
+    生成逐行处理结果
+    """
+    report = []
+    for row, column, value in entries:
+        student = students.get((column, str(value)))
+        item = {'row': row, column: value}
+        if student is None:
+            item['status'] = 'not_found'
+        else:
+            item['user_id'] = student.id
+            item['username'] = student.username
+            item['status'] = changed_status if student.id in changed_ids else unchanged_status
+        report.append(item)
+    return report
@@ -0,0 +1,353 @@
+import re
+from django.apps import apps
+from django.db import connection
+from django.utils.html import escape, strip_tags
+from interaction.models import DiscussionTopic
+
+TABLE = 'courses_search_index'
+BATCH_SIZE = 500
+
+# 文档类型及其编码，编码用于计算索引行的主键 object_id * 8 + code
+DOCUMENT_TYPES = {
+    'material': 1,
+    'announcement': 2,
+    'chapter': 3,
+    'discussion_topic': 4,
+    'discussion_reply': 5,
+}
+
+CJK = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+CJK_RE = re.compile(f'([{CJK}])')
+TERM_RE = re.compile(r'[\w' + CJK + r']+')
+
+# 高亮标记先用私有区字符占位，转义 HTML 后再替换为 <mark>
+MARK_START = '\ue000'
+MARK_END = '\ue001'
+
+
+class SearchUnavailable(Exception):
+    """
+    数据库不支持全文索引
+    """
+
+
+def segment(text):
+    """
+    中文没有空格分词，FTS5 unicode61 和 PostgreSQL 'simple' 配置都会把整段汉字当作一个词。
+    索引前在每个汉字两侧加空格，按单字建立索引，查询时按短语匹配相邻的字。
+    """
+    return CJK_RE.sub(r' \1 ', strip_tags(text or ''))
+
+
+def _desegment(text):
+    # 去掉 segment() 在汉字两侧加入的空格（包括与高亮标记之间的空格）
+    marks = f'{MARK_START}{MARK_END}'
+    text = re.sub(f'(?<=[{CJK}{marks}])\\s+(?=[{CJK}{marks}])', '', text)
+    text = re.sub(f'(?<=[{CJK}])\\s+|\\s+(?=[{CJK}])', '', text)
+    text = text.replace(MARK_END + MARK_START, '')
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def render_highlight(text):
+    return escape(_desegment(text or '')).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def parse_query(query):
+    """
+    把用户输入拆成检索词：英文词按前缀匹配，汉字按相邻单字组成的短语匹配
+    """
+    return TERM_RE.findall(query or '')[:10]
+
+
+def _row_id(object_type, object_id):
+    return object_id * 8 + DOCUMENT_TYPES[object_type]
+
+
+class SQLiteSearchBackend:
+    """
+    基于 SQLite FTS5 的全文索引
+    """
+    create_sql = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+        "title, body, course_id UNINDEXED, object_type UNINDEXED, object_id UNINDEXED, parent_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2')",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {TABLE}"]
+
+    def upsert_many(self, cursor, rows):
+        # FTS5 不支持 ON CONFLICT，按 rowid 删除后重新插入
+        cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [[row[0]] for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (rowid, course_id, object_type, object_id, parent_id, title, body) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            rows,
+        )
+
+    def delete(self, cursor, row_id):
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [row_id])
+
+    def _match_expression(self, terms):
+        parts = []
+        for term in terms:
+            segmented = segment(term).split()
+            phrase = '"' + ' '.join(segmented).replace('"', '""') + '"'
+            # 纯英文/数字词按前缀匹配
+            parts.append(phrase if CJK_RE.search(term) else phrase + '*')
+        return ' AND '.join(parts)
+
+    def search(self, cursor, course_id, terms, object_types, limit, offset):
+        sql = (
+            f"SELECT object_type, object_id, parent_id, "
+            f"highlight({TABLE}, 0, %s, %s), "
+            f"snippet({TABLE}, 1, %s, %s, '…', 24), "
+            f"bm25({TABLE}, 5.0, 1.0) AS rank "
+            f"FROM {TABLE} WHERE {TABLE} MATCH %s AND course_id = %s"
+        )
+        params = [MARK_START, MARK_END, MARK_START, MARK_END, self._match_expression(terms), course_id]
+        if object_types:
+            sql += f" AND object_type IN ({', '.join(['%s'] * len(object_types))})"
+            params += list(object_types)
+        # bm25 越小越相关
+        sql += " ORDER BY rank LIMIT %s OFFSET %s"
+        cursor.execute(sql, params + [limit, offset])
+        return [(row[0], row[1], row[2], row[3], row[4], -row[5]) for row in cursor.fetchall()]
+
+    def match_ids(self, cursor, course_id, terms, object_type):
+        cursor.execute(
+            f"SELECT object_id FROM {TABLE} WHERE {TABLE} MATCH %s AND course_id = %s AND object_type = %s",
+            [self._match_expression(terms), course_id, object_type],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgreSQLSearchBackend:
+    """
+    基于 PostgreSQL tsvector + GIN 索引的全文索引，标题权重高于正文
+    """
+    create_sql = [
+        f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+        "id bigint PRIMARY KEY, course_id integer NOT NULL, object_type varchar(32) NOT NULL, "
+        "object_id integer NOT NULL, parent_id integer NULL, title text NOT NULL, body text NOT NULL, "
+        "document tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')) STORED)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_document ON {TABLE} USING GIN (document)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_course ON {TABLE} (course_id)",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {TABLE}"]
+
+    def upsert_many(self, cursor, rows):
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (id, course_id, object_type, object_id, parent_id, title, body) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s) "
+            "ON CONFLICT (id) DO UPDATE SET course_id = EXCLUDED.course_id, parent_id = EXCLUDED.parent_id, "
+            "title = EXCLUDED.title, body = EXCLUDED.body",
+            rows,
+        )
+
+    def delete(self, cursor, row_id):
+        cursor.execute(f"DELETE FROM {TABLE} WHERE id = %s", [row_id])
+
+    def _tsquery(self, terms):
+        """
+        返回 (tsquery 表达式, 参数)：英文词按前缀匹配，汉字按短语匹配
+        """
+        query = ' && '.join(
+            ["phraseto_tsquery('simple', %s)" if CJK_RE.search(term) else "to_tsquery('simple', %s)" for term in terms]
+        )
+        query_params = [
+            ' '.join(segment(term).split()) if CJK_RE.search(term) else f"{term}:*"
+            for term in terms
+        ]
+        return query, query_params
+
+    def search(self, cursor, course_id, terms, object_types, limit, offset):
+        query, query_params = self._tsquery(terms)
+        options = f'StartSel={MARK_START}, StopSel={MARK_END}'
+        sql = (
+            f"SELECT object_type, object_id, parent_id, "
+            f"ts_headline('simple', title, q, %s), "
+            f"ts_headline('simple', body, q, %s), "
+            f"ts_rank(document, q) AS rank "
+            f"FROM {TABLE}, ({query}) AS query(q) WHERE document @@ q AND course_id = %s"
+        )
+        params = [
+            f'{options}, HighlightAll=true',
+            f'{options}, MaxFragments=1, MaxWords=24, MinWords=8, FragmentDelimiter=…',
+        ]
+        # 检索词参数位于 FROM 子句中，排在两个 ts_headline 选项之后
+        params = params + query_params + [course_id]
+        if object_types:
+            sql += f" AND object_type IN ({', '.join(['%s'] * len(object_types))})"
+            params += list(object_types)
+        sql += " ORDER BY rank DESC LIMIT %s OFFSET %s"
+        cursor.execute(sql, params + [limit, offset])
+        return cursor.fetchall()
+
+    def match_ids(self, cursor, course_id, terms, object_type):
+        query, query_params = self._tsquery(terms)
+        cursor.execute(
+            f"SELECT object_id FROM {TABLE} WHERE document @@ ({query}) AND course_id = %s AND object_type = %s",
+            query_params + [course_id, object_type],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+}
+
+
+def get_backend(conn=None):
+    """
+    返回当前数据库对应的全文索引实现，不支持的数据库返回 None
+    """
+    backend_class = BACKENDS.get((conn or connection).vendor)
+    return backend_class() if backend_class else None
+
+
+# 模型 -> (文档类型, 生成 (课程 ID, 父对象 ID, 标题, 正文) 的函数)
+# 按模型标签而不是类判断，迁移中的历史模型同样适用
+DOCUMENT_MODELS = {
+    'courses.coursematerial': ('material', lambda obj: (obj.course_id, None, obj.name, '')),
+    'courses.announcement': ('announcement', lambda obj: (obj.course_id, None, obj.title, obj.content)),
+    'courses.chapter': ('chapter', lambda obj: (obj.course_id, obj.parent_id, obj.title, obj.content or '')),
+    'interaction.discussiontopic': ('discussion_topic', lambda obj: (obj.course_id, None, obj.title, obj.content)),
+    # 回复的标题显示为所属话题，话题标题在查询时获取
+    'interaction.discussionreply': ('discussion_reply', lambda obj: (obj.topic.course_id, obj.topic_id, '', obj.content)),
+}
+
+
+def get_document_type(model):
+    return DOCUMENT_MODELS[model._meta.label_lower][0]
+
+
+def _document_row(instance):
+    object_type, build = DOCUMENT_MODELS[instance._meta.label_lower]
+    course_id, parent_id, title, body = build(instance)
+    return [_row_id(object_type, instance.pk), course_id, object_type, instance.pk, parent_id, segment(title), segment(body)]
+
+
+def index_documents(instances, conn=None):
+    """
+    批量写入索引，用于 bulk_create 等不发送 post_save 的场景
+    """
+    conn = conn or connection
+    backend = get_backend(conn)
+    rows = [_document_row(instance) for instance in instances]
+    if backend is None or not rows:
+        return
+    with conn.cursor() as cursor:
+        backend.upsert_many(cursor, rows)
+
+
+def index_document(instance, conn=None):
+    index_documents([instance], conn)
+
+
+def remove_document(object_type, object_id):
+    backend = get_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.delete(cursor, _row_id(object_type, object_id))
+
+
+def search_course(course_id, query, object_types=None, limit=20, offset=0):
+    """
+    在课程范围内全文检索，返回按相关度排序的结果及高亮片段。
+
+    数据库不支持全文索引时抛出 SearchUnavailable。
+    """
+    backend = get_backend()
+    if backend is None:
+        raise SearchUnavailable(f'Full-text search is not supported on {connection.vendor}.')
+    terms = parse_query(query)
+    if not terms:
+        return []
+    with connection.cursor() as cursor:
+        rows = backend.search(cursor, course_id, terms, object_types, limit, offset)
+
+    topic_ids = {parent_id for object_type, _, parent_id, *_ in rows if object_type == 'discussion_reply'}
+    topic_titles = dict(DiscussionTopic.objects.filter(id__in=topic_ids).values_list('id', 'title')) if topic_ids else {}
+
+    results = []
+    for object_type, object_id, parent_id, title, snippet, rank in rows:
+        if object_type == 'discussion_reply':
+            title = escape(topic_titles.get(parent_id, ''))
+        else:
+            title = render_highlight(title)
+        results.append({
+            'type': object_type,
+            'id': object_id,
+            'parent_id': parent_id,
+            'title': title,
+            'snippet': render_highlight(snippet),
+            'rank': rank,
+        })
+    return results
+
+
+def search_object_ids(course_id, query, object_type):
+    """
+    返回匹配的全部某类对象 ID（不排序、不截断），用于列表接口的 ?search= 过滤
+    """
+    backend = get_backend()
+    if backend is None:
+        raise SearchUnavailable(f'Full-text search is not supported on {connection.vendor}.')
+    terms = parse_query(query)
+    if not terms:
+        return []
+    with connection.cursor() as cursor:
+        return backend.match_ids(cursor, course_id, terms, object_type)
+
+
+def rebuild_index(course_ids=None, get_model=None, conn=None):
+    """
+    重建全文索引，返回写入的文档数。迁移中通过 get_model 传入历史模型
+    """
+    conn = conn or connection
+    get_model = get_model or apps.get_model
+    if get_backend(conn) is None:
+        return 0
+
+    # 先清除旧索引，避免残留已删除对象
+    with conn.cursor() as cursor:
+        if course_ids:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE course_id IN ({', '.join(['%s'] * len(course_ids))})", list(course_ids))
+        else:
+            cursor.execute(f"DELETE FROM {TABLE}")
+
+    count = 0
+    for label in DOCUMENT_MODELS:
+        model = get_model(label)
+        queryset = model.objects.all()
+        if label == 'interaction.discussionreply':
+            queryset = queryset.select_related('topic')
+            if course_ids:
+                queryset = queryset.filter(topic__course_id__in=course_ids)
+        elif course_ids:
+            queryset = queryset.filter(course_id__in=course_ids)
+        batch = []
+        for instance in queryset.iterator(chunk_size=BATCH_SIZE):
+            batch.append(instance)
+            if len(batch) >= BATCH_SIZE:
+                index_documents(batch, conn)
+                count += len(batch)
+                batch = []
+        index_documents(batch, conn)
+        count += len(batch)
+    return count
+
+
+def filter_by_search(queryset, course_id, query, object_type, fallback):
+    """
+    列表接口的 ?search= 过滤。
+
+    有全文索引时按索引匹配：英文和数字按词首前缀匹配（lect 能匹配 lecture2.pdf，词中间的 ture 不能），
+    汉字按相邻的字组成的短语匹配。数据库不支持全文索引，或查询中没有可检索的词（如只有标点）时，
+    退回 fallback（icontains 条件）。
+    """
+    if get_backend() is None or not parse_query(query):
+        return queryset.filter(fallback)
+    return queryset.filter(id__in=search_object_ids(course_id, query, object_type))
@@ -1,6 +1,32 @@
+from django.db.models import Count, Q
 from rest_framework import serializers
-from .models import Course, CourseMaterial, Announcement, Chapter, ChapterReadStatus
+from .models import Course, CourseMaterial, Announcement, Chapter, ChapterReadStatus, UploadSession
+from .media import signed_media_url
 from users.serializers import BasicUserSerializer
+from iclass_server.serializers import DynamicFieldsMixin
+
+
+def get_course_progress_map(course_ids, user):
+    """
+    一次查询计算多个课程的任务点完成进度，返回 {course_id: {'completed', 'total'}}
+    """
+    progress_map = {course_id: {'completed': 0, 'total': 0} for course_id in course_ids}
+    if not progress_map or not user.is_authenticated:
+        return progress_map
+
+    # 任务点被定义为没有子节点的章节（即“节”），按课程分组统计总数和当前用户的已读数
+    rows = (
+        Chapter.objects.filter(course_id__in=progress_map.keys(), children__isnull=True)
+        .values('course_id')
+        .annotate(
+            total=Count('id', distinct=True),
+            completed=Count('read_by_users', filter=Q(read_by_users__user=user), distinct=True),
+        )
+        .order_by()
+    )
+    for row in rows:
+        progress_map[row['course_id']] = {'completed': row['completed'], 'total': row['total']}
+    return progress_map
 
 class ChapterSerializer(serializers.ModelSerializer):
     """
@@ -16,19 +42,24 @@ class ChapterSerializer(serializers.ModelSerializer):
 
     def get_children(self, obj):
         """ 递归地序列化子章节 """
+        # 整棵章节树已预先加载时，直接从内存中取子章节
+        children_map = self.context.get('children_map')
+        children = children_map.get(obj.id, []) if children_map is not None else obj.children.all()
         # 当序列化子章节时，使用同样的 ChapterSerializer
-        return ChapterSerializer(obj.children.all(), many=True, context=self.context).data
+        return ChapterSerializer(children, many=True, context=self.context).data
 
     def get_is_read(self, obj):
         """ 检查当前用户是否已读此章节 """
         user = self.context['request'].user
         if user.is_authenticated:
             # 章（parent is None）不应该有已读状态，始终返回 False
-            if obj.parent is None:
+            if obj.parent_id is None:
                 return False
             # 对于节，直接检查已读状态
-            else:
-                return ChapterReadStatus.objects.filter(user=user, chapter=obj).exists()
+            read_chapter_ids = self.context.get('read_chapter_ids')
+            if read_chapter_ids is not None:
+                return obj.id in read_chapter_ids
+            return ChapterReadStatus.objects.filter(user=user, chapter=obj).exists()
         return False
 
     def to_representation(self, instance):
@@ -37,7 +68,7 @@ class ChapterSerializer(serializers.ModelSerializer):
         """
         is_read = self.get_is_read(instance)
         # 如果是“章” (没有父级)
-        if instance.parent is None:
+        if instance.parent_id is None:
             return {
                 'id': instance.id,
                 'title': instance.title,
@@ -50,14 +81,34 @@ class ChapterSerializer(serializers.ModelSerializer):
         # 使用父类的 to_representation 方法，它会返回 Meta.fields 中定义的所有字段
         representation = super().to_representation(instance)
         representation['is_read'] = is_read
-        # 确保 video 和 pdf 字段返回 URL
+        # 确保 video 和 pdf 字段返回带访问令牌的 URL（<video>/<embed> 无法携带 Authorization 头）
+        request = self.context['request']
         if instance.video:
-            representation['video'] = self.context['request'].build_absolute_uri(instance.video.url)
+            representation['video'] = request.build_absolute_uri(signed_media_url(instance.video, request.user))
         if instance.pdf:
-            representation['pdf'] = self.context['request'].build_absolute_uri(instance.pdf.url)
+            representation['pdf'] = request.build_absolute_uri(signed_media_url(instance.pdf, request.user))
         return representation
 
 
+def build_chapter_tree_context(course_id, user):
+    """
+    两次查询加载课程的全部章节和用户已读的章节ID，返回 (顶层章列表, 序列化上下文)
+    """
+    children_map = {}
+    for chapter in Chapter.objects.filter(course_id=course_id):
+        children_map.setdefault(chapter.parent_id, []).append(chapter)
+
+    read_chapter_ids = set()
+    if user.is_authenticated:
+        read_chapter_ids = set(
+            ChapterReadStatus.objects.filter(user=user, chapter__course_id=course_id)
+            .values_list('chapter_id', flat=True)
+        )
+
+    context = {'children_map': children_map, 'read_chapter_ids': read_chapter_ids}
+    return children_map.get(None, []), context
+
+
 class ChapterWriteSerializer(serializers.ModelSerializer):
     """
     用于创建/更新章节的序列化器，包含验证逻辑
@@ -90,7 +141,7 @@ class ChapterWriteSerializer(serializers.ModelSerializer):
         
         return data
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     课程序列化器
     """
@@ -101,28 +152,31 @@ class CourseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = ['id', 'name', 'teacher', 'students', 'cover', 'created_at', 'progress']
+        expandable_fields = ['students']
 
     def get_progress(self, obj):
         """
         计算课程的任务点完成进度
         """
-        user = self.context['request'].user
-        if not user.is_authenticated:
-            return {'completed': 0, 'total': 0}
-
-        # 任务点被定义为没有子节点的章节（即“节”）
-        task_points = Chapter.objects.filter(course=obj, children__isnull=True)
-        total_tasks = task_points.count()
-
-        if total_tasks == 0:
-            return {'completed': 0, 'total': 0}
+        # 列表序列化时由 CourseListProgressSerializer 预先批量计算
+        progress_map = getattr(self.parent, 'progress_map', None)
+        if progress_map is None or obj.id not in progress_map:
+            progress_map = get_course_progress_map([obj.id], self.context['request'].user)
+        return progress_map[obj.id]
 
-        completed_tasks = ChapterReadStatus.objects.filter(
-            user=user,
-            chapter__in=task_points
-        ).count()
 
-        return {'completed': completed_tasks, 'total': total_tasks}
+class CourseListProgressSerializer(serializers.ListSerializer):
+    """
+    课程列表序列化器，一次性计算当前页所有课程的进度
+    """
+    def to_representation(self, data):
+        courses = list(data.all() if hasattr(data, 'all') else data)
+        # 通过 ?fields=/?omit= 排除进度时不做计算
+        if 'progress' in self.child.fields:
+            self.progress_map = get_course_progress_map(
+                [course.id for course in courses], self.context['request'].user
+            )
+        return super().to_representation(courses)
 
 
 class CourseListSerializer(CourseSerializer):
@@ -134,30 +188,9 @@ class CourseListSerializer(CourseSerializer):
 
     class Meta(CourseSerializer.Meta):
         fields = CourseSerializer.Meta.fields + ['progress']
+        list_serializer_class = CourseListProgressSerializer
 
-    def get_progress(self, obj):
-        """
-        计算课程的任务点完成进度
-        """
-        user = self.context['request'].user
-        if not user.is_authenticated:
-            return {'completed': 0, 'total': 0}
-
-        # 任务点被定义为没有子节点的章节（即“节”）
-        task_points = Chapter.objects.filter(course=obj, children__isnull=True)
-        total_tasks = task_points.count()
-
-        if total_tasks == 0:
-            return {'completed': 0, 'total': 0}
-
-        completed_tasks = ChapterReadStatus.objects.filter(
-            user=user,
-            chapter__in=task_points
-        ).count()
-
-        return {'completed': completed_tasks, 'total': total_tasks}
-
-class CourseMaterialSerializer(serializers.ModelSerializer):
+class CourseMaterialSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     课程资料序列化器
     """
@@ -168,7 +201,55 @@ class CourseMaterialSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'file', 'size', 'uploaded_by', 'uploaded_at', 'course']
         read_only_fields = ['course', 'size', 'uploaded_by']
 
-class AnnouncementSerializer(serializers.ModelSerializer):
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    断点续传上传会话序列化器
+    """
+    checksum = serializers.RegexField(r'^[0-9a-fA-F]{64}$', help_text='文件的 SHA-256 十六进制校验值')
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'target', 'chapter', 'filename', 'size', 'checksum', 'offset', 'status', 'created_at', 'updated_at']
+        read_only_fields = ['offset', 'status']
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("文件大小必须大于 0。")
+        return value
+
+    def validate(self, data):
+        chapter = data.get('chapter')
+        if data['target'] == 'material':
+            if chapter is not None:
+                raise serializers.ValidationError("上传课程资料时不能指定章节。")
+            return data
+
+        if chapter is None:
+            raise serializers.ValidationError("上传章节视频或PDF时必须指定章节。")
+        if chapter.course_id != int(self.context['course_pk']):
+            raise serializers.ValidationError("章节不属于该课程。")
+        # 与 ChapterWriteSerializer 一致：章不能包含视频或PDF文件
+        if chapter.parent_id is None:
+            raise serializers.ValidationError("章(Chapter)不能包含内容、视频或PDF文件。")
+        return data
+
+class TaskStudentSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    username = serializers.CharField()
+
+class TaskFeedItemSerializer(serializers.Serializer):
+    """
+    统一任务列表中的轻量任务摘要，详情通过各任务自己的接口获取
+    """
+    id = serializers.IntegerField()
+    task_type = serializers.CharField()
+    title = serializers.CharField()
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField(allow_null=True)
+    is_active = serializers.BooleanField()
+    student = TaskStudentSerializer(allow_null=True)
+
+class AnnouncementSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     课程公告序列化器
     """
@@ -210,37 +291,6 @@ class LearningRecordSerializer(serializers.Serializer):
 
     def get_chapter_summary(self, obj):
         """
-        计算章节任务点的完成进度
+        章节任务点的完成进度，由 build_learning_records 批量计算
         """
-        course = self.context.get('course')
-        if not course:
-            return {'completed': 0, 'total': 0, 'completion_rate': 0}
-
-        # 在 'obj' 中获取学生ID
-        student_id = obj.get('student_id')
-        try:
-            # 需要导入User模型
-            from users.models import User
-            user = User.objects.get(id=student_id)
-        except User.DoesNotExist:
-            return {'completed': 0, 'total': 0, 'completion_rate': 0}
-
-        # 任务点被定义为没有子节点的章节（即“节”）
-        task_points = Chapter.objects.filter(course=course, parent__isnull=False)
-        total_tasks = task_points.count()
-
-        if total_tasks == 0:
-            return {'completed': 0, 'total': 0, 'completion_rate': 0}
-
-        completed_tasks = ChapterReadStatus.objects.filter(
-            user=user,
-            chapter__in=task_points
-        ).count()
-        
-        completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-
-        return {
-            'completed': completed_tasks, 
-            'total': total_tasks,
-            'completion_rate': completion_rate
-        }
+        return obj.get('chapter_summary', {'completed': 0, 'total': 0, 'completion_rate': 0})
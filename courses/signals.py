@@ -0,0 +1,269 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from assignments.models import Assignment, Submission, Question, Choice
+from exams.models import Exam, ExamSubmission, ExamQuestion, ExamChoice
+from exams.papers import invalidate_student_paper
+from checkin.models import CheckinRecord
+from interaction.models import DiscussionTopic, DiscussionReply
+from .models import Course, CourseMaterial, Announcement, Chapter, ChapterReadStatus, LearningRecord
+from .storage import acquire_blob, release_blob
+from .storage_usage import MEDIA_FILE_FIELDS, get_file_sizes, adjust_course_storage
+from .membership import invalidate_course_roles
+from .grading import invalidate_answer_key, invalidate_item_analysis
+from .search import index_document, remove_document, get_document_type
+from .learning_records import refresh_learning_record, create_learning_records
+from .submission_counters import COUNTER_SOURCES, adjust_submission_counters
+from .deadlines import discard_missing_submissions, materialize_enrolled_students
+
+
+def _is_course_deletion(kwargs):
+    # 整个课程被删除时，汇总行会随课程一起级联删除，无需逐条刷新
+    return isinstance(kwargs.get('origin'), Course)
+
+
+@receiver([post_save, post_delete], sender=CheckinRecord)
+def update_checkin_learning_record(sender, instance, **kwargs):
+    if not _is_course_deletion(kwargs):
+        refresh_learning_record(instance.checkin.course_id, instance.student_id, 'checkin')
+
+
+@receiver([post_save, post_delete], sender=Submission)
+def update_assignment_learning_record(sender, instance, **kwargs):
+    if not _is_course_deletion(kwargs):
+        refresh_learning_record(instance.assignment.course_id, instance.student_id, 'assignment')
+
+
+@receiver([post_save, post_delete], sender=ExamSubmission)
+def update_exam_learning_record(sender, instance, **kwargs):
+    if not _is_course_deletion(kwargs):
+        refresh_learning_record(instance.exam.course_id, instance.student_id, 'exam')
+
+
+@receiver([post_save, post_delete], sender=DiscussionTopic)
+def update_topic_learning_record(sender, instance, **kwargs):
+    if not _is_course_deletion(kwargs):
+        refresh_learning_record(instance.course_id, instance.author_id, 'topic')
+
+
+@receiver([post_save, post_delete], sender=DiscussionReply)
+def update_reply_learning_record(sender, instance, **kwargs):
+    if not _is_course_deletion(kwargs):
+        refresh_learning_record(instance.topic.course_id, instance.author_id, 'reply')
+
+
+@receiver([post_save, post_delete], sender=ChapterReadStatus)
+def update_chapter_learning_record(sender, instance, **kwargs):
+    if not _is_course_deletion(kwargs):
+        refresh_learning_record(instance.chapter.course_id, instance.user_id, 'chapter')
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def update_enrollment_learning_records(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    学生加入课程时创建汇总行，退出课程时删除汇总行
+    """
+    if action == 'post_add':
+        if reverse:
+            for course_id in pk_set:
+                create_learning_records(course_id, [instance.id])
+        else:
+            create_learning_records(instance.id, list(pk_set))
+    elif action == 'post_remove':
+        if reverse:
+            LearningRecord.objects.filter(student=instance, course_id__in=pk_set).delete()
+        else:
+            LearningRecord.objects.filter(course=instance, student_id__in=pk_set).delete()
+    elif action == 'pre_clear':
+        if reverse:
+            LearningRecord.objects.filter(student=instance).delete()
+        else:
+            LearningRecord.objects.filter(course=instance).delete()
+
+
+@receiver(pre_save, sender=CourseMaterial)
+@receiver(pre_save, sender=Chapter)
+def remember_media_file_names(sender, instance, update_fields=None, **kwargs):
+    fields = MEDIA_FILE_FIELDS[sender]
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+    previous = {}
+    if fields and not instance._state.adding:
+        previous = sender.objects.filter(pk=instance.pk).values(*fields).first() or {}
+    instance._previous_media_names = {field: previous.get(field) for field in fields}
+
+
+@receiver(post_save, sender=CourseMaterial)
+@receiver(post_save, sender=Chapter)
+def update_media_blob_references(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_media_names', {})
+    added, removed = [], []
+    for field, old_name in previous.items():
+        new_name = getattr(instance, field).name or None
+        if new_name == (old_name or None):
+            continue
+        if new_name:
+            acquire_blob(new_name)
+            added.append(new_name)
+        if old_name:
+            release_blob(old_name)
+            removed.append(old_name)
+
+    if added or removed:
+        sizes = get_file_sizes(added + removed)
+        adjust_course_storage(
+            instance.course_id,
+            sum(sizes[name] for name in added) - sum(sizes[name] for name in removed),
+            len(added) - len(removed),
+        )
+
+
+@receiver(post_delete, sender=CourseMaterial)
+@receiver(post_delete, sender=Chapter)
+def release_media_blobs(sender, instance, **kwargs):
+    names = [getattr(instance, field).name for field in MEDIA_FILE_FIELDS[sender]]
+    names = [name for name in names if name]
+    for name in names:
+        release_blob(name)
+
+    if names and not _is_course_deletion(kwargs):
+        sizes = get_file_sizes(names)
+        adjust_course_storage(instance.course_id, -sum(sizes[name] for name in names), -len(names))
+
+
+def _invalidate_course_roles_on_commit(user_ids):
+    # 事务提交后再清除，避免其他进程在提交前把旧的成员关系重新写入缓存
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_course_roles(user_ids))
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def invalidate_enrollment_course_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        _invalidate_course_roles_on_commit([instance.id] if reverse else list(pk_set))
+    elif action == 'pre_clear':
+        if reverse:
+            _invalidate_course_roles_on_commit([instance.id])
+        else:
+            _invalidate_course_roles_on_commit(list(instance.students.values_list('id', flat=True)))
+
+
+@receiver(pre_save, sender=Course)
+def remember_course_teacher(sender, instance, **kwargs):
+    instance._previous_teacher_id = None
+    if not instance._state.adding:
+        instance._previous_teacher_id = sender.objects.filter(pk=instance.pk).values_list('teacher_id', flat=True).first()
+
+
+@receiver(post_save, sender=Course)
+def invalidate_teacher_course_roles(sender, instance, created, **kwargs):
+    previous_teacher_id = getattr(instance, '_previous_teacher_id', None)
+    if created or previous_teacher_id != instance.teacher_id:
+        _invalidate_course_roles_on_commit([instance.teacher_id, previous_teacher_id])
+
+
+@receiver(pre_delete, sender=Course)
+def invalidate_deleted_course_roles(sender, instance, **kwargs):
+    # 删除课程时选课记录被级联删除，不会发送 m2m_changed
+    _invalidate_course_roles_on_commit([instance.teacher_id, *instance.students.values_list('id', flat=True)])
+
+
+@receiver(post_save, sender=CourseMaterial)
+@receiver(post_save, sender=Announcement)
+@receiver(post_save, sender=Chapter)
+@receiver(post_save, sender=DiscussionTopic)
+@receiver(post_save, sender=DiscussionReply)
+def update_search_index(sender, instance, **kwargs):
+    index_document(instance)
+
+
+@receiver(post_delete, sender=CourseMaterial)
+@receiver(post_delete, sender=Announcement)
+@receiver(post_delete, sender=Chapter)
+@receiver(post_delete, sender=DiscussionTopic)
+@receiver(post_delete, sender=DiscussionReply)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_document(get_document_type(sender), instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def invalidate_assignment_answer_key(sender, instance, **kwargs):
+    invalidate_answer_key('assignment', instance.assignment_id)
+
+
+@receiver([post_save, post_delete], sender=ExamQuestion)
+def invalidate_exam_answer_key(sender, instance, **kwargs):
+    invalidate_answer_key('exam', instance.exam_id)
+    invalidate_student_paper(instance.exam_id)
+
+
+# 选项删除后无法再通过 question 找到所属试卷，因此在 pre_delete 中处理
+@receiver([post_save, pre_delete], sender=Choice)
+def invalidate_assignment_choice_answer_key(sender, instance, **kwargs):
+    invalidate_answer_key('assignment', instance.question.assignment_id)
+
+
+@receiver([post_save, pre_delete], sender=ExamChoice)
+def invalidate_exam_choice_answer_key(sender, instance, **kwargs):
+    invalidate_answer_key('exam', instance.question.exam_id)
+    invalidate_student_paper(instance.question.exam_id)
+
+
+@receiver([post_save, post_delete], sender=Exam)
+def invalidate_exam_paper(sender, instance, **kwargs):
+    invalidate_student_paper(instance.id)
+
+
+# 交卷和教师批改都会保存提交记录（批量重新评分时由 invalidate_answer_key 清除）
+@receiver([post_save, post_delete], sender=ExamSubmission)
+def invalidate_exam_item_analysis(sender, instance, **kwargs):
+    if not _is_course_deletion(kwargs):
+        invalidate_item_analysis('exam', instance.exam_id)
+
+
+@receiver(pre_save, sender=Submission)
+@receiver(pre_save, sender=ExamSubmission)
+def remember_submission_status(sender, instance, **kwargs):
+    instance._previous_status = None
+    if not instance._state.adding:
+        instance._previous_status = sender.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=Submission)
+@receiver(post_save, sender=ExamSubmission)
+def update_submission_counters(sender, instance, created, **kwargs):
+    _, paper_field = COUNTER_SOURCES[sender]
+    previous_status = None if created else getattr(instance, '_previous_status', None)
+    if previous_status != instance.status:
+        adjust_submission_counters(sender, getattr(instance, paper_field), previous_status, instance.status, is_missing=instance.is_missing)
+
+
+@receiver(post_delete, sender=Submission)
+@receiver(post_delete, sender=ExamSubmission)
+def release_submission_counters(sender, instance, **kwargs):
+    paper_model, paper_field = COUNTER_SOURCES[sender]
+    # 作业、考试或课程被删除时计数器随之删除，无需逐条更新
+    if isinstance(kwargs.get('origin'), (Course, paper_model)):
+        return
+    adjust_submission_counters(sender, getattr(instance, paper_field), instance.status, None, is_missing=instance.is_missing)
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_save, sender=Exam)
+def discard_extended_missing_submissions(sender, instance, created, **kwargs):
+    # 截止时间延后时删除调度器生成的 0 分记录
+    if not created:
+        discard_missing_submissions(instance)
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def materialize_enrollment_missing_submissions(sender, instance, action, reverse, pk_set, **kwargs):
+    # 截止时间已处理过的作业和考试不会再被调度器扫描，新加入的学生在这里补写 0 分记录
+    if action != 'post_add':
+        return
+    if reverse:
+        for course_id in pk_set:
+            materialize_enrolled_students(course_id, [instance.id])
+    else:
+        materialize_enrolled_students(instance.id, pk_set)
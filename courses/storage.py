@@ -0,0 +1,103 @@
+import os
+import hashlib
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 64 * 1024
+BLOB_DIR = 'blobs'
+
+
+def blob_name_for(digest, filename):
+    """
+    按内容哈希生成存储路径，保留原扩展名以便推断 Content-Type
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    按 SHA-256 内容寻址的文件存储：相同内容的文件只保存一份。
+
+    文件被多少条记录引用由 MediaBlob.ref_count 维护（见 courses.signals），
+    最后一个引用被移除时才删除文件。
+    """
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        # 断点续传等场景已计算过校验值，不必再读一遍文件
+        digest = getattr(content, 'sha256', None)
+        if digest is None:
+            sha256 = hashlib.sha256()
+            for chunk in content.chunks(CHUNK_SIZE):
+                sha256.update(chunk)
+            digest = sha256.hexdigest()
+            content.seek(0)
+
+        blob_name = blob_name_for(digest, name)
+        # 先刷新 updated_at，使正在回收的空引用文件在宽限期内不会被删除
+        MediaBlob.objects.update_or_create(
+            name=blob_name,
+            defaults={'sha256': digest, 'size': content.size, 'updated_at': timezone.now()},
+        )
+        if self.exists(blob_name):
+            return blob_name
+        return super()._save(blob_name, content)
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def acquire_blob(name):
+    """
+    文件字段引用了该文件，引用计数加一；非内容寻址的旧文件不做处理
+    """
+    from .models import MediaBlob
+    MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+
+def acquire_blobs(names):
+    """
+    批量增加引用计数（如复制课程时多条新记录引用同一批文件），按增量分组，每组一次 UPDATE
+    """
+    from .models import MediaBlob
+    counts = Counter(name for name in names if name)
+    by_increment = defaultdict(list)
+    for name, count in counts.items():
+        by_increment[count].append(name)
+    for increment, group in by_increment.items():
+        MediaBlob.objects.filter(name__in=group).update(ref_count=F('ref_count') + increment)
+
+
+def release_blob(name):
+    """
+    文件字段不再引用该文件，引用计数减一，事务提交后回收无引用的文件
+    """
+    from .models import MediaBlob
+    MediaBlob.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+    transaction.on_commit(lambda: delete_blob_if_unreferenced(name))
+
+
+def delete_blob_if_unreferenced(name):
+    """
+    删除引用计数为 0 的文件。
+
+    刚写入、尚未被记录引用的文件处于宽限期内暂不删除，避免与并发上传相同内容的请求冲突。
+    """
+    from .models import MediaBlob
+    cutoff = timezone.now() - timedelta(seconds=settings.MEDIA_BLOB_GRACE_PERIOD)
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(name=name, ref_count=0, updated_at__lt=cutoff).first()
+        if blob is None:
+            return False
+        content_addressed_storage.delete(blob.name)
+        blob.delete()
+    return True
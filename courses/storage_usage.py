@@ -0,0 +1,141 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import CourseMaterial, Chapter, CourseStorageUsage, MediaBlob
+from .storage import content_addressed_storage
+
+# 使用内容寻址存储的文件字段，引用计数和课程存储用量随记录的保存和删除维护
+MEDIA_FILE_FIELDS = {
+    CourseMaterial: ['file'],
+    Chapter: ['video', 'pdf'],
+}
+
+BATCH_SIZE = 1000
+
+
+def get_file_sizes(names):
+    """
+    返回 {文件名: 字节数}，优先使用 MediaBlob 中记录的大小，不访问磁盘
+    """
+    names = {name for name in names if name}
+    sizes = dict(MediaBlob.objects.filter(name__in=names).values_list('name', 'size'))
+    for name in names - sizes.keys():
+        # 启用内容寻址存储之前上传的旧文件没有 MediaBlob 记录
+        try:
+            sizes[name] = content_addressed_storage.size(name)
+        except OSError:
+            sizes[name] = 0
+    return sizes
+
+
+def adjust_course_storage(course_id, bytes_delta, count_delta):
+    """
+    增量更新课程存储用量。
+
+    汇总行尚未建立时不做处理，首次读取时由 get_course_storage 完整统计一次。
+    """
+    if not bytes_delta and not count_delta:
+        return
+    CourseStorageUsage.objects.filter(course_id=course_id).update(
+        total_bytes=Greatest(F('total_bytes') + bytes_delta, Value(0)),
+        file_count=Greatest(F('file_count') + count_delta, Value(0)),
+        updated_at=timezone.now(),
+    )
+
+
+def _iter_course_files(course_ids=None):
+    for model, fields in MEDIA_FILE_FIELDS.items():
+        queryset = model.objects.all()
+        if course_ids is not None:
+            queryset = queryset.filter(course_id__in=course_ids)
+        for course_id, *names in queryset.values_list('course_id', *fields).iterator(chunk_size=BATCH_SIZE):
+            for name in names:
+                if name:
+                    yield course_id, name
+
+
+def compute_course_storage(course_ids=None):
+    """
+    完整统计课程存储用量，返回 {course_id: (字节数, 文件数)}。
+
+    同一文件被课程内多条记录引用时按引用次数计入，与增量维护的口径一致。
+    """
+    totals = defaultdict(lambda: [0, 0])
+    batch = []
+
+    def flush():
+        sizes = get_file_sizes(name for _, name in batch)
+        for course_id, name in batch:
+            totals[course_id][0] += sizes[name]
+            totals[course_id][1] += 1
+        batch.clear()
+
+    for item in _iter_course_files(course_ids):
+        batch.append(item)
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    flush()
+    return {course_id: tuple(values) for course_id, values in totals.items()}
+
+
+def rebuild_course_storage(course_ids):
+    """
+    重新统计并写入指定课程的存储用量汇总行
+    """
+    course_ids = list(course_ids)
+    totals = compute_course_storage(course_ids)
+    with transaction.atomic():
+        CourseStorageUsage.objects.filter(course_id__in=course_ids).delete()
+        CourseStorageUsage.objects.bulk_create(
+            [
+                CourseStorageUsage(course_id=course_id, total_bytes=totals.get(course_id, (0, 0))[0],
+                                   file_count=totals.get(course_id, (0, 0))[1])
+                for course_id in course_ids
+            ],
+            batch_size=500,
+        )
+
+
+def get_course_storage(course):
+    """
+    返回课程存储用量汇总行，不存在时先完整统计一次
+    """
+    usage = CourseStorageUsage.objects.filter(course=course).first()
+    if usage is None:
+        rebuild_course_storage([course.id])
+        usage = CourseStorageUsage.objects.get(course=course)
+    return usage
+
+
+def count_blob_references():
+    """
+    按文件字段的实际取值统计每个文件被引用的次数
+    """
+    counts = defaultdict(int)
+    for model, fields in MEDIA_FILE_FIELDS.items():
+        for field in fields:
+            rows = (
+                model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                .values(field).annotate(refs=Count('pk')).values_list(field, 'refs')
+            )
+            for name, refs in rows.iterator(chunk_size=BATCH_SIZE):
+                counts[name] += refs
+    return counts
+
+
+def reconcile_blob_references(dry_run=False):
+    """
+    校正 MediaBlob.ref_count，返回 [(文件名, 原计数, 实际引用数)]
+    """
+    counts = count_blob_references()
+    mismatched = []
+    for name, ref_count in MediaBlob.objects.values_list('name', 'ref_count').iterator(chunk_size=BATCH_SIZE):
+        actual = counts.get(name, 0)
+        if actual != ref_count:
+            mismatched.append((name, ref_count, actual))
+    if not dry_run:
+        for name, _, actual in mismatched:
+            MediaBlob.objects.filter(name=name).update(ref_count=actual)
+    return mismatched
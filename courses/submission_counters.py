@@ -0,0 +1,73 @@
+from django.db.models import Count, F, Q
+from assignments.models import Assignment, Submission
+from exams.models import Exam, ExamSubmission
+from .models import SubmissionCounters
+
+# 提交记录模型 -> (作业或考试模型, 指向它的外键)
+COUNTER_SOURCES = {
+    Submission: (Assignment, 'assignment_id'),
+    ExamSubmission: (Exam, 'exam_id'),
+}
+
+
+def _contribution(status, is_missing=False):
+    """
+    一条提交记录对 (提交记录数, 已批改数, 待手动批改数, 逾期未提交数) 的贡献，status 为 None 表示记录不存在。
+
+    逾期未提交的 0 分记录由 courses.deadlines 生成，计入提交记录数和已批改数。
+    """
+    if status is None:
+        return (0, 0, 0, 0)
+    return (1, int(status == 'graded'), int(status == 'submitted'), int(is_missing))
+
+
+def adjust_submission_counters(submission_model, paper_id, old_status, new_status, count=1, is_missing=False):
+    """
+    count 条提交记录的状态从 old_status 变为 new_status 后，用 F() 原子更新所属作业或考试的计数器
+    """
+    paper_model, _ = COUNTER_SOURCES[submission_model]
+    deltas = {
+        field: F(field) + (new - old) * count
+        for field, old, new in zip(
+            SubmissionCounters.COUNTER_FIELDS, _contribution(old_status, is_missing), _contribution(new_status, is_missing)
+        )
+        if new != old
+    }
+    if deltas and count:
+        paper_model.objects.filter(pk=paper_id).update(**deltas)
+
+
+def compute_submission_counters(submission_model):
+    """
+    按提交记录完整统计计数器，返回 {作业或考试 ID: (提交记录数, 已批改数, 待手动批改数, 逾期未提交数)}
+    """
+    _, paper_field = COUNTER_SOURCES[submission_model]
+    rows = (
+        submission_model.objects.values(paper_field)
+        .annotate(
+            total=Count('id'),
+            graded=Count('id', filter=Q(status='graded')),
+            pending=Count('id', filter=Q(status='submitted')),
+            missing=Count('id', filter=Q(is_missing=True)),
+        )
+        .order_by()
+    )
+    return {row[paper_field]: (row['total'], row['graded'], row['pending'], row['missing']) for row in rows}
+
+
+def reconcile_submission_counters(dry_run=False):
+    """
+    校正所有作业和考试的计数器，返回 [(模型名, ID, 原计数, 实际计数)]
+    """
+    mismatched = []
+    for submission_model, (paper_model, _) in COUNTER_SOURCES.items():
+        actual_counts = compute_submission_counters(submission_model)
+        changed = []
+        for paper_id, *stored in paper_model.objects.values_list('id', *SubmissionCounters.COUNTER_FIELDS).iterator():
+            actual = actual_counts.get(paper_id, (0, 0, 0, 0))
+            if tuple(stored) != actual:
+                mismatched.append((paper_model._meta.model_name, paper_id, tuple(stored), actual))
+                changed.append(paper_model(id=paper_id, **dict(zip(SubmissionCounters.COUNTER_FIELDS, actual))))
+        if not dry_run:
+            paper_model.objects.bulk_update(changed, SubmissionCounters.COUNTER_FIELDS, batch_size=500)
+    return mismatched
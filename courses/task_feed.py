@@ -0,0 +1,132 @@
+import json
+import heapq
+import base64
+from datetime import datetime
+from django.db.models import Q
+from checkin.models import Checkin
+from interaction.models import RandomQuestion, Vote
+from feedback.models import Questionnaire
+
+# 时间相同的任务按此顺序排列，同时作为游标中任务类型的排序依据
+TASK_TYPES = ['checkin', 'random_question', 'vote', 'feedback']
+
+
+def _checkin_rows(queryset):
+    for row in queryset.values('id', 'title', 'start_time', 'end_time', 'is_active'):
+        yield {**row, 'task_type': 'checkin', 'student': None}
+
+
+def _random_question_rows(queryset):
+    for row in queryset.values('id', 'created_at', 'status', 'student_id', 'student__username'):
+        student = None
+        title = "随机提问 - 待抽选"
+        if row['student_id']:
+            student = {'id': row['student_id'], 'username': row['student__username']}
+            title = f"随机提问 - {row['student__username']}"
+        yield {
+            'id': row['id'],
+            'task_type': 'random_question',
+            'title': title,
+            'start_time': row['created_at'],
+            'end_time': None,
+            'is_active': row['status'] == 'ongoing',
+            'student': student,
+        }
+
+
+def _vote_rows(queryset):
+    for row in queryset.values('id', 'title', 'created_at', 'is_active'):
+        yield {
+            'id': row['id'],
+            'task_type': 'vote',
+            'title': row['title'],
+            'start_time': row['created_at'],
+            'end_time': None,
+            'is_active': row['is_active'],
+            'student': None,
+        }
+
+
+def _feedback_rows(queryset):
+    for row in queryset.values('id', 'title', 'created_at'):
+        yield {
+            'id': row['id'],
+            'task_type': 'feedback',
+            'title': row['title'],
+            'start_time': row['created_at'],
+            'end_time': None,
+            # 问卷没有结束状态，始终视为进行中
+            'is_active': True,
+            'student': None,
+        }
+
+
+# 任务类型 -> (模型, 开始时间字段, 生成轻量行的函数)
+TASK_SOURCES = {
+    'checkin': (Checkin, 'start_time', _checkin_rows),
+    'random_question': (RandomQuestion, 'created_at', _random_question_rows),
+    'vote': (Vote, 'created_at', _vote_rows),
+    'feedback': (Questionnaire, 'created_at', _feedback_rows),
+}
+
+
+def encode_cursor(task):
+    payload = [task['start_time'].isoformat(), task['task_type'], task['id']]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    解析游标，返回 (开始时间, 任务类型, ID)；游标无效时抛出 ValueError
+    """
+    try:
+        start_time, task_type, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        start_time = datetime.fromisoformat(start_time)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError('无效的游标') from e
+    if task_type not in TASK_SOURCES or not isinstance(task_id, int):
+        raise ValueError('无效的游标')
+    return start_time, task_type, task_id
+
+
+def _keyset_filter(time_field, task_type, cursor):
+    """
+    只取排在游标之后的任务：按 (开始时间, 任务类型, ID) 降序
+    """
+    start_time, cursor_type, cursor_id = cursor
+    rank = TASK_TYPES.index(task_type)
+    cursor_rank = TASK_TYPES.index(cursor_type)
+    before = Q(**{f'{time_field}__lt': start_time})
+    if rank > cursor_rank:
+        return before
+    if rank < cursor_rank:
+        return before | Q(**{time_field: start_time})
+    return before | Q(**{time_field: start_time, 'id__lt': cursor_id})
+
+
+def _sort_key(task):
+    return (task['start_time'], TASK_TYPES.index(task['task_type']), task['id'])
+
+
+def get_task_page(course, page_size, cursor=None, task_types=None):
+    """
+    返回课程任务列表的一页 (tasks, has_more)，task_types 为空时包含所有类型。
+
+    每种任务按开始时间降序各取至多 page_size + 1 行，再用 heapq 做 k 路归并，
+    查询次数固定为任务类型数，与任务总数无关。
+    """
+    sources = []
+    for task_type in [task_type for task_type in TASK_TYPES if not task_types or task_type in task_types]:
+        model, time_field, to_rows = TASK_SOURCES[task_type]
+        queryset = model.objects.filter(course=course)
+        if cursor is not None:
+            queryset = queryset.filter(_keyset_filter(time_field, task_type, cursor))
+        queryset = queryset.order_by(f'-{time_field}', '-id')[:page_size + 1]
+        sources.append(to_rows(queryset))
+
+    tasks = []
+    for task in heapq.merge(*sources, key=_sort_key, reverse=True):
+        tasks.append(task)
+        if len(tasks) > page_size:
+            break
+    return tasks[:page_size], len(tasks) > page_size
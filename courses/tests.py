@@ -0,0 +1,136 @@
+import datetime
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from assignments.models import Assignment, Question, Answer, Submission
+from exams.models import Exam, ExamQuestion, ExamAnswer, ExamSubmission
+from users.models import User
+from .deadlines import run_due_deadlines
+from .models import Course
+from .submission_counters import reconcile_submission_counters
+
+# 测试使用进程内缓存，不读写开发环境的缓存目录
+TEST_CACHES = {
+    alias: {**config, 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'test-{alias}'}
+    for alias, config in settings.CACHES.items()
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SubmissionCountersTests(TestCase):
+    """
+    作业和考试上的提交计数器由信号、批量批改和截止时间处理分别增量维护，
+    每一步之后都应与按提交记录重新统计的结果一致
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        now = timezone.now()
+        self.teacher = User.objects.create_user(username='teacher', password='x', role='teacher')
+        self.students = [
+            User.objects.create_user(username=f'student{i}', password='x', role='student', student_id=f'2024{i:03d}')
+            for i in range(3)
+        ]
+        self.course = Course.objects.create(name='Course', teacher=self.teacher)
+        self.course.students.set(self.students[:2])
+
+        self.assignment = Assignment.objects.create(course=self.course, title='Assignment', due_date=now + datetime.timedelta(days=1))
+        self.assignment_tf = Question.objects.create(
+            assignment=self.assignment, text='tf', question_type='true_false', points=1, correct_answer='true'
+        )
+        self.assignment_sa = Question.objects.create(assignment=self.assignment, text='sa', question_type='short_answer', points=5)
+
+        self.exam = Exam.objects.create(
+            course=self.course, title='Exam', time_limit=60,
+            start_time=now - datetime.timedelta(hours=1), end_time=now + datetime.timedelta(hours=2),
+        )
+        self.exam_tf = ExamQuestion.objects.create(exam=self.exam, text='tf', question_type='true_false', points=2, correct_answer='true')
+        self.exam_sa = ExamQuestion.objects.create(exam=self.exam, text='sa', question_type='short_answer', points=5)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def assertCountersConsistent(self):
+        self.assertEqual(reconcile_submission_counters(dry_run=True), [])
+
+    def submit(self):
+        first, second, _ = self.students
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_for(first).post('/api/submissions/', {
+                'assignment': self.assignment.id, 'answers': [{'question': self.assignment_tf.id, 'text': 'true'}],
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+            response = self.client_for(second).post('/api/submissions/', {
+                'assignment': self.assignment.id, 'answers': [{'question': self.assignment_sa.id, 'text': 'essay'}],
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+
+            submission_id = self.client_for(first).post(f'/api/exams/{self.exam.id}/start/').json()['id']
+            response = self.client_for(first).post(f'/api/exam-submissions/{submission_id}/submit/', {
+                'answers': [{'question': self.exam_tf.id, 'text': 'true'}, {'question': self.exam_sa.id, 'text': 'essay'}],
+            }, format='json')
+            self.assertEqual(response.status_code, 200)
+
+    def batch_grade(self):
+        answer = Answer.objects.get(question=self.assignment_sa)
+        exam_answer = ExamAnswer.objects.get(question=self.exam_sa)
+        client = self.client_for(self.teacher)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                f'/api/assignments/{self.assignment.id}/questions/{self.assignment_sa.id}/answers/',
+                {'scores': [{'id': answer.id, 'score': 4}]}, format='json',
+            )
+            self.assertEqual(response.status_code, 200)
+            response = client.post(
+                f'/api/exams/{self.exam.id}/questions/{self.exam_sa.id}/answers/',
+                {'scores': [{'id': exam_answer.id, 'score': 3}]}, format='json',
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertFalse(Submission.objects.filter(status='submitted').exists())
+        self.assertFalse(ExamSubmission.objects.filter(status='submitted').exists())
+
+    def test_counters_stay_consistent(self):
+        self.submit()
+        self.assertCountersConsistent()
+
+        self.batch_grade()
+        self.assertCountersConsistent()
+
+        # 截止后调度器为没有提交记录的学生生成 0 分记录
+        past = timezone.now() - datetime.timedelta(minutes=1)
+        Assignment.objects.filter(pk=self.assignment.pk).update(due_date=past)
+        Exam.objects.filter(pk=self.exam.pk).update(start_time=past - datetime.timedelta(hours=2), end_time=past)
+        result = run_due_deadlines()
+        self.assertEqual(result['materialized'], {'assignment': 0, 'exam': 1})
+        self.assertCountersConsistent()
+
+        # 截止后加入课程的学生补写 0 分记录
+        late = self.students[2]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.students.add(late)
+        self.assertTrue(Submission.objects.filter(assignment=self.assignment, student=late, is_missing=True).exists())
+        self.assertTrue(ExamSubmission.objects.filter(exam=self.exam, student=late, is_missing=True).exists())
+        self.assertCountersConsistent()
+
+        # 截止时间延后删除 0 分记录
+        self.assignment.refresh_from_db()
+        self.assignment.due_date = timezone.now() + datetime.timedelta(days=1)
+        self.assignment.save()
+        self.assertFalse(Submission.objects.filter(assignment=self.assignment, is_missing=True).exists())
+        self.assertCountersConsistent()
+
+        Submission.objects.filter(student=self.students[0]).delete()
+        ExamSubmission.objects.filter(student=late).delete()
+        self.assertCountersConsistent()
+
+        self.assignment.refresh_from_db()
+        self.exam.refresh_from_db()
+        self.assertEqual(
+            (self.assignment.total_submissions, self.assignment.graded_submissions, self.assignment.missing_submissions), (1, 1, 0)
+        )
+        self.assertEqual((self.exam.total_submissions, self.exam.graded_submissions, self.exam.missing_submissions), (2, 2, 1))
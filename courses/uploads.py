@@ -0,0 +1,137 @@
+import os
+import hashlib
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from .models import CourseMaterial, Chapter, UploadSession
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadOffsetMismatch(Exception):
+    """
+    分片偏移量与服务器已接收的字节数不一致
+    """
+    def __init__(self, offset):
+        super().__init__(offset)
+        self.offset = offset
+
+
+def get_staging_path(session):
+    return os.path.join(settings.UPLOAD_STAGING_ROOT, f'{session.pk}.part')
+
+
+def write_chunk(session, offset, stream, length):
+    """
+    将请求体按块写入暂存文件的 offset 处，不把整个分片读入内存。
+
+    offset 必须等于已接收的字节数；重复发送的分片会因偏移量不一致被拒绝，
+    客户端应按返回的 offset 继续上传。返回写入后的偏移量。
+    """
+    if offset != session.offset:
+        raise UploadOffsetMismatch(session.offset)
+    if offset + length > session.size:
+        raise ValueError('分片超出文件声明的大小')
+
+    path = get_staging_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mode = 'r+b' if os.path.exists(path) else 'wb'
+    written = 0
+    with open(path, mode) as f:
+        f.seek(offset)
+        while written < length:
+            chunk = stream.read(min(CHUNK_SIZE, length - written))
+            if not chunk:
+                break
+            f.write(chunk)
+            written += len(chunk)
+        # 丢弃上一次中断时可能残留在 offset 之后的数据
+        f.truncate()
+
+    new_offset = offset + written
+    # 条件更新：并发上传同一偏移量时只有一个请求能推进 offset
+    updated = UploadSession.objects.filter(pk=session.pk, offset=offset, status='uploading').update(offset=new_offset)
+    if not updated:
+        session.refresh_from_db(fields=['offset'])
+        raise UploadOffsetMismatch(session.offset)
+    session.offset = new_offset
+    return new_offset
+
+
+def file_checksum(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class StagedFile(File):
+    """
+    已在暂存目录中组装完成的文件。
+
+    提供 temporary_file_path() 后，文件存储会直接移动该文件（同一文件系统上只是一次 rename），
+    不会重新读写文件内容；sha256 为已校验的哈希值，内容寻址存储无需再次计算。
+    """
+    def __init__(self, path, name, sha256):
+        super().__init__(None, name)
+        self.path = path
+        self.sha256 = sha256
+        self.size = os.path.getsize(path)
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def finalize_upload(session):
+    """
+    校验已接收的文件并挂载到课程资料或章节上，返回被挂载的对象
+    """
+    staging_path = get_staging_path(session)
+    if session.offset != session.size or not os.path.exists(staging_path):
+        raise ValueError('文件尚未上传完成')
+    checksum = session.checksum.lower()
+    if file_checksum(staging_path) != checksum:
+        # 内容已损坏，清空暂存文件让客户端从头重传
+        os.remove(staging_path)
+        UploadSession.objects.filter(pk=session.pk).update(offset=0)
+        session.offset = 0
+        raise ValueError('文件校验失败，请重新上传')
+
+    with transaction.atomic():
+        if session.target == 'material':
+            instance = CourseMaterial(
+                course_id=session.course_id,
+                uploaded_by_id=session.uploaded_by_id,
+                name=session.filename,
+                size=session.size,
+            )
+            field_name = 'file'
+        else:
+            instance = Chapter.objects.select_for_update().get(pk=session.chapter_id)
+            field_name = 'video' if session.target == 'chapter_video' else 'pdf'
+
+        getattr(instance, field_name).save(session.filename, StagedFile(staging_path, session.filename, checksum), save=False)
+        if instance.pk:
+            instance.save(update_fields=[field_name])
+        else:
+            instance.save()
+
+        session.status = 'completed'
+        session.save(update_fields=['status', 'updated_at'])
+
+    # 相同内容的文件已存在时暂存文件不会被移动，直接删除
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+    return instance
+
+
+def discard_upload(session):
+    """
+    删除会话及其暂存文件
+    """
+    try:
+        os.remove(get_staging_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
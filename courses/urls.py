@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework_nested import routers
-from .views import CourseViewSet, CourseMaterialViewSet, AnnouncementViewSet, ChapterViewSet, LearningRecordView, TaskListView
+from .views import CourseViewSet, CourseMaterialViewSet, AnnouncementViewSet, ChapterViewSet, LearningRecordView, LearningRecordExportView, TaskListView, UploadSessionViewSet, CourseSearchView
 from checkin.views import CheckinViewSet
 from interaction.views import RandomQuestionViewSet
 
@@ -11,6 +11,7 @@ courses_router = routers.NestedDefaultRouter(router, r'courses', lookup='course'
 courses_router.register(r'chapters', ChapterViewSet, basename='course-chapters')
 courses_router.register(r'announcements', AnnouncementViewSet, basename='course-announcements')
 courses_router.register(r'materials', CourseMaterialViewSet, basename='course-materials')
+courses_router.register(r'uploads', UploadSessionViewSet, basename='course-uploads')
 courses_router.register(r'checkins', CheckinViewSet, basename='course-checkins')
 courses_router.register(r'random_questions', RandomQuestionViewSet, basename='course-random-questions')
 
@@ -19,5 +20,7 @@ urlpatterns = [
     path('', include(router.urls)),
     path('', include(courses_router.urls)),
     path('courses/<int:course_id>/learning_records/', LearningRecordView.as_view(), name='learning-records'),
+    path('courses/<int:course_id>/learning_records/export/', LearningRecordExportView.as_view(), name='learning-records-export'),
     path('courses/<int:course_id>/tasks/', TaskListView.as_view(), name='course-tasks'),
+    path('courses/<int:course_id>/search/', CourseSearchView.as_view(), name='course-search'),
 ]
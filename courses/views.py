@@ -1,32 +1,38 @@
 import os
-import re
-import mimetypes
+import csv
 import random
+import tempfile
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse, HttpResponse, Http404
+from django.http import Http404, StreamingHttpResponse
 from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
 from django.views.decorators.clickjacking import xframe_options_exempt
-from rest_framework import viewsets, permissions, status, serializers
+from rest_framework import viewsets, mixins, permissions, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import replace_query_param
 from users.models import User
 from users.serializers import UserSerializer
-from .models import Course, CourseMaterial, Announcement, Chapter, ChapterReadStatus
+from .models import Course, CourseMaterial, Announcement, Chapter, ChapterReadStatus, UploadSession
 from .serializers import (
     CourseSerializer, CourseListSerializer, CourseMaterialSerializer, 
     AnnouncementSerializer, ChapterSerializer, ChapterWriteSerializer,
-    LearningRecordSerializer
+    LearningRecordSerializer, UploadSessionSerializer, TaskFeedItemSerializer, build_chapter_tree_context
 )
-from .permissions import IsTeacherOrReadOnly, IsCourseMember
-from checkin.models import Checkin, CheckinRecord
-from assignments.models import Assignment, Submission
-from exams.models import Exam, ExamSubmission
-from interaction.models import DiscussionTopic, DiscussionReply, RandomQuestion, Vote
-from feedback.models import Questionnaire
-from checkin.serializers import CheckinSerializer
-from interaction.serializers import RandomQuestionSerializer, VoteSerializer
-from feedback.serializers import QuestionnaireSerializer
+from .permissions import IsTeacherOrReadOnly, IsCourseMember, IsCourseTeacher
+from .membership import is_course_member, is_course_teacher, get_member_course_ids, TEACHER, STUDENT
+from .learning_records import build_learning_records, iter_learning_record_rows
+from .media import media_file_response, get_media_user, get_media_course_ids, can_access_course_media
+from .uploads import UploadOffsetMismatch, write_chunk, finalize_upload, discard_upload
+from .task_feed import TASK_TYPES, get_task_page, encode_cursor, decode_cursor
+from .roster import parse_roster_csv, resolve_students, enroll_students, unenroll_students, build_roster_report
+from .search import DOCUMENT_TYPES, SearchUnavailable, search_course, filter_by_search
+from .storage_usage import get_course_storage
+from .cloning import clone_course
+from .gradebook import build_gradebook
 from itertools import chain
 
 class ChapterViewSet(viewsets.ModelViewSet):
@@ -54,6 +60,16 @@ class ChapterViewSet(viewsets.ModelViewSet):
             return queryset.filter(parent__isnull=True)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """
+        Build the whole chapter/section tree in memory instead of querying per node.
+        """
+        chapters, tree_context = build_chapter_tree_context(self.kwargs['course_pk'], request.user)
+        context = self.get_serializer_context()
+        context.update(tree_context)
+        serializer = ChapterSerializer(chapters, many=True, context=context)
+        return Response(serializer.data)
+
     def perform_create(self, serializer):
         """
         Associate the chapter with the course from the URL.
@@ -112,9 +128,9 @@ class CourseViewSet(viewsets.ModelViewSet):
         if user.is_staff:  # Admins see all courses
             return Course.objects.all()
         if user.is_teacher:
-            return Course.objects.filter(teacher=user)
+            return Course.objects.filter(pk__in=get_member_course_ids(user, TEACHER))
         elif user.is_student:
-            return user.enrolled_courses.all()
+            return Course.objects.filter(pk__in=get_member_course_ids(user, STUDENT))
         return Course.objects.none()  # Default to no courses if role is not set
 
     def perform_create(self, serializer):
@@ -173,6 +189,92 @@ class CourseViewSet(viewsets.ModelViewSet):
         course.students.remove(student)
         return Response({'status': 'Student removed successfully.'}, status=status.HTTP_200_OK)
 
+    def _roster_entries(self, request):
+        """
+        从请求中读取名单：上传的 CSV 文件（file）或用户 ID 列表（student_ids）
+        """
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file:
+            return parse_roster_csv(uploaded_file)
+
+        student_ids = request.data.get('student_ids')
+        if not isinstance(student_ids, list) or not student_ids:
+            raise ValueError('Provide a list of student_ids or a CSV file.')
+        return [(index, 'id', str(student_id)) for index, student_id in enumerate(student_ids, start=1)]
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsTeacherOrReadOnly])
+    def bulk_enroll(self, request, pk=None):
+        """
+        Enroll many students at once and report the result of every row.
+        """
+        course = self.get_object()
+        try:
+            entries = self._roster_entries(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        students = resolve_students(entries)
+        added = enroll_students(course, {student.id for student in students.values()})
+        report = build_roster_report(entries, students, added, 'enrolled', 'already_enrolled')
+        return Response({'enrolled': len(added), 'results': report}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsTeacherOrReadOnly])
+    def bulk_unenroll(self, request, pk=None):
+        """
+        Remove many students at once and report the result of every row.
+        """
+        course = self.get_object()
+        try:
+            entries = self._roster_entries(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        students = resolve_students(entries)
+        removed = unenroll_students(course, {student.id for student in students.values()})
+        report = build_roster_report(entries, students, removed, 'removed', 'not_enrolled')
+        return Response({'removed': len(removed), 'results': report}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsTeacherOrReadOnly])
+    def clone(self, request, pk=None):
+        """
+        Copy the course content into a new course owned by the current teacher.
+        """
+        course = self.get_object()
+        if not (request.user.is_staff or is_course_teacher(request.user, course.id)):
+            return Response({'error': 'Only the course teacher can clone this course.'}, status=status.HTTP_403_FORBIDDEN)
+
+        name = (request.data.get('name') or '').strip() or course.name
+        new_course = clone_course(course, request.user, name=name)
+        serializer = CourseSerializer(new_course, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def storage(self, request, pk=None):
+        """
+        Get the storage used by the course's materials and chapter files.
+        """
+        course = self.get_object()
+        if not (request.user.is_staff or is_course_teacher(request.user, course.id)):
+            return Response({"detail": "You do not have permission to view course storage."}, status=status.HTTP_403_FORBIDDEN)
+
+        usage = get_course_storage(course)
+        return Response({
+            'total_bytes': usage.total_bytes,
+            'file_count': usage.file_count,
+            'updated_at': usage.updated_at,
+        })
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def gradebook(self, request, pk=None):
+        """
+        Get the students x (assignments + exams) grade matrix with per-item statistics and per-student totals.
+        """
+        course = self.get_object()
+        if not (request.user.is_staff or is_course_teacher(request.user, course.id)):
+            return Response({"detail": "You do not have permission to view the gradebook."}, status=status.HTTP_403_FORBIDDEN)
+
+        return Response(build_gradebook(course))
+
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def members(self, request, pk=None):
         """
@@ -180,7 +282,7 @@ class CourseViewSet(viewsets.ModelViewSet):
         """
         course = self.get_object()
         # 验证用户是否有权查看成员列表
-        if not (request.user.is_staff or course.teacher == request.user or request.user in course.students.all()):
+        if not (request.user.is_staff or is_course_member(request.user, course.id)):
             return Response({"detail": "You do not have permission to view course members."}, status=status.HTTP_403_FORBIDDEN)
         
         # 同时获取教师和学生
@@ -207,18 +309,16 @@ class CourseMaterialViewSet(viewsets.ModelViewSet):
         """
         - 仅返回当前用户有权访问的课程的资料。
         - 教师或学生可以查看他们所在课程的资料。
+        - ?search= 按全文索引过滤，英文按词首前缀匹配（不匹配词中间的子串），见 courses.search.filter_by_search。
         """
         course_pk = self.kwargs['course_pk']
         user = self.request.user
         # 检查用户是否是该课程的教师或学生
-        is_teacher = Course.objects.filter(pk=course_pk, teacher=user).exists()
-        is_student = user.enrolled_courses.filter(pk=course_pk).exists()
-
-        if is_teacher or is_student or user.is_staff:
+        if is_course_member(user, course_pk) or user.is_staff:
             queryset = CourseMaterial.objects.filter(course_id=course_pk)
             search_query = self.request.query_params.get('search', None)
             if search_query:
-                queryset = queryset.filter(name__icontains=search_query)
+                queryset = filter_by_search(queryset, course_pk, search_query, 'material', Q(name__icontains=search_query))
             return queryset
         
         # 如果用户无权访问，则返回空查询集
@@ -252,10 +352,10 @@ class CourseMaterialViewSet(viewsets.ModelViewSet):
         material = self.get_object()
         
         try:
-            # 直接使用 FileResponse 发送文件，以便浏览器可以预览
-            # as_attachment=False 建议浏览器内联显示（预览）
-            return FileResponse(open(material.file.path, 'rb'), as_attachment=False)
-        except FileNotFoundError:
+            # 权限已由 get_queryset 校验；文件以内联方式返回，以便浏览器可以预览
+            # 生产环境下由 Nginx 通过 X-Accel-Redirect 直接发送文件
+            return media_file_response(request, material.file.name)
+        except Http404:
             return Response({"detail": "文件未找到。"}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             # 捕获其他潜在错误
@@ -280,6 +380,82 @@ class CourseMaterialViewSet(viewsets.ModelViewSet):
         queryset.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    断点续传上传课程资料和章节视频/PDF。
+
+    1. POST   /uploads/                  创建会话（filename, size, checksum, target, chapter）
+    2. PUT    /uploads/<id>/?offset=N    以原始请求体上传从 offset 开始的分片
+    3. GET    /uploads/<id>/             查询已接收的字节数，用于断点续传
+    4. POST   /uploads/<id>/finalize/    校验 SHA-256 并挂载到课程资料或章节
+    5. DELETE /uploads/<id>/             放弃上传
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated, IsCourseTeacher]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(course_id=self.kwargs['course_pk'], uploaded_by=self.request.user)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['course_pk'] = self.kwargs['course_pk']
+        return context
+
+    def perform_create(self, serializer):
+        serializer.save(course_id=self.kwargs['course_pk'], uploaded_by=self.request.user)
+
+    def perform_destroy(self, instance):
+        discard_upload(instance)
+
+    def update(self, request, *args, **kwargs):
+        """
+        上传一个分片。请求体为原始字节，直接按块写入暂存文件。
+        """
+        session = self.get_object()
+        if session.status != 'uploading':
+            return Response({"detail": "该上传已完成。"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            offset = int(request.query_params.get('offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({"detail": "offset 参数无效。"}, status=status.HTTP_400_BAD_REQUEST)
+        if length <= 0:
+            return Response({"detail": "分片内容不能为空。"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # 不访问 request.data，避免解析器把整个请求体读入内存
+            write_chunk(session, offset, request.stream, length)
+        except UploadOffsetMismatch as e:
+            return Response({"detail": "分片偏移量不一致，请从 offset 处继续上传。", "offset": e.offset},
+                            status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(session).data)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None, course_pk=None):
+        """
+        校验完整文件并挂载到目标对象
+        """
+        session = self.get_object()
+        if session.status != 'uploading':
+            return Response({"detail": "该上传已完成。"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            instance = finalize_upload(session)
+        except ValueError as e:
+            return Response({"detail": str(e), "offset": session.offset}, status=status.HTTP_400_BAD_REQUEST)
+
+        if session.target == 'material':
+            data = CourseMaterialSerializer(instance, context=self.get_serializer_context()).data
+        else:
+            data = ChapterSerializer(instance, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
 class AnnouncementViewSet(viewsets.ModelViewSet):
     """
     API endpoint that allows announcements to be viewed or edited.
@@ -305,51 +481,16 @@ def ranged_media_view(request, path):
     """
     A view that serves media files and supports HTTP Range requests.
     This is necessary for video seeking (fast-forwarding and rewinding) in browsers.
+    Only members of a course that references the file may access it.
     """
-    # Construct the full path to the file
-    full_path = os.path.join(settings.MEDIA_ROOT, path)
-    
-    # Check if the file exists
-    if not os.path.exists(full_path):
+    course_ids = get_media_course_ids(path)
+    if not course_ids:
         raise Http404("File not found")
 
-    # Get file size and content type
-    file_size = os.path.getsize(full_path)
-    content_type, _ = mimetypes.guess_type(full_path)
-    content_type = content_type or 'application/octet-stream'
-    
-    # Handle Range header
-    range_header = request.META.get('HTTP_RANGE', '').strip()
-    range_re = re.compile(r'bytes\s*=\s*(\d+)\s*-\s*(\d*)', re.I)
-    range_match = range_re.match(range_header)
-    
-    if range_match:
-        first_byte, last_byte = range_match.groups()
-        first_byte = int(first_byte) if first_byte else 0
-        last_byte = int(last_byte) if last_byte else file_size - 1
-        
-        if last_byte >= file_size:
-            last_byte = file_size - 1
-            
-        length = last_byte - first_byte + 1
-        
-        response = HttpResponse(status=206)
-        response['Content-Type'] = content_type
-        response['Content-Length'] = str(length)
-        response['Content-Range'] = f'bytes {first_byte}-{last_byte}/{file_size}'
-        response['Accept-Ranges'] = 'bytes'
-        
-        with open(full_path, 'rb') as f:
-            f.seek(first_byte)
-            response.content = f.read(length)
-        
-        return response
-    else:
-        # Serve the whole file if no Range header
-        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
-        response['Content-Length'] = str(file_size)
-        response['Accept-Ranges'] = 'bytes'
-        return response
+    if not can_access_course_media(get_media_user(request, path), course_ids):
+        raise PermissionDenied
+
+    return media_file_response(request, path)
 
 class LearningRecordView(APIView):
     """
@@ -362,7 +503,7 @@ class LearningRecordView(APIView):
         user = request.user
 
         # 验证用户权限
-        if not (user.is_staff or course.teacher == user or user in course.students.all()):
+        if not (user.is_staff or is_course_member(user, course.id)):
             return Response({"detail": "您没有权限查看此课程的学习记录。"}, status=status.HTTP_403_FORBIDDEN)
 
         # 教师或管理员可以查看指定学生或所有学生
@@ -378,114 +519,164 @@ class LearningRecordView(APIView):
         else: # 学生只能查看自己的记录
             students_to_process = [user]
 
-        learning_records = []
-        for student in students_to_process:
-            # 1. 签到统计
-            total_checkins = Checkin.objects.filter(course=course).count()
-            student_records = CheckinRecord.objects.filter(checkin__course=course, student=student)
-            
-            checkin_summary = {
-                'total': total_checkins,
-                'present': student_records.filter(status='present').count(),
-                'late': student_records.filter(status='late').count(),
-                'absent': total_checkins - student_records.exclude(status='absent').count(),
-                'sick_leave': student_records.filter(status='sick_leave').count(),
-                'personal_leave': student_records.filter(status='personal_leave').count(),
-            }
-            attendance_count = checkin_summary['present'] + checkin_summary['late']
-            checkin_summary['attendance_rate'] = (attendance_count / total_checkins * 100) if total_checkins > 0 else 0
-
-            # 2. 作业统计
-            total_assignments = Assignment.objects.filter(course=course).count()
-            completed_assignments = Submission.objects.filter(assignment__course=course, student=student).count()
-            assignment_summary = {
-                'total': total_assignments,
-                'completed': completed_assignments,
-                'completion_rate': (completed_assignments / total_assignments * 100) if total_assignments > 0 else 0
-            }
-
-            # 3. 考试统计
-            total_exams = Exam.objects.filter(course=course).count()
-            completed_exams = ExamSubmission.objects.filter(exam__course=course, student=student, status__in=['submitted', 'graded']).count()
-            exam_summary = {
-                'total': total_exams,
-                'completed': completed_exams,
-                'completion_rate': (completed_exams / total_exams * 100) if total_exams > 0 else 0
-            }
-
-            # 4. 讨论统计
-            discussion_summary = {
-                'topic_count': DiscussionTopic.objects.filter(course=course, author=student).count(),
-                'reply_count': DiscussionReply.objects.filter(topic__course=course, author=student).count(),
-            }
-
-            # 准备数据以供序列化器使用
-            record_data = {
-                'student_id': student.id,
-                'student_name': student.get_full_name() or student.username,
-                'checkin_summary': checkin_summary,
-                'assignment_summary': assignment_summary,
-                'exam_summary': exam_summary,
-                'discussion_summary': discussion_summary,
-            }
-
-            # 实例化并使用序列化器
-            serializer = LearningRecordSerializer(
-                instance=record_data,
-                context={'course': course, 'user': student}
+        learning_records = build_learning_records(course, students_to_process)
+        serializer = LearningRecordSerializer(learning_records, many=True)
+        return Response(serializer.data)
+
+
+class Echo:
+    """
+    只实现 write 的伪文件对象，配合 csv.writer 逐行生成 CSV 内容
+    """
+    def write(self, value):
+        return value
+
+
+def iter_file_chunks(file_obj, chunk_size=64 * 1024):
+    """
+    按固定大小分块读取文件，读完后关闭文件
+    """
+    try:
+        while True:
+            chunk = file_obj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file_obj.close()
+
+
+class LearningRecordExportView(APIView):
+    """
+    以 CSV 或 XLSX 格式流式导出课程的学习记录和成绩
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= 用于选择导出文件格式，而不是 DRF 的渲染器；错误信息始终以 JSON 返回
+        renderer = JSONRenderer()
+        return (renderer, renderer.media_type)
+
+    def get(self, request, course_id):
+        course = get_object_or_404(Course, pk=course_id)
+        user = request.user
+
+        if not (user.is_staff or is_course_teacher(user, course.id)):
+            return Response({"detail": "您没有权限导出此课程的学习记录。"}, status=status.HTTP_403_FORBIDDEN)
+
+        export_format = request.query_params.get('format', 'csv')
+        rows = iter_learning_record_rows(course)
+        filename = f'learning_records_course_{course.id}.{export_format}'
+
+        if export_format == 'csv':
+            writer = csv.writer(Echo())
+            # 写入 BOM 以便 Excel 正确识别 UTF-8 中文
+            content = chain(['\ufeff'], (writer.writerow(row) for row in rows))
+            response = StreamingHttpResponse(content, content_type='text/csv; charset=utf-8')
+        elif export_format == 'xlsx':
+            try:
+                from openpyxl import Workbook
+            except ImportError:
+                return Response({"detail": "服务器未安装 openpyxl，无法导出 XLSX。"}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+            # write_only 模式下行数据写入临时文件，内存占用与行数无关
+            workbook = Workbook(write_only=True)
+            worksheet = workbook.create_sheet('学习记录')
+            for row in rows:
+                worksheet.append(row)
+            output = tempfile.TemporaryFile()
+            workbook.save(output)
+            output.seek(0)
+            response = StreamingHttpResponse(
+                iter_file_chunks(output),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
             )
-            learning_records.append(serializer.data)
+        else:
+            return Response({"detail": "不支持的导出格式，请使用 csv 或 xlsx。"}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(learning_records)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
 
 class TaskListView(APIView):
     """
-    获取课程的统一任务列表，包括签到、随机提问和投票。
+    获取课程的统一任务列表，包括签到、随机提问、投票和问卷。
+
+    按开始时间降序游标分页：?cursor=<上一页返回的游标>&page_size=<每页数量>
+    &type=<checkin|random_question|vote|feedback，可重复，默认全部>
     """
     permission_classes = [permissions.IsAuthenticated, IsCourseMember]
+    page_size = 20
+    max_page_size = 100
 
     def get(self, request, course_id):
         # 验证课程是否存在
         course = get_object_or_404(Course, pk=course_id)
 
-        # 获取所有签到任务
-        checkins = Checkin.objects.filter(course=course)
-        checkin_data = CheckinSerializer(checkins, many=True, context={'request': request}).data
-        for item in checkin_data:
-            item['task_type'] = 'checkin'
-
-        # 获取所有随机提问任务
-        random_questions = RandomQuestion.objects.filter(course=course)
-        random_question_data = RandomQuestionSerializer(random_questions, many=True, context={'request': request}).data
-        for item in random_question_data:
-            item['task_type'] = 'random_question'
-            if item.get('student'):
-                item['title'] = f"随机提问 - {item['student']['username']}"
-            else:
-                item['title'] = "随机提问 - 待抽选"
-            item['start_time'] = item['created_at']
-            item['is_active'] = item['status'] == 'ongoing'
-
-        # 获取所有投票任务
-        votes = Vote.objects.filter(course=course)
-        vote_data = VoteSerializer(votes, many=True, context={'request': request}).data
-        # 'task_type' 已经在 VoteSerializer 中设置了
-
-        # 获取所有反馈任务
-        questionnaires = Questionnaire.objects.filter(course=course)
-        questionnaire_data = QuestionnaireSerializer(questionnaires, many=True, context={'request': request}).data
-        for item in questionnaire_data:
-            item['task_type'] = 'feedback'
-            item['start_time'] = item['created_at']
-            # is_active 应该由模型或序列化器定义，这里暂时设为True，后续可以根据需求调整
-            item['is_active'] = True 
-
-        # 合并并按开始时间降序排序
-        combined_tasks = sorted(
-            chain(checkin_data, random_question_data, vote_data, questionnaire_data),
-            key=lambda x: x.get('start_time'),
-            reverse=True
-        )
+        try:
+            page_size = min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size)
+        except ValueError:
+            page_size = self.page_size
+        if page_size <= 0:
+            page_size = self.page_size
+
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                cursor = decode_cursor(cursor)
+            except ValueError:
+                return Response({"detail": "无效的游标。"}, status=status.HTTP_400_BAD_REQUEST)
+
+        task_types = request.query_params.getlist('type')
+        invalid_types = [task_type for task_type in task_types if task_type not in TASK_TYPES]
+        if invalid_types:
+            return Response({"detail": f"无效的类型: {', '.join(invalid_types)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        tasks, has_more = get_task_page(course, page_size, cursor or None, task_types)
+
+        next_url = None
+        if has_more:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_cursor(tasks[-1]))
+
+        return Response({
+            'next': next_url,
+            'results': TaskFeedItemSerializer(tasks, many=True).data,
+        })
+
+
+class CourseSearchView(APIView):
+    """
+    在课程内全文检索资料、公告、章节和讨论，按相关度排序并返回高亮片段。
+
+    ?q=<关键词>&type=<material|announcement|chapter|discussion_topic|discussion_reply，可重复>&limit=&offset=
+    英文和数字按词首前缀匹配（lect 能匹配 lecture，ture 不能），汉字按相邻的字组成的短语匹配。
+    """
+    permission_classes = [permissions.IsAuthenticated, IsCourseMember]
+    default_limit = 20
+    max_limit = 100
 
-        return Response(combined_tasks)
+    def get(self, request, course_id):
+        get_object_or_404(Course, pk=course_id)
+
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"detail": "请输入搜索关键词。"}, status=status.HTTP_400_BAD_REQUEST)
+
+        object_types = request.query_params.getlist('type')
+        invalid_types = [object_type for object_type in object_types if object_type not in DOCUMENT_TYPES]
+        if invalid_types:
+            return Response({"detail": f"无效的类型: {', '.join(invalid_types)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({"detail": "limit 或 offset 参数无效。"}, status=status.HTTP_400_BAD_REQUEST)
+        if limit <= 0:
+            limit = self.default_limit
+
+        try:
+            results = search_course(course_id, query, object_types or None, limit=limit, offset=offset)
+        except SearchUnavailable as e:
+            return Response({"detail": str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        return Response({'results': results})
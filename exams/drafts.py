@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from courses.grading import get_answer_key, grade_submission
+from .models import ExamSubmission, ExamAnswer
+
+CACHE_ALIAS = 'exam_drafts'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _draft_key(submission_id):
+    return f'exam_drafts:answers:{submission_id}'
+
+
+def _flush_key(submission_id):
+    return f'exam_drafts:flushed:{submission_id}'
+
+
+def _flushed_at_key(submission_id):
+    # 最近一次写库的暂存答案的 saved_at，独立于暂存答案保存，后台写库时不会覆盖并发保存的答案
+    return f'exam_drafts:flushed_at:{submission_id}'
+
+
+def get_drafts(submission):
+    """
+    返回考试中暂存的答案 {'answers': {question_id: 答案文本}, 'saved_at': 时间}。
+
+    缓存中没有时（缓存被清空或过期）从已写入数据库的 ExamAnswer 恢复。
+    """
+    cache = caches[CACHE_ALIAS]
+    drafts = cache.get(_draft_key(submission.id))
+    if drafts is None:
+        answers = dict(submission.answers.filter(question__isnull=False).values_list('question_id', 'text'))
+        drafts = {'answers': answers, 'saved_at': None}
+        cache.set(_draft_key(submission.id), drafts, CACHE_TIMEOUT)
+    return drafts
+
+
+def save_drafts(submission, answers):
+    """
+    把 {question_id: 答案文本} 合并进缓存中的暂存答案，空文本表示清空该题。
+
+    客户端可以频繁调用（如每次输入后），只有距上次写库超过 EXAM_DRAFT_FLUSH_INTERVAL 秒时
+    才写入 ExamAnswer，其余调用只更新缓存。
+    """
+    cache = caches[CACHE_ALIAS]
+    drafts = get_drafts(submission)
+    drafts['answers'].update(answers)
+    drafts['saved_at'] = timezone.now()
+    cache.set(_draft_key(submission.id), drafts, CACHE_TIMEOUT)
+
+    # add 只在键不存在时成功，键的有效期即写库的最小间隔；
+    # 窗口内之后的修改由 flush_pending_drafts 在窗口结束后写库
+    if cache.add(_flush_key(submission.id), True, settings.EXAM_DRAFT_FLUSH_INTERVAL):
+        flush_drafts(submission, drafts['answers'])
+        cache.set(_flushed_at_key(submission.id), drafts['saved_at'], CACHE_TIMEOUT)
+    return drafts
+
+
+def flush_pending_drafts():
+    """
+    把写库窗口已结束、但最后一次保存尚未写库的暂存答案写入 ExamAnswer，返回写库的答卷数。
+
+    由截止时间调度器（courses.deadlines）定期调用：学生在窗口内最后一次修改后关闭页面或崩溃时，
+    修改最多延迟约 EXAM_DRAFT_FLUSH_INTERVAL 秒写入数据库，而不是等到下一次保存或交卷。
+    """
+    cache = caches[CACHE_ALIAS]
+    submissions = {submission.id: submission for submission in ExamSubmission.objects.filter(status='taking')}
+    if not submissions:
+        return 0
+    cached = cache.get_many([_draft_key(submission_id) for submission_id in submissions])
+    flushed_at = cache.get_many([_flushed_at_key(submission_id) for submission_id in submissions])
+
+    count = 0
+    for submission_id, submission in submissions.items():
+        drafts = cached.get(_draft_key(submission_id))
+        if drafts is None or drafts['saved_at'] is None:
+            continue
+        last_flushed = flushed_at.get(_flushed_at_key(submission_id))
+        if last_flushed is not None and last_flushed >= drafts['saved_at']:
+            continue
+        # 与 save_drafts 共用节流键：窗口尚未结束时留给下一次调用
+        if not cache.add(_flush_key(submission_id), True, settings.EXAM_DRAFT_FLUSH_INTERVAL):
+            continue
+        flush_drafts(submission, drafts['answers'])
+        cache.set(_flushed_at_key(submission_id), drafts['saved_at'], CACHE_TIMEOUT)
+        count += 1
+    return count
+
+
+def flush_drafts(submission, answers):
+    """
+    把暂存答案写入 ExamAnswer（得分为空），已清空的题目删除对应记录
+    """
+    existing = {answer.question_id: answer for answer in submission.answers.filter(question__isnull=False)}
+    changed = []
+    created = []
+    removed = []
+    for question_id, text in answers.items():
+        answer = existing.get(question_id)
+        if not text:
+            if answer is not None:
+                removed.append(answer.id)
+        elif answer is None:
+            created.append(ExamAnswer(submission=submission, question_id=question_id, text=text))
+        elif answer.text != text:
+            answer.text = text
+            changed.append(answer)
+
+    with transaction.atomic():
+        if removed:
+            ExamAnswer.objects.filter(id__in=removed).delete()
+        if changed:
+            ExamAnswer.objects.bulk_update(changed, ['text'])
+        if created:
+            ExamAnswer.objects.bulk_create(created)
+
+
+def clear_drafts(submission_id):
+    """
+    交卷后删除暂存答案，在事务提交后执行，交卷失败时暂存答案仍然保留
+    """
+    def delete():
+        caches[CACHE_ALIAS].delete_many([_draft_key(submission_id), _flush_key(submission_id), _flushed_at_key(submission_id)])
+    transaction.on_commit(delete)
+
+
+def submit_drafts(submission, answers=None, submitted_at=None):
+    """
+    交卷：answers（{question_id: 答案文本}）优先于暂存答案，空答案和已删除题目的答案丢弃。
+
+    整份答卷在内存中评分后，在一个事务中替换已写库的暂存答案。考试超时未交卷时由
+    courses.deadlines 调用，submitted_at 为作答截止时间。
+    """
+    answer_key = get_answer_key('exam', submission.exam_id)
+    merged = dict(get_drafts(submission)['answers'])
+    merged.update(answers or {})
+    exam_answers = [
+        ExamAnswer(question_id=question_id, text=text)
+        for question_id, text in merged.items()
+        if text and question_id in answer_key
+    ]
+
+    submission.submitted_at = submitted_at or timezone.now()
+    with transaction.atomic():
+        submission.answers.all().delete()
+        grade_submission('exam', submission, exam_answers)
+        clear_drafts(submission.id)
+    return submission
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:38
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_submission_counters(apps, schema_editor):
+    Exam = apps.get_model('exams', 'Exam')
+    ExamSubmission = apps.get_model('exams', 'ExamSubmission')
+    rows = (
+        ExamSubmission.objects.values('exam_id')
+        .annotate(total=Count('id'), graded=Count('id', filter=Q(status='graded')), pending=Count('id', filter=Q(status='submitted')))
+        .order_by()
+    )
+    for row in rows:
+        Exam.objects.filter(pk=row['exam_id']).update(
+            total_submissions=row['total'], graded_submissions=row['graded'], pending_manual=row['pending'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_coursestorageusage'),
+        ('exams', '0004_alter_examanswer_question'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='graded_submissions',
+            field=models.PositiveIntegerField(default=0, verbose_name='已批改数'),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='pending_manual',
+            field=models.PositiveIntegerField(default=0, verbose_name='待手动批改数'),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='total_submissions',
+            field=models.PositiveIntegerField(default=0, verbose_name='提交记录数'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['course', 'total_submissions', 'graded_submissions'], name='exam_submission_counts'),
+        ),
+        migrations.RunPython(populate_submission_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0005_submission_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='deadline_processed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='截止处理时间'),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='missing_submissions',
+            field=models.PositiveIntegerField(default=0, verbose_name='逾期未提交数'),
+        ),
+        migrations.AddField(
+            model_name='examsubmission',
+            name='is_missing',
+            field=models.BooleanField(default=False, verbose_name='逾期未提交'),
+        ),
+    ]
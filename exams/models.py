@@ -1,8 +1,8 @@
 from django.db import models
 from users.models import User
-from courses.models import Course
+from courses.models import Course, SubmissionCounters
 
-class Exam(models.Model):
+class Exam(SubmissionCounters):
     """
     考试模型
     """
@@ -12,6 +12,12 @@ class Exam(models.Model):
     start_time = models.DateTimeField(verbose_name='开始时间', null=True, blank=True)
     end_time = models.DateTimeField(verbose_name='结束时间', null=True, blank=True)
     time_limit = models.PositiveIntegerField(default=60, verbose_name='考试时长(分钟)')
+    deadline_processed_at = models.DateTimeField(null=True, blank=True, verbose_name='截止处理时间')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['course', 'total_submissions', 'graded_submissions'], name='exam_submission_counts'),
+        ]
 
     def __str__(self):
         return self.title
@@ -63,6 +69,7 @@ class ExamSubmission(models.Model):
     grade = models.FloatField(blank=True, null=True, verbose_name='分数')
     feedback = models.TextField(blank=True, null=True, verbose_name='教师评语')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='taking', verbose_name='状态')
+    is_missing = models.BooleanField(default=False, verbose_name='逾期未提交')
 
     def __str__(self):
         return f'{self.student.username} - {self.exam.title}'
@@ -0,0 +1,53 @@
+import time
+from django.core.cache import caches
+from django.db import transaction
+from .models import Exam
+from .serializers import ExamSerializer
+
+CACHE_ALIAS = 'exam_papers'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(exam_id):
+    return f'exam_papers:version:{exam_id}'
+
+
+def _paper_key(exam_id, version):
+    return f'exam_papers:paper:{exam_id}:{version}'
+
+
+def _get_version(cache, exam_id):
+    version = cache.get(_version_key(exam_id))
+    if version is None:
+        cache.add(_version_key(exam_id), time.time_ns(), None)
+        version = cache.get(_version_key(exam_id))
+    return version
+
+
+def get_student_paper(exam, context):
+    """
+    返回学生视角的试卷（不含标准答案，submission 字段为 None）序列化后的 dict。
+
+    试卷按版本号缓存：题目、选项或考试修改后换用新版本号，
+    修改前开始渲染的请求只会写入旧版本的缓存，不会覆盖新版本。
+    """
+    cache = caches[CACHE_ALIAS]
+    key = _paper_key(exam.id, _get_version(cache, exam.id))
+    paper = cache.get(key)
+    if paper is None:
+        exam = Exam.objects.select_related('course').prefetch_related('questions__choices').get(pk=exam.pk)
+        paper = dict(ExamSerializer(exam, context={**context, 'show_answers': False}).data, submission=None)
+        cache.set(key, paper, CACHE_TIMEOUT)
+    return paper
+
+
+def render_student_paper(exam, submission_data, context):
+    """
+    在缓存的试卷中填入当前学生的提交记录，结果与 ExamSerializer 的输出相同（字段顺序也相同）
+    """
+    return {**get_student_paper(exam, context), 'submission': submission_data}
+
+
+def invalidate_student_paper(exam_id):
+    # 事务提交后再更换版本号，避免其他进程在提交前读到旧数据并写入新版本
+    transaction.on_commit(lambda: caches[CACHE_ALIAS].set(_version_key(exam_id), time.time_ns(), None))
@@ -1,4 +1,5 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
+from courses.membership import is_course_teacher, is_course_student
 from .models import Exam
 
 
@@ -12,11 +13,11 @@ class CanRetrieveExam(BasePermission):
             return False
         
         # Allow teacher of the course
-        if obj.course.teacher == request.user:
+        if is_course_teacher(request.user, obj.course_id):
             return True
         
         # Allow enrolled students for safe methods
-        if request.method in SAFE_METHODS and request.user in obj.course.students.all():
+        if request.method in SAFE_METHODS and is_course_student(request.user, obj.course_id):
             return True
         
         return False
@@ -29,7 +30,7 @@ class IsTeacherOfCourse(BasePermission):
     def has_object_permission(self, request, view, obj):
         # For Exam objects
         if hasattr(obj, 'course'):
-            return obj.course.teacher == request.user
+            return is_course_teacher(request.user, obj.course_id)
         return False
 
 class IsEnrolledStudent(BasePermission):
@@ -48,12 +49,11 @@ class IsEnrolledStudent(BasePermission):
             if not exam_id:
                 return False
             
-            try:
-                # Efficiently find the course associated with the exam
-                exam = Exam.objects.select_related('course').get(id=exam_id)
-                return request.user in exam.course.students.all()
-            except Exam.DoesNotExist:
+            # Only the course id is needed to check enrollment
+            course_id = Exam.objects.filter(id=exam_id).values_list('course_id', flat=True).first()
+            if course_id is None:
                 return False
+            return is_course_student(request.user, course_id)
         
         # For SAFE_METHODS (GET, HEAD, OPTIONS), permission is granted.
         return True
@@ -65,5 +65,5 @@ class IsSubmissionOwnerOrTeacher(BasePermission):
     def has_object_permission(self, request, view, obj):
         # For ExamSubmission objects
         if hasattr(obj, 'student') and hasattr(obj, 'exam'):
-            return obj.student == request.user or obj.exam.course.teacher == request.user
+            return obj.student_id == request.user.id or is_course_teacher(request.user, obj.exam.course_id)
         return False
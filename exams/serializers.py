@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.utils import timezone
+from iclass_server.serializers import DynamicFieldsMixin
 from .models import Exam, ExamQuestion, ExamChoice, ExamSubmission, ExamAnswer
 
 class StudentExamSubmissionStatusSerializer(serializers.ModelSerializer):
@@ -36,7 +37,7 @@ class ExamQuestionSerializer(serializers.ModelSerializer):
             ret.pop('correct_answer', None)
         return ret
 
-class ExamSerializer(serializers.ModelSerializer):
+class ExamSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     questions = ExamQuestionSerializer(many=True)
     submission_stats = serializers.SerializerMethodField()
     student_submissions = serializers.SerializerMethodField()
@@ -46,6 +47,7 @@ class ExamSerializer(serializers.ModelSerializer):
     class Meta:
         model = Exam
         fields = ['id', 'course', 'title', 'description', 'start_time', 'end_time', 'time_limit', 'questions', 'submission_stats', 'student_submissions', 'is_teacher', 'submission']
+        expandable_fields = ['student_submissions']
 
     def get_is_teacher(self, obj):
         user = self.context['request'].user
@@ -65,26 +67,19 @@ class ExamSerializer(serializers.ModelSerializer):
         if not self.get_is_teacher(obj):
             return None
         
-        submissions = ExamSubmission.objects.filter(exam=obj)
         total_students = obj.course.students.count()
         
-        # Count manually graded submissions
-        manually_graded_count = submissions.filter(status='graded').count()
-        
-        # Count auto-graded (not submitted and past due date)
-        auto_graded_count = 0
+        # Counters are kept on the exam by courses.signals; students who missed the deadline
+        # get a zero-grade submission from the deadline scheduler (courses.deadlines)
+        graded_submissions = obj.graded_submissions
         if obj.end_time and timezone.now() > obj.end_time:
-            submitted_student_ids = submissions.values_list('student_id', flat=True)
-            not_submitted_count = obj.course.students.exclude(id__in=submitted_student_ids).count()
-            auto_graded_count = not_submitted_count
-
-        total_graded = manually_graded_count + auto_graded_count
-        total_submissions = submissions.count() # This remains the count of actual submissions
+            # Until the scheduler has run, count students without a record as graded with 0
+            graded_submissions += max(total_students - obj.total_submissions, 0)
 
         return {
             'total_students': total_students,
-            'total_submissions': total_submissions,
-            'graded_submissions': total_graded
+            'total_submissions': obj.total_submissions - obj.missing_submissions,
+            'graded_submissions': graded_submissions
         }
 
     def get_student_submissions(self, obj):
@@ -104,24 +99,19 @@ class ExamSerializer(serializers.ModelSerializer):
                     'student_id': student.id,
                     'student_name': student.username,
                     'status': submission.status,
-                    'submission_id': submission.id,
+                    'submission_id': None if submission.is_missing else submission.id,
                     'grade': submission.grade
                 })
             else:
-                # Student has not submitted
-                grade = None
-                status = 'not_submitted'
-                # If the due date has passed, mark as graded with 0 score
-                if obj.end_time and timezone.now() > obj.end_time:
-                    grade = 0
-                    status = 'graded'
-
+                # Student has not submitted; past the deadline this matches the zero-grade
+                # record the deadline scheduler will create
+                past_due = bool(obj.end_time and timezone.now() > obj.end_time)
                 student_submission_statuses.append({
                     'student_id': student.id,
                     'student_name': student.username,
-                    'status': status,
+                    'status': 'graded' if past_due else 'not_submitted',
                     'submission_id': None,
-                    'grade': grade
+                    'grade': 0 if past_due else None
                 })
         return student_submission_statuses
 
@@ -199,8 +189,8 @@ class ExamSubmissionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ExamSubmission
-        fields = ['id', 'exam', 'student', 'student_id', 'start_time', 'submitted_at', 'grade', 'feedback', 'status', 'answers']
-        read_only_fields = ['grade', 'feedback', 'status', 'start_time', 'submitted_at']
+        fields = ['id', 'exam', 'student', 'student_id', 'start_time', 'submitted_at', 'grade', 'feedback', 'status', 'is_missing', 'answers']
+        read_only_fields = ['grade', 'feedback', 'status', 'is_missing', 'start_time', 'submitted_at']
 
     def validate(self, data):
         exam = data.get('exam')
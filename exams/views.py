@@ -1,11 +1,21 @@
-import json
 import datetime
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Count, F
+from django.db.models import Q, F
+from django.db.models import prefetch_related_objects
+from courses.membership import get_member_course_ids, TEACHER
+from courses.grading import (
+    get_answer_key, regrade_submissions, list_question_answers, parse_answer_scores, grade_question_answers,
+)
+from courses.item_analysis import get_item_analysis
+from iclass_server.pagination import GradingPagination
+
+from .drafts import get_drafts, save_drafts, submit_drafts
+from .papers import render_student_paper
 
 from .models import Exam, ExamQuestion, ExamSubmission, ExamAnswer
 from .serializers import ExamSerializer, ExamSubmissionSerializer
@@ -48,20 +58,13 @@ class ExamViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(course_id=course_id)
 
         if not (user.is_staff or user.is_superuser):
-            teacher_courses = user.teaching_courses.all()
-            student_courses = user.enrolled_courses.all()
-            queryset = queryset.filter(
-                Q(course__in=teacher_courses) | Q(course__in=student_courses)
-            ).distinct()
+            queryset = queryset.filter(course_id__in=get_member_course_ids(user))
 
         status = self.request.query_params.get('status')
         if status:
             now = timezone.now()
             if user.role == 'teacher':
-                queryset = queryset.annotate(
-                    total_submissions=Count('submissions', distinct=True),
-                    graded_submissions=Count('submissions', filter=Q(submissions__status='graded'), distinct=True)
-                )
+                # total_submissions / graded_submissions are counters kept on Exam by courses.signals
                 if status == 'grading':
                     # "In Progress" OR ("Ended" AND "Has Submissions" AND "Not Fully Graded")
                     queryset = queryset.filter(
@@ -81,10 +84,11 @@ class ExamViewSet(viewsets.ModelViewSet):
                         submissions__student=user
                     ).filter(end_time__gte=now)
                 elif status == 'completed':
-                    # Submitted or graded
+                    # Submitted or graded (zero-grade records for missed exams are not completed work)
                     queryset = queryset.filter(
                         submissions__student=user, 
-                        submissions__status__in=['submitted', 'graded']
+                        submissions__status__in=['submitted', 'graded'],
+                        submissions__is_missing=False
                     )
         
         return queryset
@@ -102,8 +106,59 @@ class ExamViewSet(viewsets.ModelViewSet):
         # The problematic re-grading logic that was here has been removed
         # to prevent student scores from being reset when an exam is edited.
         # Auto-grading now only happens upon submission, consistent with the assignments module.
+        # After fixing the answer key, teachers can explicitly POST to the regrade action.
         return super().update(request, *args, **kwargs)
 
+    @action(detail=True, methods=['post'])
+    def regrade(self, request, pk=None):
+        """
+        Re-score objective answers of all submitted papers against the current answer key.
+        Manually graded short-answer scores are kept.
+        """
+        exam = self.get_object()
+        result = regrade_submissions('exam', exam.id)
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get', 'post'], url_path=r'questions/(?P<question_id>\d+)/answers')
+    def question_answers(self, request, pk=None, question_id=None):
+        """
+        Grade one question across all submissions.
+        GET lists the answers to the question, paginated (?ungraded=true for unscored answers only);
+        POST {"scores": [{"id": <answer id>, "score": <score>}, ...]} scores many answers at once.
+        """
+        exam = self.get_object()
+        question = get_object_or_404(ExamQuestion, pk=question_id, exam=exam)
+
+        if request.method == 'GET':
+            answers = list_question_answers('exam', question.id)
+            if request.query_params.get('ungraded') in ('1', 'true'):
+                answers = answers.filter(score__isnull=True)
+            paginator = GradingPagination()
+            page = paginator.paginate_queryset(answers, request, view=self)
+            response = paginator.get_paginated_response(page)
+            response.data['question'] = {
+                'id': question.id,
+                'text': question.text,
+                'question_type': question.question_type,
+                'points': question.points,
+            }
+            return response
+
+        try:
+            scores = parse_answer_scores(request.data.get('scores', []))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        result = grade_question_answers('exam', question, scores)
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'])
+    def analysis(self, request, pk=None):
+        """
+        Item analysis of all submitted papers: difficulty, discrimination, choice distribution and KR-20 reliability.
+        """
+        exam = self.get_object()
+        return Response(get_item_analysis(exam.id), status=status.HTTP_200_OK)
+
     def validate_exam_times(self, data):
         start_time = data.get('start_time')
         end_time = data.get('end_time')
@@ -120,14 +175,22 @@ class ExamViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         user = request.user
         show_answers = False
+        context = self.get_serializer_context()
 
         if user.role == 'teacher' or user.is_staff or user.is_superuser:
             show_answers = True
         elif user.role == 'student':
-            if ExamSubmission.objects.filter(exam=instance, student=user, status='graded').exists():
+            submission = ExamSubmission.objects.filter(exam=instance, student=user).select_related('student').prefetch_related('answers').first()
+            # A missed exam's zero-grade record must not reveal the answers: the end time may still be extended
+            if submission is not None and submission.status == 'graded' and not submission.is_missing:
                 show_answers = True
-        
-        context = self.get_serializer_context()
+            elif not any(param in request.query_params for param in ('fields', 'omit', 'expand')):
+                # When an exam opens the whole class loads it at once: serve the shared paper
+                # from cache and only serialize this student's submission.
+                submission_data = ExamSubmissionSerializer(submission, context=context).data if submission else None
+                return Response(render_student_paper(instance, submission_data, context))
+
+        prefetch_related_objects([instance], 'questions__choices')
         context['show_answers'] = show_answers
         
         serializer = self.get_serializer(instance, context=context)
@@ -167,7 +230,7 @@ class ExamSubmissionViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action == 'create':
             self.permission_classes = [IsAuthenticated, IsEnrolledStudent]
-        elif self.action in ['retrieve', 'update', 'partial_update', 'destroy', 'grade', 'submit_exam']:
+        elif self.action in ['retrieve', 'update', 'partial_update', 'destroy', 'grade', 'submit_exam', 'drafts']:
             self.permission_classes = [IsAuthenticated, IsSubmissionOwnerOrTeacher]
         else: # list action
             self.permission_classes = [IsAuthenticated]
@@ -181,8 +244,7 @@ class ExamSubmissionViewSet(viewsets.ModelViewSet):
         elif user.role == 'student':
             queryset = ExamSubmission.objects.filter(student=user)
         elif user.role == 'teacher':
-            teacher_courses = user.teaching_courses.all()
-            queryset = ExamSubmission.objects.filter(exam__course__in=teacher_courses)
+            queryset = ExamSubmission.objects.filter(exam__course_id__in=get_member_course_ids(user, TEACHER))
         else:
             queryset = ExamSubmission.objects.none()
 
@@ -192,72 +254,68 @@ class ExamSubmissionViewSet(viewsets.ModelViewSet):
             
         return queryset
 
-    @action(detail=True, methods=['post'], url_path='submit')
-    def submit_exam(self, request, pk=None):
-        submission = self.get_object()
-        
+    def check_can_answer(self, submission):
+        """
+        Return an error response unless the current user is taking this exam within its time limit.
+        """
         # Check if the submission is by the right student and is in 'taking' state
-        if submission.student != request.user or submission.status != 'taking':
+        if submission.student != self.request.user or submission.status != 'taking':
             return Response({'detail': 'Invalid action.'}, status=status.HTTP_403_FORBIDDEN)
 
         # Time validation
         time_elapsed = timezone.now() - submission.start_time
         if time_elapsed > datetime.timedelta(minutes=submission.exam.time_limit):
             return Response({'detail': 'Exam time has expired.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        answers_data = request.data.get('answers', [])
-        submission.answers.all().delete() # Clear previous answers if any
-        
-        total_score = 0
-        has_manual_grading = False
-
+        return None
+
+    def parse_answers(self, submission, answers_data):
+        """
+        Validate [{question, text}] against the exam's questions and return {question_id: text}.
+        """
+        answer_key = get_answer_key('exam', submission.exam_id)
+        answers = {}
         for answer_data in answers_data:
-            question_id = answer_data.get('question')
-            answer_text = answer_data.get('text')
-            question = ExamQuestion.objects.get(id=question_id)
-            
-            answer = ExamAnswer.objects.create(
-                submission=submission,
-                question=question,
-                text=answer_text
-            )
-
-            is_correct = False
-            if question.question_type == 'single_choice':
-                correct_choice = question.choices.filter(is_correct=True).first()
-                if correct_choice and answer.text == str(correct_choice.id):
-                    is_correct = True
-            
-            elif question.question_type == 'multiple_choice':
-                try:
-                    student_answer_ids = sorted(json.loads(answer.text))
-                    correct_choice_ids = sorted([str(pk) for pk in question.choices.filter(is_correct=True).values_list('id', flat=True)])
-                    if student_answer_ids == correct_choice_ids:
-                        is_correct = True
-                except (json.JSONDecodeError, TypeError):
-                    is_correct = False
-
-            elif question.question_type in ['true_false', 'fill_in_the_blank']:
-                if answer.text == question.correct_answer:
-                    is_correct = True
-
-            elif question.question_type == 'short_answer':
-                has_manual_grading = True
-                continue
+            try:
+                question_id = int(answer_data.get('question'))
+            except (AttributeError, TypeError, ValueError):
+                raise serializers.ValidationError({'detail': 'Invalid answer data.'})
+            if question_id not in answer_key:
+                raise serializers.ValidationError({'detail': 'Question does not belong to this exam.'})
+            answers[question_id] = answer_data.get('text') or ''
+        return answers
+
+    @action(detail=True, methods=['get', 'put'], url_path='drafts')
+    def drafts(self, request, pk=None):
+        """
+        GET restores the autosaved answers of an exam in progress (e.g. after a page reload);
+        PUT merges [{question, text}] into them, an empty text clears the answer.
+        Drafts live in a cache and are written to ExamAnswer at most every EXAM_DRAFT_FLUSH_INTERVAL seconds.
+        """
+        submission = self.get_object()
+        if request.method == 'GET':
+            if submission.status != 'taking':
+                return Response({'detail': 'Exam has already been submitted.'}, status=status.HTTP_400_BAD_REQUEST)
+            drafts = get_drafts(submission)
+        else:
+            error = self.check_can_answer(submission)
+            if error is not None:
+                return error
+            drafts = save_drafts(submission, self.parse_answers(submission, request.data.get('answers', [])))
 
-            if is_correct:
-                answer.score = question.points
-            else:
-                answer.score = 0
-            
-            answer.save()
-            if answer.score:
-                total_score += answer.score
+        return Response({
+            'answers': [{'question': question_id, 'text': text} for question_id, text in drafts['answers'].items() if text],
+            'saved_at': drafts['saved_at'],
+        }, status=status.HTTP_200_OK)
 
-        submission.grade = total_score
-        submission.status = 'submitted' if has_manual_grading else 'graded'
-        submission.submitted_at = timezone.now()
-        submission.save()
+    @action(detail=True, methods=['post'], url_path='submit')
+    def submit_exam(self, request, pk=None):
+        submission = self.get_object()
+        error = self.check_can_answer(submission)
+        if error is not None:
+            return error
+
+        # Answers in the request take precedence over autosaved drafts
+        submit_drafts(submission, self.parse_answers(submission, request.data.get('answers', [])))
 
         response_serializer = self.get_serializer(submission)
         return Response(response_serializer.data, status=status.HTTP_200_OK)
@@ -78,6 +78,8 @@ export const getSubmissions = (assignmentId: number) => apiClient.get(`/submissi
 export const createSubmission = (data: any) => apiClient.post('/submissions/', data);
 export const getSubmission = (id: number) => apiClient.get(`/submissions/${id}/`);
 export const gradeSubmission = (id: number, data: any) => apiClient.post(`/submissions/${id}/grade/`, data);
+export const getAssignmentQuestionAnswers = (assignmentId: number, questionId: number, params: any = {}) => apiClient.get(`/assignments/${assignmentId}/questions/${questionId}/answers/`, { params });
+export const gradeAssignmentQuestionAnswers = (assignmentId: number, questionId: number, scores: { id: number; score: number }[]) => apiClient.post(`/assignments/${assignmentId}/questions/${questionId}/answers/`, { scores });
 
 // 考试相关 API
 export const getExams = (courseId: number) => apiClient.get(`/exams/?course=${courseId}`);
@@ -90,21 +92,30 @@ export const getExamSubmission = (id: number) => apiClient.get(`/exam-submission
 export const getSubmissionsForExam = (examId: number) => apiClient.get(`/exams/${examId}/submissions/`);
 export const submitExam = (id: number, data: any) => apiClient.post(`/exam-submissions/${id}/submit/`, data);
 export const gradeExamSubmission = (id: number, data: any) => apiClient.post(`/exam-submissions/${id}/grade/`, data);
+export const getExamAnalysis = (id: number) => apiClient.get(`/exams/${id}/analysis/`);
+export const getExamQuestionAnswers = (examId: number, questionId: number, params: any = {}) => apiClient.get(`/exams/${examId}/questions/${questionId}/answers/`, { params });
+export const gradeExamQuestionAnswers = (examId: number, questionId: number, scores: { id: number; score: number }[]) => apiClient.post(`/exams/${examId}/questions/${questionId}/answers/`, { scores });
 
 // 课程成员
 export const getCourseMembers = (courseId: number) => apiClient.get(`/courses/${courseId}/members/`);
+export const getCourseGradebook = (courseId: number) => apiClient.get(`/courses/${courseId}/gradebook/`);
 
 // 签到相关 API
 export const getCheckins = (courseId: number) => apiClient.get(`/courses/${courseId}/checkins/`);
 export const createCheckin = (courseId: number, data: { title: string }) => apiClient.post(`/courses/${courseId}/checkins/`, data);
-export const getCheckinDetail = (courseId: number, checkinId: number) => apiClient.get(`/courses/${courseId}/checkins/${checkinId}/`);
+export const getCheckinDetail = (courseId: number, checkinId: number) => apiClient.get(`/courses/${courseId}/checkins/${checkinId}/`, { params: { expand: 'records' } });
 export const endCheckin = (courseId: number, checkinId: number) => apiClient.post(`/courses/${courseId}/checkins/${checkinId}/end_checkin/`);
 export const studentCheckin = (courseId: number, checkinId: number) => apiClient.post(`/courses/${courseId}/checkins/${checkinId}/student_checkin/`);
 export const proxyCheckin = (courseId: number, checkinId: number, studentId: number, status: string) => apiClient.post(`/courses/${courseId}/checkins/${checkinId}/proxy_checkin/`, { student_id: studentId, status: status });
 export const deleteCheckin = (courseId: number, checkinId: number) => apiClient.delete(`/courses/${courseId}/checkins/${checkinId}/`);
 
 // 任务相关 API
-export const getTasks = (courseId: number) => apiClient.get(`/courses/${courseId}/tasks/`);
+export const getTasks = (courseId: number, cursor?: string | null, types: string[] = []) => {
+  // Repeat ?type= for each task type (axios would otherwise send type[]=)
+  const params = new URLSearchParams(types.map(type => ['type', type]));
+  if (cursor) params.set('cursor', cursor);
+  return apiClient.get(`/courses/${courseId}/tasks/`, { params });
+};
 export const createRandomQuestion = (courseId: number) => apiClient.post(`/courses/${courseId}/random_questions/`);
 export const getRandomQuestionDetail = (courseId: number, questionId: number) => apiClient.get(`/courses/${courseId}/random-questions/${questionId}/`);
 export const deleteRandomQuestion = (courseId: number, questionId: number) => apiClient.delete(`/courses/${courseId}/random-questions/${questionId}/`);
@@ -124,6 +124,7 @@ export interface Submission {
   answers: Answer[];
   grade: number | null;
   status: 'submitted' | 'graded';
+  is_missing: boolean; // zero-grade record created after the due date
   submitted_at: string;
   feedback: string | null;
 }
@@ -163,6 +164,7 @@ export interface ExamSubmission {
   answers: Answer[];
   grade: number | null;
   status: 'taking' | 'submitted' | 'graded';
+  is_missing: boolean; // zero-grade record created after the end time
   submitted_at: string;
   start_time: string;
   feedback: string | null;
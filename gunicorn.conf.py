@@ -1,5 +1,8 @@
 # Gunicorn config file
 # Command to run: gunicorn --config gunicorn.conf.py iclass_server.wsgi
+# Run the deadline scheduler as a separate long-lived process next to Gunicorn
+# (auto-submits expired exams and records missed work):
+#   python manage.py run_deadline_scheduler
 
 # The socket to bind to.
 # A path to a Unix socket is recommended for security and performance.
@@ -0,0 +1,10 @@
+from rest_framework.pagination import PageNumberPagination
+
+
+class GradingPagination(PageNumberPagination):
+    """
+    按题批改列表的分页，每页默认 50 条答案
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,89 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_field_paths(value):
+    """
+    把 'id,author.username' 解析为 {'id': {}, 'author': {'username': {}}}
+    """
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for part in path.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def _get_request_field_spec(request):
+    # 同一请求内的所有序列化器共用一次解析结果
+    spec = getattr(request, '_field_spec', None)
+    if spec is None:
+        params = request.query_params
+        only = parse_field_paths(params.get('fields')) if 'fields' in params else None
+        spec = (only, parse_field_paths(params.get('omit')), parse_field_paths(params.get('expand')))
+        request._field_spec = spec
+    return spec
+
+
+class DynamicFieldsMixin:
+    """
+    通过查询参数控制读取接口返回的字段：
+
+    - ?fields=id,title,author.username 只返回列出的字段
+    - ?omit=replies 不返回列出的字段
+    - ?expand=records 返回 Meta.expandable_fields 中默认不返回的字段（开销较大的嵌套列表或统计）
+
+    字段在构建序列化器时就被移除，未请求的 SerializerMethodField 和嵌套序列化器不会执行，
+    也不会产生查询。嵌套序列化器同样使用该 mixin 时可以用 a.b 指定其字段。
+    """
+
+    def _get_field_path(self):
+        """
+        返回 (根序列化器, 从根到当前序列化器的字段名列表)
+        """
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return node, path[::-1]
+
+    def _is_view_serializer(self, root):
+        # 视图方法里临时创建并沿用 context 的序列化器（如考试中的提交记录）不受查询参数影响
+        view = self.context.get('view')
+        if view is None or not hasattr(view, 'get_serializer_class'):
+            return True
+        resource = root.child if isinstance(root, serializers.ListSerializer) else root
+        return isinstance(resource, view.get_serializer_class())
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+
+        root, path = self._get_field_path()
+        if not self._is_view_serializer(root):
+            return fields
+
+        only, omit, expand = _get_request_field_spec(request)
+        for part in path:
+            # 只写了父字段（如 fields=author）时，嵌套序列化器返回全部字段
+            only = (only.get(part) or None) if only is not None else None
+            omit = omit.get(part, {})
+            expand = expand.get(part, {})
+
+        expandable = getattr(getattr(self, 'Meta', None), 'expandable_fields', ())
+        for name in list(fields):
+            if only is not None:
+                keep = name in only
+            else:
+                keep = name not in expandable or name in expand
+            # omit=a.b 只排除嵌套字段 b，a 本身保留
+            if name in omit and not omit[name]:
+                keep = False
+            if not keep:
+                fields.pop(name)
+        return fields
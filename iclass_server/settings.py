@@ -169,6 +169,20 @@ CORS_ALLOWED_ORIGINS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 媒体文件经 Django 校验课程成员身份后的发送方式：
+# - None: 由 Django 进程内流式发送，仅用于开发环境（DEBUG=True 时的默认值）
+# - 'x-accel-redirect': 返回 X-Accel-Redirect，由 Nginx 的 internal location 发送（见 nginx.conf，生产环境的默认值）
+# - 'x-sendfile': 返回 X-Sendfile，由 Apache/lighttpd 发送
+# nginx.conf 把 /media/ 全部转发给 Gunicorn，生产环境进程内发送会让视频占满同步 worker
+MEDIA_SENDFILE_BACKEND = None if DEBUG else 'x-accel-redirect'
+MEDIA_ACCEL_REDIRECT_LOCATION = '/protected-media/'
+# 章节视频/PDF 签名 URL 的有效期（秒）
+MEDIA_URL_TOKEN_MAX_AGE = 60 * 60 * 6
+# 断点续传分片的暂存目录，应与 MEDIA_ROOT 位于同一文件系统，完成上传时只需 rename
+UPLOAD_STAGING_ROOT = BASE_DIR / 'upload_staging'
+# 课程资料和章节文件按内容去重存储，引用计数归零后超过该时长（秒）才删除文件
+MEDIA_BLOB_GRACE_PERIOD = 60 * 5
+
 from datetime import timedelta
 
 # Email settings for development (prints to console)
@@ -184,5 +198,34 @@ CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         "LOCATION": "ai-assistant-cache",
-    }
+    },
+    # 课程成员身份缓存需要在多个 gunicorn worker 之间共享，以便选课变动后统一失效；
+    # 多台服务器部署时应改用 Redis / Memcached
+    "membership": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "membership",
+    },
+    # 作业和考试的标准答案缓存，题目或选项修改后需要在所有 worker 中同时失效
+    "grading": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "grading",
+    },
+    # 考试中自动保存的答案，先写入缓存，按 EXAM_DRAFT_FLUSH_INTERVAL 合并写库。
+    # 每份答卷占 3 个键，默认的 MAX_ENTRIES=300 在约 100 人同时考试时就会随机删除尚未写库的答案
+    "exam_drafts": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "exam_drafts",
+        "OPTIONS": {
+            "MAX_ENTRIES": 100000,
+        },
+    },
+    # 学生视角的试卷（不含答案）预先渲染的 JSON，题目修改后按版本号失效
+    "exam_papers": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "exam_papers",
+    },
 }
+
+# 考试自动保存的答案写入数据库的最小间隔（秒），交卷时总是写入；
+# 间隔内最后一次修改由 run_deadline_scheduler 在间隔结束后写入
+EXAM_DRAFT_FLUSH_INTERVAL = 30
@@ -1,15 +1,16 @@
 from rest_framework import serializers
 from .models import DiscussionTopic, DiscussionReply, Attendance, Question, Vote, VoteChoice, VoteResponse, Discussion, RandomQuestion
 from users.serializers import UserSerializer
+from iclass_server.serializers import DynamicFieldsMixin
 
-class DiscussionReplySerializer(serializers.ModelSerializer):
+class DiscussionReplySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     class Meta:
         model = DiscussionReply
         fields = ['id', 'topic', 'content', 'author', 'created_at', 'parent_reply']
         read_only_fields = ['author', 'topic']
 
-class DiscussionTopicSerializer(serializers.ModelSerializer):
+class DiscussionTopicSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     replies = DiscussionReplySerializer(many=True, read_only=True)
     reply_count = serializers.IntegerField(source='replies.count', read_only=True)
@@ -17,6 +18,7 @@ class DiscussionTopicSerializer(serializers.ModelSerializer):
     class Meta:
         model = DiscussionTopic
         fields = ['id', 'course', 'title', 'content', 'author', 'created_at', 'replies', 'reply_count']
+        expandable_fields = ['replies']
         read_only_fields = ['author', 'course']
 
 class AttendanceSerializer(serializers.ModelSerializer):
@@ -59,7 +61,7 @@ class VoteChoiceCreateSerializer(serializers.ModelSerializer):
         model = VoteChoice
         fields = ['text']
 
-class VoteSerializer(serializers.ModelSerializer):
+class VoteSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     choices = VoteChoiceSerializer(many=True, read_only=True)
     choices_create = VoteChoiceCreateSerializer(many=True, write_only=True)
     user_has_voted = serializers.SerializerMethodField()
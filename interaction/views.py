@@ -8,6 +8,7 @@ from .serializers import DiscussionTopicSerializer, DiscussionReplySerializer, R
 from courses.permissions import IsCourseMember, IsAuthorOrTeacherOrReadOnly, IsCourseTeacher
 from django.db.models import Q
 from courses.models import Course
+from courses.search import filter_by_search
 from django.shortcuts import get_object_or_404
 from django.db import IntegrityError
 
@@ -19,10 +20,13 @@ class DiscussionTopicListCreateView(generics.ListCreateAPIView):
         course_id = self.kwargs['course_id']
         queryset = DiscussionTopic.objects.filter(course_id=course_id)
 
-        # Search filter
+        # Search filter: full-text prefix matching on words, not mid-word substrings (see courses.search)
         search_query = self.request.query_params.get('search', None)
         if search_query:
-            queryset = queryset.filter(Q(title__icontains=search_query) | Q(content__icontains=search_query))
+            queryset = filter_by_search(
+                queryset, course_id, search_query, 'discussion_topic',
+                Q(title__icontains=search_query) | Q(content__icontains=search_query),
+            )
 
         # Date range filter
         start_date = self.request.query_params.get('start_date', None)
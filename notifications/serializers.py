@@ -24,6 +24,11 @@ class NotificationSerializer(serializers.ModelSerializer):
 
         # 根据模型类型动态选择序列化器或手动构建字典
         model_name = obj.content_type.model
+        if model_name == 'course':
+            return {
+                'course_id': related_object.id,
+                'id': related_object.id
+            }
         if model_name in ['assignment', 'exam', 'discussiontopic', 'announcement', 'vote', 'checkin', 'question', 'randomquestion']:
             # 这些模型都有 course 字段
             return {
@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, m2m_changed
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
 from assignments.models import Assignment, Submission
@@ -6,7 +6,7 @@ from exams.models import Exam, ExamSubmission
 from checkin.models import Checkin, CheckinRecord
 from interaction.models import DiscussionTopic, DiscussionReply, Question, Vote, VoteResponse, RandomQuestion
 from feedback.models import Questionnaire, FeedbackResponse
-from courses.models import Announcement
+from courses.models import Course, Announcement
 from .models import Notification
 
 @receiver(post_save, sender=Announcement)
@@ -22,6 +22,27 @@ def create_announcement_notification(sender, instance, created, **kwargs):
                 object_id=instance.id
             )
 
+@receiver(m2m_changed, sender=Course.students.through)
+def create_enrollment_notifications(sender, instance, action, reverse, pk_set, **kwargs):
+    # 一次选课操作只批量写入一次通知，而不是逐个学生创建
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        enrollments = [(course, instance.id) for course in Course.objects.filter(pk__in=pk_set).select_related('teacher')]
+    else:
+        enrollments = [(instance, student_id) for student_id in pk_set]
+    content_type = ContentType.objects.get_for_model(Course)
+    Notification.objects.bulk_create([
+        Notification(
+            recipient_id=student_id,
+            sender=course.teacher,
+            message=f"您已被加入课程\"{course.name}\"。",
+            content_type=content_type,
+            object_id=course.id
+        )
+        for course, student_id in enrollments
+    ])
+
 @receiver(post_save, sender=Questionnaire)
 def create_questionnaire_notification(sender, instance, created, **kwargs):
     if created: